@@ -1,15 +1,20 @@
 """
 Helpers de negocio del módulo Seguimiento compartidos entre routers.
 Portados tal cual de la app Streamlit (app/seguimiento/db.py y ui.py).
+
+Reciben la Connection de la unidad de trabajo del request (ver
+database.get_conexion_analitica) en vez de abrir la suya: así un mismo
+request hace un solo checkout del pool, y las escrituras de varios pasos
+quedan en una sola transacción. NO hacen commit — eso le toca al endpoint.
 """
 from datetime import date
 from typing import Optional, Tuple
 
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection
 
 
-def crear_instancias_actividades(engine: Engine, convenio_id: int, convenio_periodo_id: int, tipo: str) -> int:
+def crear_instancias_actividades(conn: Connection, convenio_id: int, convenio_periodo_id: int, tipo: str) -> int:
     """
     Crea las instancias de actividades del catálogo (tipo='ejecucion'|'liquidacion'|'cierre')
     para un período específico de un convenio. Idempotente (INSERT IGNORE):
@@ -18,24 +23,22 @@ def crear_instancias_actividades(engine: Engine, convenio_id: int, convenio_peri
     (INSERT IGNORE no cuenta las que ya existían), para poder reportar el
     resultado de una sincronización (ver create_actividad_catalogo).
     """
-    with engine.connect() as conn:
-        resultado = conn.execute(
-            text("""
-                INSERT IGNORE INTO actividades_convenio_seg_mc
-                    (convenio_id, convenio_periodo_id, actividad_base_id, estado, porcentaje_avance)
-                SELECT :convenio_id, :convenio_periodo_id, id, 'Pendiente', 0
-                FROM actividades_base_seg_mc
-                WHERE tipo = :tipo
-                ORDER BY orden
-            """),
-            {"convenio_id": convenio_id, "convenio_periodo_id": convenio_periodo_id, "tipo": tipo},
-        )
-        conn.commit()
-        return resultado.rowcount
+    resultado = conn.execute(
+        text("""
+            INSERT IGNORE INTO actividades_convenio_seg_mc
+                (convenio_id, convenio_periodo_id, actividad_base_id, estado, porcentaje_avance)
+            SELECT :convenio_id, :convenio_periodo_id, id, 'Pendiente', 0
+            FROM actividades_base_seg_mc
+            WHERE tipo = :tipo
+            ORDER BY orden
+        """),
+        {"convenio_id": convenio_id, "convenio_periodo_id": convenio_periodo_id, "tipo": tipo},
+    )
+    return resultado.rowcount
 
 
 def preseed_notificaciones_pasadas(
-    engine: Engine,
+    conn: Connection,
     convenio_id: int,
     f_liq_vol: Optional[date],
     f_liq_uni: Optional[date],
@@ -56,20 +59,18 @@ def preseed_notificaciones_pasadas(
         (f_liq_jud, "judicial_15d"),
         (f_pol, "poliza"),
     ]
-    with engine.connect() as conn:
-        for fecha, tipo in fechas_tipo:
-            if fecha and fecha < hoy:
-                conn.execute(
-                    text("""
-                        INSERT IGNORE INTO notificaciones_enviadas_seg_mc (convenio_id, tipo_notificacion)
-                        VALUES (:convenio_id, :tipo)
-                    """),
-                    {"convenio_id": convenio_id, "tipo": tipo},
-                )
-        conn.commit()
-
-
-def get_datos_alerta_secop_dtf(engine: Engine, convenio_id: int) -> Tuple[Optional[date], bool]:
+    for fecha, tipo in fechas_tipo:
+        if fecha and fecha < hoy:
+            conn.execute(
+                text("""
+                    INSERT IGNORE INTO notificaciones_enviadas_seg_mc (convenio_id, tipo_notificacion)
+                    VALUES (:convenio_id, :tipo)
+                """),
+                {"convenio_id": convenio_id, "tipo": tipo},
+            )
+
+
+def get_datos_alerta_secop_dtf(conn: Connection, convenio_id: int) -> Tuple[Optional[date], bool]:
     """
     (fecha_firma_dtf, secop_pendiente) para el semáforo de alertas:
     - fecha_firma_dtf: fecha más antigua en que se completó la actividad
@@ -77,19 +78,18 @@ def get_datos_alerta_secop_dtf(engine: Engine, convenio_id: int) -> Tuple[Option
     - secop_pendiente: True si existe la actividad id=23 (Publicación SECOP)
       y falta completarla en al menos un período.
     """
-    with engine.connect() as conn:
-        row = conn.execute(
-            text("""
-                SELECT
-                    MIN(CASE WHEN ab.id=36 AND ac.estado='Completada' THEN ac.fecha_completado END) AS fecha_firma_dtf,
-                    SUM(CASE WHEN ab.id=23 THEN 1 ELSE 0 END) AS total_secop,
-                    SUM(CASE WHEN ab.id=23 AND ac.estado='Completada' THEN 1 ELSE 0 END) AS completadas_secop
-                FROM actividades_convenio_seg_mc ac
-                JOIN actividades_base_seg_mc ab ON ac.actividad_base_id = ab.id
-                WHERE ac.convenio_id = :convenio_id AND ab.id IN (23, 36)
-            """),
-            {"convenio_id": convenio_id},
-        ).fetchone()
+    row = conn.execute(
+        text("""
+            SELECT
+                MIN(CASE WHEN ab.id=36 AND ac.estado='Completada' THEN ac.fecha_completado END) AS fecha_firma_dtf,
+                SUM(CASE WHEN ab.id=23 THEN 1 ELSE 0 END) AS total_secop,
+                SUM(CASE WHEN ab.id=23 AND ac.estado='Completada' THEN 1 ELSE 0 END) AS completadas_secop
+            FROM actividades_convenio_seg_mc ac
+            JOIN actividades_base_seg_mc ab ON ac.actividad_base_id = ab.id
+            WHERE ac.convenio_id = :convenio_id AND ab.id IN (23, 36)
+        """),
+        {"convenio_id": convenio_id},
+    ).fetchone()
 
     if not row:
         return None, False
@@ -99,7 +99,7 @@ def get_datos_alerta_secop_dtf(engine: Engine, convenio_id: int) -> Tuple[Option
 
 
 def calcular_nivel_alerta_convenio(
-    engine: Engine,
+    conn: Connection,
     convenio_id: int,
     f_liq_vol: Optional[date],
     f_liq_uni: Optional[date],
@@ -142,7 +142,7 @@ def calcular_nivel_alerta_convenio(
     if d is not None and d <= 30:
         niveles.append((1, "Vencimiento de póliza"))
 
-    fecha_firma_dtf, secop_pendiente = get_datos_alerta_secop_dtf(engine, convenio_id)
+    fecha_firma_dtf, secop_pendiente = get_datos_alerta_secop_dtf(conn, convenio_id)
 
     if fecha_firma_dtf and not fecha_firma_dg:
         niveles.append((1, "Confirmar firma Director General"))
@@ -0,0 +1,109 @@
+"""
+Modos de búsqueda para los filtros de texto.
+
+Los filtros de /vw-giros-general (documento, fondo, ies) y de
+/reintegros/consulta (beneficiario) eran contains(), que compila a
+LIKE '%x%': con el comodín al principio MySQL no puede usar ningún índice y
+recorre la tabla (o la vista) completa. Cada filtro declara ahora con qué
+modos se puede buscar, y el cliente elige con `modo_<filtro>`:
+
+- exacto: `col = x`; usa el índice de la columna.
+- prefijo: `col LIKE 'x%'` (con %, _ y / del texto escapados); también usa
+  el índice, como rango.
+- texto: MATCH (col) AGAINST ('+palabra1* +palabra2*' IN BOOLEAN MODE);
+  todas las palabras, cada una como prefijo de una palabra de la columna.
+  Las de menos de 3 letras se descartan, como hace el índice
+  (innodb_ft_min_token_size).
+  Necesita el índice FULLTEXT de la columna (migraciones/), así que solo se
+  ofrece donde existe, y nunca es el modo por defecto: sin el índice, MySQL
+  rechaza la consulta (error 1191). Fuera de MySQL (el banco local en
+  SQLite) se resuelve con un LIKE '%palabra%' por palabra, sin índice.
+
+Los índices que respaldan cada modo están en
+migraciones/001_indices_busqueda.sql, y benchmarks/planes_busqueda.py
+revisa con EXPLAIN que los planes los usen.
+"""
+import re
+from enum import Enum
+from typing import Any, Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import and_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement, literal
+
+_ESCAPE = "/"
+_RE_PALABRA = re.compile(r"\w+", re.UNICODE)
+_MIN_PALABRA = 3
+
+
+class ModoBusqueda(str, Enum):
+    exacto = "exacto"
+    prefijo = "prefijo"
+    texto = "texto"
+
+
+def _escapar_like(valor: str) -> str:
+    return valor.replace(_ESCAPE, _ESCAPE * 2).replace("%", _ESCAPE + "%").replace("_", _ESCAPE + "_")
+
+
+class _TextoCompleto(ColumnElement):
+    """MATCH ... AGAINST en MySQL; LIKE por palabra en los demás dialectos."""
+    # Sin tipo Boolean: con él, el WHERE le agrega "= 1" en dialectos sin
+    # booleano nativo.
+    inherit_cache = False
+
+    def __init__(self, columna: Any, palabras: Iterable[str]):
+        self.columna = columna
+        self.palabras = list(palabras)
+
+
+@compiles(_TextoCompleto, "mysql")
+def _texto_mysql(elemento: _TextoCompleto, compiler: Any, **kw: Any) -> str:
+    consulta = " ".join(f"+{p}*" for p in elemento.palabras)
+    return "MATCH (%s) AGAINST (%s IN BOOLEAN MODE)" % (
+        compiler.process(elemento.columna, **kw), compiler.process(literal(consulta), **kw),
+    )
+
+
+@compiles(_TextoCompleto)
+def _texto_generico(elemento: _TextoCompleto, compiler: Any, **kw: Any) -> str:
+    condicion = and_(*(
+        elemento.columna.like(f"%{_escapar_like(p)}%", escape=_ESCAPE) for p in elemento.palabras
+    ))
+    return compiler.process(condicion.self_group(), **kw)
+
+
+def condicion(
+    columna: Any, valor: str, modo: ModoBusqueda, permitidos: Iterable[ModoBusqueda], filtro: str,
+) -> ColumnElement:
+    """
+    La condición WHERE de `columna` para `valor` en `modo`. `permitidos` son
+    los modos que tienen índice para esa columna; cualquier otro es un 400.
+    """
+    permitidos = tuple(permitidos)
+    if modo not in permitidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Modo '{modo.value}' no disponible para {filtro}. Disponibles: {', '.join(m.value for m in permitidos)}",
+        )
+    if modo is ModoBusqueda.exacto:
+        return columna == valor
+    if modo is ModoBusqueda.prefijo:
+        return columna.like(_escapar_like(valor) + "%", escape=_ESCAPE)
+    palabras = [p for p in _RE_PALABRA.findall(valor) if len(p) >= _MIN_PALABRA]
+    if not palabras:
+        raise HTTPException(
+            status_code=400, detail=f"La búsqueda por texto de {filtro} necesita al menos una palabra de {_MIN_PALABRA} letras",
+        )
+    return _TextoCompleto(columna, palabras)
+
+
+def clave_documento(documento: Any) -> str:
+    """
+    Documento comparable como lo compara MySQL con la intercalación de las
+    columnas (utf8mb4_*_ci, PAD SPACE): sin distinguir mayúsculas y sin los
+    espacios del final. Para emparejar en Python lo que la base dio por
+    igual en un WHERE documento = / IN (...).
+    """
+    return str(documento).rstrip(" ").casefold()
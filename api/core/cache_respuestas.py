@@ -0,0 +1,280 @@
+"""
+Caché con TTL de las respuestas de los GET por documento.
+
+El mismo documento lo consultan varios analistas en pocos minutos
+(/consulta/*, /informacion-programas-academicos/{docconvfondo},
+/matricula-cero/consulta, /vw-giros-general/documento/...), y cada vez se
+repetía la misma consulta contra la vista. Los endpoints decorados con
+@cachear guardan aquí su respuesta, con clave ruta + parámetros, durante
+CACHE_RESPUESTAS_TTL_S:
+
+- LRU acotado a CACHE_RESPUESTAS_MAX entradas y a CACHE_RESPUESTAS_MAX_MB
+  de tamaño aproximado (el largo del JSON de cada respuesta);
+- solo se guardan respuestas exitosas: un 404 o un error no quedan
+  cacheados;
+- cada entrada lleva como etiqueta el documento (o el docconvfondo) que
+  consulta, y los endpoints de escritura llaman a invalidar() con esos
+  valores después del commit, así que en la instancia que atiende la
+  edición el cambio se ve en el acto. En las demás, como mucho a los
+  TTL_S segundos;
+- un GET que leyó antes de una edición y termina después de su
+  invalidar() no guarda su respuesta (ya vieja): cada invalidar() avanza
+  una generación, el GET anota la vigente antes de leer y guardar() la
+  compara con la de la última invalidación de su etiqueta.
+
+Un endpoint puede pasar su propio vencimiento (`vence`, segundos que le
+quedan a una respuesta recién calculada) en vez de TTL_S; así los totales
+de /vw-giros-general/totales/ vencen todos juntos en horarios fijos.
+
+El decorador devuelve siempre un JSONResponse (también en un fallo), así
+que FastAPI NO aplica el response_model de la ruta. Para que el filtrado
+no se pierda, cachear() valida el resultado contra el tipo de retorno
+anotado del endpoint (el mismo que su response_model; sin anotación falla
+al importar) y guarda solo los campos de ese tipo, ya pasados por
+jsonable_encoder (dicts y listas planos, no objetos ORM ni modelos).
+"""
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from .config import CACHE_RESPUESTAS_MAX, CACHE_RESPUESTAS_MAX_MB, CACHE_RESPUESTAS_TTL_S
+from .metricas import Contador, lineas_valor
+
+Clave = Tuple[str, Tuple[str, ...]]
+
+# Etiquetas cuya última invalidación se recuerda; más allá, un GET que
+# empezó antes de la más vieja olvidada no guarda, sea cual sea su etiqueta.
+_MAX_INVALIDADAS = 10_000
+
+
+class CacheRespuestas:
+    def __init__(self, ttl: float, max_entradas: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = Contador()
+        self.fallos = Contador()
+        self.desalojos = Contador()
+        self.invalidaciones = Contador()
+        # clave -> (respuesta, expira, tamaño, etiqueta)
+        self._entradas: "OrderedDict[Clave, Tuple[Any, float, int, str]]" = OrderedDict()
+        self._por_etiqueta: Dict[str, Set[Clave]] = {}
+        # Generación que avanza con cada invalidar(); por etiqueta, la de su
+        # última invalidación (las más viejas se olvidan: ver _MAX_INVALIDADAS).
+        self._generacion = 0
+        self._invalidadas: "OrderedDict[str, int]" = OrderedDict()
+        self._olvidada = 0
+        self.descartadas = Contador()
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self) -> bool:
+        return self.ttl > 0 and self.max_entradas > 0
+
+    def _quitar(self, clave: Clave) -> None:
+        _, _, tamano, etiqueta = self._entradas.pop(clave)
+        self.bytes -= tamano
+        claves = self._por_etiqueta.get(etiqueta)
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_etiqueta[etiqueta]
+
+    def obtener(self, clave: Clave) -> Optional[Any]:
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                respuesta, expira, _, _ = entrada
+                if expira > ahora:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos.incrementar()
+                    return respuesta
+                self._quitar(clave)
+        self.fallos.incrementar()
+        return None
+
+    def generacion(self) -> int:
+        """La vigente; se toma antes de leer y se le pasa a guardar()."""
+        return self._generacion
+
+    def guardar(
+        self, clave: Clave, etiqueta: str, respuesta: Any, ttl: Optional[float] = None, generacion: Optional[int] = None,
+    ) -> None:
+        tamano = len(json.dumps(respuesta, default=str))
+        if tamano > self.max_bytes:
+            # Una sola respuesta más grande que todo el caché: no se guarda.
+            return
+        with self._lock:
+            if generacion is not None and (
+                self._invalidadas.get(etiqueta, 0) > generacion or self._olvidada > generacion
+            ):
+                # La etiqueta se invalidó mientras se leía: la respuesta
+                # puede ser de antes de la edición.
+                self.descartadas.incrementar()
+                return
+            if clave in self._entradas:
+                self._quitar(clave)
+            expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entradas[clave] = (respuesta, expira, tamano, etiqueta)
+            self._por_etiqueta.setdefault(etiqueta, set()).add(clave)
+            self.bytes += tamano
+            while len(self._entradas) > self.max_entradas or self.bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.desalojos.incrementar()
+
+    def invalidar(self, *etiquetas: Any) -> int:
+        """Saca todas las respuestas de esos documentos/docconvfondos; devuelve cuántas."""
+        quitadas = 0
+        with self._lock:
+            self._generacion += 1
+            for etiqueta in {str(e) for e in etiquetas if e is not None}:
+                self._invalidadas[etiqueta] = self._generacion
+                self._invalidadas.move_to_end(etiqueta)
+                if len(self._invalidadas) > _MAX_INVALIDADAS:
+                    _, self._olvidada = self._invalidadas.popitem(last=False)
+                for clave in list(self._por_etiqueta.get(etiqueta, ())):
+                    self._quitar(clave)
+                    quitadas += 1
+        self.invalidaciones.incrementar(quitadas)
+        return quitadas
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+CACHE_RESPUESTAS = CacheRespuestas(
+    CACHE_RESPUESTAS_TTL_S, CACHE_RESPUESTAS_MAX, CACHE_RESPUESTAS_MAX_MB * 1024 * 1024,
+)
+
+
+def cachear(
+    ruta: str, *parametros: str, vence: Optional[Callable[[], float]] = None,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorador para un endpoint GET (sync o async); va DEBAJO de @router.get.
+    `parametros` son los argumentos del endpoint que forman la clave; el
+    primero es además la etiqueta que se invalida (documento o docconvfondo).
+    `vence`, si se pasa, reemplaza a TTL_S: se llama al guardar y devuelve
+    cuántos segundos dura la respuesta (0 = no se cachea). El endpoint tiene
+    que anotar su tipo de retorno, igual a su response_model: es lo que
+    filtra la respuesta (ver el docstring del módulo). FastAPI sigue viendo
+    la firma original (functools.wraps), así que las dependencias y la
+    validación de los parámetros no cambian.
+    """
+    def _clave(kwargs: Dict[str, Any]) -> Clave:
+        return ruta, tuple(str(kwargs.get(p)) for p in parametros)
+
+    def _activo() -> bool:
+        if vence is None:
+            return CACHE_RESPUESTAS.activo
+        return CACHE_RESPUESTAS.max_entradas > 0 and vence() > 0
+
+    def _guardar(clave: Clave, respuesta: Any, generacion: int) -> None:
+        CACHE_RESPUESTAS.guardar(
+            clave, clave[1][0], respuesta, vence() if vence is not None else None, generacion=generacion,
+        )
+
+    def decorador(funcion: Callable[..., Any]) -> Callable[..., Any]:
+        modelo = inspect.signature(funcion).return_annotation
+        if modelo is inspect.Signature.empty:
+            raise TypeError(
+                f"@cachear({ruta!r}): {funcion.__name__} tiene que anotar su tipo de retorno (el de su response_model)"
+            )
+        adaptador = TypeAdapter(modelo)
+
+        def _serializar(resultado: Any) -> Any:
+            # dump_python con el tipo declarado deja solo sus campos (como
+            # el response_model); jsonable_encoder, el mismo JSON de antes.
+            validado = adaptador.validate_python(resultado, from_attributes=True)
+            return jsonable_encoder(adaptador.dump_python(validado))
+
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura_async(*args: Any, **kwargs: Any) -> Any:
+                if not _activo():
+                    return await funcion(*args, **kwargs)
+                clave = _clave(kwargs)
+                respuesta = CACHE_RESPUESTAS.obtener(clave)
+                if respuesta is None:
+                    generacion = CACHE_RESPUESTAS.generacion()
+                    respuesta = _serializar(await funcion(*args, **kwargs))
+                    _guardar(clave, respuesta, generacion)
+                return JSONResponse(respuesta)
+            return envoltura_async
+
+        @functools.wraps(funcion)
+        def envoltura(*args: Any, **kwargs: Any) -> Any:
+            if not _activo():
+                return funcion(*args, **kwargs)
+            clave = _clave(kwargs)
+            respuesta = CACHE_RESPUESTAS.obtener(clave)
+            if respuesta is None:
+                generacion = CACHE_RESPUESTAS.generacion()
+                respuesta = _serializar(funcion(*args, **kwargs))
+                _guardar(clave, respuesta, generacion)
+            return JSONResponse(respuesta)
+        return envoltura
+
+    return decorador
+
+
+def invalidar(*etiquetas: Any) -> int:
+    return CACHE_RESPUESTAS.invalidar(*etiquetas)
+
+
+def estado_cache_respuestas() -> Dict[str, Any]:
+    c = CACHE_RESPUESTAS
+    return {
+        "ttl_seconds": c.ttl,
+        "max_entries": c.max_entradas,
+        "max_bytes": c.max_bytes,
+        "entries": len(c),
+        "bytes": c.bytes,
+        "hits": c.aciertos.valor,
+        "misses": c.fallos.valor,
+        "evictions": c.desalojos.valor,
+        "invalidations": c.invalidaciones.valor,
+        "stale_discarded": c.descartadas.valor,
+    }
+
+
+def lineas_prometheus() -> List[str]:
+    c = CACHE_RESPUESTAS
+    lineas = [
+        "# HELP api_cache_respuestas_entradas Respuestas guardadas en el caché de GET por documento.",
+        "# TYPE api_cache_respuestas_entradas gauge",
+    ]
+    lineas += lineas_valor("api_cache_respuestas_entradas", {}, len(c))
+    lineas += [
+        "# HELP api_cache_respuestas_bytes Tamaño aproximado (JSON) de las respuestas en el caché.",
+        "# TYPE api_cache_respuestas_bytes gauge",
+    ]
+    lineas += lineas_valor("api_cache_respuestas_bytes", {}, c.bytes)
+    lineas += [
+        "# HELP api_cache_respuestas_total Consultas al caché de respuestas por resultado.",
+        "# TYPE api_cache_respuestas_total counter",
+    ]
+    lineas += lineas_valor("api_cache_respuestas_total", {"resultado": "acierto"}, c.aciertos.valor)
+    lineas += lineas_valor("api_cache_respuestas_total", {"resultado": "fallo"}, c.fallos.valor)
+    lineas += [
+        "# HELP api_cache_respuestas_desalojos_total Respuestas sacadas del caché, por capacidad o por invalidación de una escritura.",
+        "# TYPE api_cache_respuestas_desalojos_total counter",
+    ]
+    lineas += lineas_valor("api_cache_respuestas_desalojos_total", {"motivo": "capacidad"}, c.desalojos.valor)
+    lineas += lineas_valor("api_cache_respuestas_desalojos_total", {"motivo": "escritura"}, c.invalidaciones.valor)
+    lineas += [
+        "# HELP api_cache_respuestas_descartadas_total Respuestas no guardadas porque su documento se editó mientras se leían.",
+        "# TYPE api_cache_respuestas_descartadas_total counter",
+    ]
+    lineas += lineas_valor("api_cache_respuestas_descartadas_total", {}, c.descartadas.valor)
+    return lineas
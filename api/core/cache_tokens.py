@@ -0,0 +1,155 @@
+"""
+Caché de tokens JWT ya verificados.
+
+El frontend React hace polling con los mismos pocos tokens miles de veces
+por hora, y cada request repetía jwt.decode (firma HMAC + validación de
+claims). Aquí se guardan los claims de cada token válido hasta su `exp`, en
+un LRU acotado a TOKEN_CACHE_MAX entradas, indexado por el SHA-256 del token
+(el token en claro no queda en memoria como clave).
+
+Lo comparten get_current_user (login genérico) y
+get_current_user_seguimiento: ambos pasan por decode_token, y el chequeo del
+claim "modulo" de Seguimiento se sigue haciendo sobre los claims cacheados.
+
+El caché no revoca nada: guarda los mismos claims que daría jwt.decode, y
+un token sacado del caché vuelve a decodificarse (y a guardarse) en el
+siguiente request. La revocación, donde existe, se hace después del decode:
+- Seguimiento: get_current_user_seguimiento revisa en cada request, con los
+  claims cacheados o no, la tabla de api/core/estado_usuarios.py (usuario
+  activo y versión de contraseña).
+- Login genérico: get_current_user nunca revisó el estado del usuario; un
+  token de un usuario desactivado o que cambió de contraseña sigue sirviendo
+  hasta su `exp`, igual que antes del caché.
+
+invalidar_usuario() (lo llaman los endpoints que desactivan, eliminan o
+cambian la contraseña de un usuario) solo libera esas entradas antes de su
+`exp`.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Set, Tuple
+
+from .config import TOKEN_CACHE_MAX
+from .metricas import Contador, lineas_valor
+from .security import decode_token
+
+# Módulos de usuario (el mismo id puede existir en los dos universos).
+MODULO_API = "api"
+MODULO_SEGUIMIENTO = "seguimiento"
+
+
+def _identidad(claims: Dict[str, Any]) -> Tuple[str, str]:
+    if claims.get("modulo") == MODULO_SEGUIMIENTO:
+        return MODULO_SEGUIMIENTO, str(claims.get("usuario_id"))
+    return MODULO_API, str(claims.get("username"))
+
+
+class CacheTokens:
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self.aciertos = Contador()
+        self.fallos = Contador()
+        self.desalojos = Contador()
+        self.invalidaciones = Contador()
+        self._entradas: "OrderedDict[str, Tuple[Dict[str, Any], float, Tuple[str, str]]]" = OrderedDict()
+        self._por_usuario: Dict[Tuple[str, str], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _quitar(self, clave: str) -> None:
+        _, _, identidad = self._entradas.pop(clave)
+        claves = self._por_usuario.get(identidad)
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_usuario[identidad]
+
+    def decodificar(self, token: str) -> Dict[str, Any]:
+        """Como security.decode_token (mismas HTTPException), pero con caché."""
+        if self.max_entradas <= 0:
+            return decode_token(token)
+
+        clave = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        ahora = time.time()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                claims, expira, _ = entrada
+                if expira > ahora:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos.incrementar()
+                    return dict(claims)
+                # Vencido: que decode_token responda "Token expirado".
+                self._quitar(clave)
+        self.fallos.incrementar()
+
+        claims = decode_token(token)
+        expira = float(claims.get("exp", 0))
+        identidad = _identidad(claims)
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (claims, expira, identidad)
+            self._por_usuario.setdefault(identidad, set()).add(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._quitar(next(iter(self._entradas)))
+                self.desalojos.incrementar()
+        return dict(claims)
+
+    def invalidar_usuario(self, modulo: str, identificador: Any) -> int:
+        """Saca del caché los tokens de un usuario (no los revoca); devuelve cuántos."""
+        with self._lock:
+            claves = list(self._por_usuario.get((modulo, str(identificador)), ()))
+            for clave in claves:
+                self._quitar(clave)
+        self.invalidaciones.incrementar(len(claves))
+        return len(claves)
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+CACHE_TOKENS = CacheTokens(TOKEN_CACHE_MAX)
+
+
+def decodificar_token(token: str) -> Dict[str, Any]:
+    return CACHE_TOKENS.decodificar(token)
+
+
+def invalidar_usuario(modulo: str, identificador: Any) -> int:
+    return CACHE_TOKENS.invalidar_usuario(modulo, identificador)
+
+
+def estado_cache_tokens() -> Dict[str, Any]:
+    c = CACHE_TOKENS
+    return {
+        "max_entries": c.max_entradas,
+        "entries": len(c),
+        "hits": c.aciertos.valor,
+        "misses": c.fallos.valor,
+        "evictions": c.desalojos.valor,
+        "invalidations": c.invalidaciones.valor,
+    }
+
+
+def lineas_prometheus() -> List[str]:
+    c = CACHE_TOKENS
+    lineas = [
+        "# HELP api_cache_tokens_entradas Tokens verificados en el caché.",
+        "# TYPE api_cache_tokens_entradas gauge",
+    ]
+    lineas += lineas_valor("api_cache_tokens_entradas", {}, len(c))
+    lineas += [
+        "# HELP api_cache_tokens_total Consultas al caché de tokens por resultado.",
+        "# TYPE api_cache_tokens_total counter",
+    ]
+    lineas += lineas_valor("api_cache_tokens_total", {"resultado": "acierto"}, c.aciertos.valor)
+    lineas += lineas_valor("api_cache_tokens_total", {"resultado": "fallo"}, c.fallos.valor)
+    lineas += [
+        "# HELP api_cache_tokens_desalojos_total Tokens sacados del caché, por capacidad o por invalidación explícita.",
+        "# TYPE api_cache_tokens_desalojos_total counter",
+    ]
+    lineas += lineas_valor("api_cache_tokens_desalojos_total", {"motivo": "capacidad"}, c.desalojos.valor)
+    lineas += lineas_valor("api_cache_tokens_desalojos_total", {"motivo": "usuario"}, c.invalidaciones.valor)
+    return lineas
@@ -0,0 +1,86 @@
+"""
+Selección de columnas (`fields=`) para los endpoints que hacen SELECT * sobre
+vistas anchas.
+
+/consulta/formulario-mc, /matricula-cero/consulta y
+/matricula-cero/tablero/giros devolvían todas las columnas de la vista
+aunque cada pantalla usa unas pocas. Con `?fields=documento,periodo,...` la
+lista se valida contra las columnas reales de la vista y se pone en el
+SELECT: menos lectura en la base, menos filas que convertir y menos JSON.
+
+Las columnas de cada vista se leen una sola vez por proceso (un
+SELECT * ... LIMIT 0, que solo trae la descripción del cursor) y quedan en
+memoria; una columna nueva en la vista se ve al reiniciar la instancia.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .vitalidad_conexiones import leer_con_reintento
+
+# Parámetro común a los endpoints; None = todas las columnas (como antes).
+FIELDS_QUERY = Query(
+    None,
+    description="Columnas a devolver, separadas por coma (p. ej. documento,periodo). Por defecto, todas.",
+)
+
+_COLUMNAS: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+
+
+async def columnas_vista(engine: AsyncEngine, vista: str) -> Tuple[str, ...]:
+    clave = (str(engine.url), vista)
+    columnas = _COLUMNAS.get(clave)
+    if columnas is None:
+        resultado = await leer_con_reintento(engine, text(f"SELECT * FROM {vista} LIMIT 0"))
+        columnas = tuple(resultado.keys())
+        _COLUMNAS[clave] = columnas
+    return columnas
+
+
+def parsear_campos(fields: Optional[str], permitidos: Iterable[str]) -> Optional[List[str]]:
+    """
+    "a, b,a" -> ["a", "b"], validado contra `permitidos` (400 con los que no
+    existen). None o vacío -> None (todas).
+    """
+    if fields is None:
+        return None
+    campos = list(dict.fromkeys(c.strip() for c in fields.split(",") if c.strip()))
+    if not campos:
+        return None
+    permitidos = set(permitidos)
+    invalidos = [c for c in campos if c not in permitidos]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos no válidos en fields: {', '.join(invalidos)}. Disponibles: {', '.join(sorted(permitidos))}",
+        )
+    return campos
+
+
+async def lista_select(
+    engine: AsyncEngine, vista: str, fields: Optional[str], obligatorias: Sequence[str] = (),
+) -> Tuple[str, Optional[List[str]]]:
+    """
+    Devuelve (lista para el SELECT, campos pedidos). Sin `fields` es ("*",
+    None). `obligatorias` son columnas que el endpoint necesita para
+    procesar las filas (p. ej. un filtro hecho en Python): van en el SELECT
+    aunque no se pidan, y el llamador las quita con recortar().
+    """
+    if fields is None:
+        return "*", None
+    campos = parsear_campos(fields, await columnas_vista(engine, vista))
+    if campos is None:
+        return "*", None
+    # Los nombres ya están validados contra la vista; se citan igual por si
+    # alguno es palabra reservada.
+    citar = engine.dialect.identifier_preparer.quote
+    seleccion = campos + [c for c in obligatorias if c not in campos]
+    return ", ".join(citar(c) for c in seleccion), campos
+
+
+def recortar(filas: List[Dict], campos: Optional[List[str]]) -> List[Dict]:
+    if campos is None:
+        return filas
+    return [{c: fila[c] for c in campos} for fila in filas]
@@ -0,0 +1,145 @@
+"""
+Compartimentos estancos (bulkheads) por base de datos.
+
+Los endpoints sync comparten un único threadpool (THREADPOOL_HILOS). Si la
+vista de giros de dtf_financiera se pone lenta, sus requests se quedan con
+todos los hilos y el login/seguimiento (analitica) hacen fila detrás aunque
+su base esté perfecta. Cada base tiene aquí un semáforo que limita cuántos
+requests pueden estar usándola a la vez; el request espera su turno en el
+event loop (sin ocupar hilo) y, si la espera pasa de espera_max, responde
+503 en vez de quedarse colgado.
+
+Se aplican como dependencia, por router en app.py o por ruta en los routers
+que tocan varias bases:
+
+    app.include_router(x.router, dependencies=[Depends(compartimento("dtf_financiera"))])
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+from fastapi import HTTPException, status
+
+from .config import COMPARTIMENTOS_DB
+from .metricas import Contador, Histograma, lineas_histograma, lineas_valor
+
+
+class Compartimento:
+    def __init__(self, nombre: str, limite: int, espera_max: float):
+        self.nombre = nombre
+        self.limite = limite
+        self.espera_max = espera_max
+        self.en_curso = 0
+        self.en_espera = 0
+        self.espera = Histograma()
+        self.rechazos = Contador()
+        self._semaforo = asyncio.Semaphore(limite)
+        # True mientras el request (su contexto) tiene tomado un cupo de
+        # este compartimento; ver cupo().
+        self._tomado: ContextVar[bool] = ContextVar(f"compartimento_{nombre}", default=False)
+
+    async def dependencia(self):
+        inicio = time.perf_counter()
+        self.en_espera += 1
+        # asyncio.timeout() y no wait_for(): en 3.11, si el acquire se
+        # completa justo cuando vence la espera, wait_for puede lanzar
+        # TimeoutError con el cupo ya tomado, y ese cupo no se devuelve
+        # nunca. Con timeout() la cancelación llega dentro de acquire(), que
+        # devuelve el cupo; `adquirido` cubre el caso de que haya llegado a
+        # tomarlo y el vencimiento se note recién al salir del bloque.
+        adquirido = False
+        try:
+            async with asyncio.timeout(self.espera_max):
+                await self._semaforo.acquire()
+                adquirido = True
+        except TimeoutError:
+            if adquirido:
+                self._semaforo.release()
+            self.rechazos.incrementar()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"La base de datos {self.nombre} está saturada; intente de nuevo en unos segundos.",
+                headers={"Retry-After": "5"},
+            )
+        finally:
+            self.en_espera -= 1
+            self.espera.observar(time.perf_counter() - inicio)
+
+        self.en_curso += 1
+        self._tomado.set(True)
+        try:
+            yield
+        finally:
+            self._tomado.set(False)
+            self.en_curso -= 1
+            self._semaforo.release()
+
+    @asynccontextmanager
+    async def cupo(self) -> AsyncIterator[None]:
+        """
+        Para lecturas que no son de la ruta misma (p. ej. una dependencia
+        compartida por routers con y sin este compartimento): si el request
+        ya tiene un cupo lo reutiliza, y si no, toma uno. Tomar un segundo
+        cupo con el primero en la mano podría dejar a todos los requests
+        esperándose entre sí hasta el 503.
+        """
+        if self._tomado.get():
+            yield
+            return
+        async with asynccontextmanager(self.dependencia)():
+            yield
+
+
+COMPARTIMENTOS: Dict[str, Compartimento] = {
+    nombre: Compartimento(nombre, c["limite"], c["espera_max"])
+    for nombre, c in COMPARTIMENTOS_DB.items()
+}
+
+
+def compartimento(nombre: str) -> Callable:
+    """Dependencia que reserva un cupo del compartimento de la base `nombre`."""
+    return COMPARTIMENTOS[nombre].dependencia
+
+
+def estado_compartimentos() -> Dict[str, Dict[str, Any]]:
+    return {
+        nombre: {
+            "limit": c.limite,
+            "in_flight": c.en_curso,
+            "queued": c.en_espera,
+            "rejected": c.rechazos.valor,
+            "wait_seconds": c.espera.snapshot(),
+        }
+        for nombre, c in COMPARTIMENTOS.items()
+    }
+
+
+def lineas_prometheus() -> List[str]:
+    lineas = [
+        "# HELP api_compartimento_requests Requests por base de datos en curso y en espera de cupo.",
+        "# TYPE api_compartimento_requests gauge",
+    ]
+    for nombre, c in COMPARTIMENTOS.items():
+        lineas += lineas_valor("api_compartimento_requests", {"db": nombre, "estado": "en_curso"}, c.en_curso)
+        lineas += lineas_valor("api_compartimento_requests", {"db": nombre, "estado": "en_espera"}, c.en_espera)
+    lineas += [
+        "# HELP api_compartimento_limite Cupo máximo de requests simultáneos por base de datos.",
+        "# TYPE api_compartimento_limite gauge",
+    ]
+    for nombre, c in COMPARTIMENTOS.items():
+        lineas += lineas_valor("api_compartimento_limite", {"db": nombre}, c.limite)
+    lineas += [
+        "# HELP api_compartimento_rechazos_total Requests que agotaron la espera de cupo (503).",
+        "# TYPE api_compartimento_rechazos_total counter",
+    ]
+    for nombre, c in COMPARTIMENTOS.items():
+        lineas += lineas_valor("api_compartimento_rechazos_total", {"db": nombre}, c.rechazos.valor)
+    lineas += [
+        "# HELP api_compartimento_espera_segundos Espera por un cupo del compartimento.",
+        "# TYPE api_compartimento_espera_segundos histogram",
+    ]
+    for nombre, c in COMPARTIMENTOS.items():
+        lineas += lineas_histograma("api_compartimento_espera_segundos", {"db": nombre}, c.espera)
+    return lineas
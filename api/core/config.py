@@ -2,6 +2,13 @@ import os
 from typing import Any, Dict, List, Optional
 from urllib.parse import quote_plus
 
+from dotenv import load_dotenv
+
+# app.py también llama load_dotenv(), pero DESPUÉS de importar los routers
+# (que importan este módulo), así que sin esto las variables del .env no
+# alcanzarían a leerse al construir las URLs y pools de abajo.
+load_dotenv()
+
 DEFAULT_ANALITICA_DB = {
     "HOST": "10.120.64.32",
     "USER": "analitica",
@@ -32,13 +39,18 @@ def _build_mysql_url(prefix: str, defaults: Dict[str, str]) -> str:
     """Construye la URL de conexión a MySQL usando env con fallback a defaults.
 
     Prefijo esperado, por ejemplo: LOGIN_DB o APP_DB.
-    Variables soportadas: {PREFIX}_{HOST,USER,PASSWORD,DATABASE,PORT}
+    Variables soportadas: {PREFIX}_{HOST,USER,PASSWORD,DATABASE,PORT}, o
+    {PREFIX}_URL con la URL SQLAlchemy completa, que tiene prioridad (la usa
+    el banco de carga local de benchmarks/ para apuntar a SQLite).
     """
-    host = defaults["HOST"]
-    user = defaults["USER"]
-    password = defaults["PASSWORD"]
-    database = defaults["DATABASE"]
-    port = "3306"
+    url = os.getenv(f"{prefix}_URL")
+    if url:
+        return url
+    host = os.getenv(f"{prefix}_HOST", defaults["HOST"])
+    user = os.getenv(f"{prefix}_USER", defaults["USER"])
+    password = os.getenv(f"{prefix}_PASSWORD", defaults["PASSWORD"])
+    database = os.getenv(f"{prefix}_DATABASE", defaults["DATABASE"])
+    port = os.getenv(f"{prefix}_PORT", defaults["PORT"])
 
     # Asegurar que usuario/contraseña estén codificados para URL
     user_q = quote_plus(user)
@@ -47,10 +59,204 @@ def _build_mysql_url(prefix: str, defaults: Dict[str, str]) -> str:
     return f"mysql+mysqlconnector://{user_q}:{pass_q}@{host}:{port}/{database}"
 
 
+def _env_int(nombre: str, defecto: int) -> int:
+    valor = os.getenv(nombre)
+    if valor is None or not valor.strip():
+        return defecto
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"La variable de entorno {nombre} debe ser un entero (recibido: {valor!r})")
+
+
+def _build_pool_settings(
+    prefix: str,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_recycle: int = 1800,
+    pool_timeout: int = 30,
+) -> Dict[str, int]:
+    """Parámetros del QueuePool de un engine, leídos de env con fallback.
+
+    Variables soportadas: {PREFIX}_{POOL_SIZE,MAX_OVERFLOW,POOL_RECYCLE,POOL_TIMEOUT}.
+    POOL_RECYCLE (segundos) debe quedar por debajo del wait_timeout del
+    servidor MySQL; POOL_TIMEOUT es cuánto espera un request por una conexión
+    libre antes de fallar con "QueuePool limit ... timed out".
+
+    OJO en Cloud Run: cada instancia abre su propio pool, así que el máximo
+    de conexiones contra MySQL es (POOL_SIZE + MAX_OVERFLOW) x instancias.
+    """
+    return {
+        "pool_size": _env_int(f"{prefix}_POOL_SIZE", pool_size),
+        "max_overflow": _env_int(f"{prefix}_MAX_OVERFLOW", max_overflow),
+        "pool_recycle": _env_int(f"{prefix}_POOL_RECYCLE", pool_recycle),
+        "pool_timeout": _env_int(f"{prefix}_POOL_TIMEOUT", pool_timeout),
+    }
+
+
+def _build_mysql_url_opcional(prefix: str, defaults: Dict[str, str]) -> Optional[str]:
+    """Igual que _build_mysql_url, pero None si {PREFIX}_HOST/_URL no está definido."""
+    if not os.getenv(f"{prefix}_HOST") and not os.getenv(f"{prefix}_URL"):
+        return None
+    return _build_mysql_url(prefix, defaults)
+
+
 ANALITICA_DB_URL = _build_mysql_url("LOGIN_DB", DEFAULT_ANALITICA_DB)
 CONVOCATORIA_DB_URL = _build_mysql_url("APP_DB", DEFAULT_CONVOCATORIA_DB)
 DTF_FINANCIERA_DB_URL = _build_mysql_url("DTF_DB", DEFAULT_DTF_FINANCIERA_DB)
 
+# analitica atiende login, seguimiento, informes y la mayoría de /consulta,
+# así que arranca con un pool más grande que las otras dos.
+ANALITICA_POOL = _build_pool_settings("LOGIN_DB", pool_size=10, max_overflow=20)
+CONVOCATORIA_POOL = _build_pool_settings("APP_DB")
+DTF_FINANCIERA_POOL = _build_pool_settings("DTF_DB")
+
+# Réplica de lectura OPCIONAL de analitica_fondos (ANALITICA_READ_DB_*), para
+# que los tableros/informes de Seguimiento no compitan con las escrituras.
+# Usuario/clave/BD toman por defecto los de la primaria; sin
+# ANALITICA_READ_DB_HOST todo sigue yendo a la primaria. OJO: la réplica
+# puede ir unos segundos atrasada — lo que necesite leer lo que acaba de
+# escribir (read-after-write) debe usar engine_analitica, no la réplica.
+ANALITICA_READ_DB_URL = _build_mysql_url_opcional("ANALITICA_READ_DB", {
+    "HOST": "",
+    "USER": os.getenv("LOGIN_DB_USER", DEFAULT_ANALITICA_DB["USER"]),
+    "PASSWORD": os.getenv("LOGIN_DB_PASSWORD", DEFAULT_ANALITICA_DB["PASSWORD"]),
+    "DATABASE": os.getenv("LOGIN_DB_DATABASE", DEFAULT_ANALITICA_DB["DATABASE"]),
+    "PORT": os.getenv("LOGIN_DB_PORT", DEFAULT_ANALITICA_DB["PORT"]),
+})
+ANALITICA_READ_POOL = _build_pool_settings("ANALITICA_READ_DB", pool_size=10, max_overflow=20)
+
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_SECRET = os.getenv("JWT_SECRET", "JWT_VALUE")
 JWT_EXPIRES_HOURS = 24*7 # one day
+
+# Umbral (ms) a partir del cual una sentencia SQL se registra en el log de
+# consultas lentas (logger "api.sql.lento"). 0 desactiva el log.
+SQL_SLOW_QUERY_MS = _env_int("SQL_SLOW_QUERY_MS", 1000)
+
+# Vitalidad de las conexiones de los engines async (database_async.py; los
+# sync de database.py siempre usan pre_ping, porque sus lecturas no tienen
+# reintento). "pre_ping" es lo de antes: un SELECT 1 en CADA checkout (un
+# round trip extra por request contra los MySQL de 10.120.x / 10.124.x).
+# "validacion" (por defecto) lo reemplaza por:
+#   - pool_recycle (ver {PREFIX}_POOL_RECYCLE) por debajo del wait_timeout,
+#   - una tarea en segundo plano que cada DB_VALIDACION_INTERVALO_S hace ping
+#     a las conexiones que llevan más de DB_VALIDACION_OCIOSA_S ociosas en el
+#     pool (las que un firewall/NAT o el servidor pudo haber cortado),
+#   - y un único reintento transparente en las lecturas idempotentes que se
+#     encuentran una conexión caída (ver api/core/vitalidad_conexiones.py).
+DB_LIVENESS = os.getenv("DB_LIVENESS", "validacion").strip().lower()
+if DB_LIVENESS not in ("validacion", "pre_ping"):
+    raise ValueError(f"DB_LIVENESS debe ser 'validacion' o 'pre_ping' (recibido: {DB_LIVENESS!r})")
+DB_VALIDACION_INTERVALO_S = _env_int("DB_VALIDACION_INTERVALO_S", 30)
+DB_VALIDACION_OCIOSA_S = _env_int("DB_VALIDACION_OCIOSA_S", 60)
+
+# Compartimentos estancos (bulkheads) por base de datos: cuántos requests
+# pueden estar a la vez usando cada una ({PREFIX}_MAX_CONCURRENCIA) y cuánto
+# espera un request su turno antes de responder 503
+# ({PREFIX}_ESPERA_CONCURRENCIA_S). Así una fuente lenta (típicamente la
+# vista de giros en dtf_financiera) no se queda con todos los hilos del
+# threadpool. Conviene que la suma de los límites no pase de THREADPOOL_HILOS.
+THREADPOOL_HILOS = _env_int("THREADPOOL_HILOS", 40)
+COMPARTIMENTOS_DB = {
+    "analitica": {
+        "limite": _env_int("LOGIN_DB_MAX_CONCURRENCIA", 25),
+        "espera_max": _env_int("LOGIN_DB_ESPERA_CONCURRENCIA_S", 30),
+    },
+    "convocatoria": {
+        "limite": _env_int("APP_DB_MAX_CONCURRENCIA", 10),
+        "espera_max": _env_int("APP_DB_ESPERA_CONCURRENCIA_S", 30),
+    },
+    "dtf_financiera": {
+        "limite": _env_int("DTF_DB_MAX_CONCURRENCIA", 5),
+        "espera_max": _env_int("DTF_DB_ESPERA_CONCURRENCIA_S", 30),
+    },
+}
+
+# Hashing de contraseñas (PBKDF2 de 100k iteraciones del login genérico,
+# bcrypt de Seguimiento) en un ejecutor propio, fuera del threadpool de los
+# endpoints (ver api/core/hashing.py). HASH_EJECUTOR: "procesos" (por
+# defecto; paralelismo real de CPU) o "hilos". HASH_MAX_EN_COLA es cuántos
+# hashes pueden esperar turno; pasado eso, o tras HASH_ESPERA_S, 503.
+HASH_EJECUTOR = os.getenv("HASH_EJECUTOR", "procesos").strip().lower()
+if HASH_EJECUTOR not in ("procesos", "hilos"):
+    raise ValueError(f"HASH_EJECUTOR debe ser 'procesos' o 'hilos' (recibido: {HASH_EJECUTOR!r})")
+HASH_TRABAJADORES = _env_int("HASH_TRABAJADORES", min(4, os.cpu_count() or 1))
+HASH_MAX_EN_COLA = _env_int("HASH_MAX_EN_COLA", 50)
+HASH_ESPERA_S = _env_int("HASH_ESPERA_S", 10)
+
+# Tokens JWT ya verificados que se guardan en memoria (LRU) para no repetir
+# jwt.decode en cada request del polling del frontend (ver
+# api/core/cache_tokens.py). 0 desactiva el caché.
+TOKEN_CACHE_MAX = _env_int("TOKEN_CACHE_MAX", 10000)
+
+# Cada cuántos segundos se recarga la tabla en memoria de estado de los
+# usuarios de Seguimiento (activo, rol, versión de contraseña; ver
+# api/core/estado_usuarios.py). Es el tiempo máximo que tarda en aplicarse
+# en OTRAS instancias una desactivación hecha en una.
+ESTADO_USUARIOS_INTERVALO_S = _env_int("ESTADO_USUARIOS_INTERVALO_S", 30)
+
+# Límite de intentos de login (cubetas de tokens por usuario y por IP del
+# cliente; ver api/core/limite_login.py). Cada intento cuesta un PBKDF2 o un
+# bcrypt completo, así que se corta con 429 ANTES de hashear. RAFAGA es
+# cuántos intentos seguidos se permiten y POR_MIN el ritmo sostenido.
+LOGIN_LIMITE_USUARIO_RAFAGA = _env_int("LOGIN_LIMITE_USUARIO_RAFAGA", 5)
+LOGIN_LIMITE_USUARIO_POR_MIN = _env_int("LOGIN_LIMITE_USUARIO_POR_MIN", 5)
+LOGIN_LIMITE_IP_RAFAGA = _env_int("LOGIN_LIMITE_IP_RAFAGA", 30)
+LOGIN_LIMITE_IP_POR_MIN = _env_int("LOGIN_LIMITE_IP_POR_MIN", 60)
+
+# Máximo de documentos por request en los endpoints POST .../lote de
+# /consulta; internamente se consultan en bloques de IN (...) más chicos.
+CONSULTA_LOTE_MAX = _env_int("CONSULTA_LOTE_MAX", 5000)
+
+# Caché de respuestas de los GET por documento (ver
+# api/core/cache_respuestas.py). TTL_S es lo más viejo que puede llegar a
+# estar una respuesta cuando el cambio se hizo en OTRA instancia (en la
+# misma, los endpoints de escritura invalidan en el acto). MAX acota las
+# entradas y MAX_MB el tamaño aproximado (JSON) de todas juntas; al pasarse
+# se desalojan las menos usadas. TTL_S=0 desactiva el caché.
+CACHE_RESPUESTAS_TTL_S = _env_int("CACHE_RESPUESTAS_TTL_S", 120)
+CACHE_RESPUESTAS_MAX = _env_int("CACHE_RESPUESTAS_MAX", 5000)
+CACHE_RESPUESTAS_MAX_MB = _env_int("CACHE_RESPUESTAS_MAX_MB", 64)
+
+# Cada cuántos segundos se recarga el índice en memoria de
+# fondos_habilitados_renovar (ver api/core/habilitados_renovar.py). Las altas
+# por /renovaciones-extemporaneas/agrega-tabla-ti se ven en el acto en la
+# instancia que las hace; las cargas directas en la base, a la siguiente
+# recarga.
+HABILITADOS_RENOVAR_INTERVALO_S = _env_int("HABILITADOS_RENOVAR_INTERVALO_S", 300)
+
+# Exportaciones en streaming (ver api/core/exportacion.py, p. ej.
+# /vw-giros-general/exportar/). Cada una ocupa una conexión del pool async
+# de su base mientras dura: MAX_SIMULTANEAS acota cuántas puede haber a la
+# vez por instancia (la siguiente recibe 503). LOTE es cuántas filas se
+# traen del cursor del servidor y se mandan al cliente por vez.
+EXPORTACION_MAX_SIMULTANEAS = _env_int("EXPORTACION_MAX_SIMULTANEAS", 2)
+EXPORTACION_LOTE = _env_int("EXPORTACION_LOTE", 2000)
+
+# Copias materializadas de vistas pesadas (ver
+# api/core/vistas_materializadas.py). VISTAS_MATERIALIZADAS lista, separadas
+# por coma, las vistas que se copian a tablas indexadas y se leen desde ahí;
+# vacía, todas se leen de la vista como antes. Cada INTERVALO_S se traen las
+# filas nuevas (por fecha_registro) y cada RECONSTRUCCION_S se rehace la
+# copia completa; RECONSTRUCCION_S tiene que ser bastante mayor que
+# INTERVALO_S (la copia anterior se borra en la reconstrucción siguiente).
+# MAX_ANTIGUEDAD_S de cada vista es lo más vieja que puede estar su copia
+# para leerla: pasado eso, los endpoints vuelven a la vista.
+VISTAS_MATERIALIZADAS = [v.strip() for v in os.getenv("VISTAS_MATERIALIZADAS", "").split(",") if v.strip()]
+VISTAS_MATERIALIZADAS_INTERVALO_S = _env_int("VISTAS_MATERIALIZADAS_INTERVALO_S", 300)
+VISTAS_MATERIALIZADAS_RECONSTRUCCION_S = _env_int("VISTAS_MATERIALIZADAS_RECONSTRUCCION_S", 6 * 3600)
+VISTAS_MATERIALIZADAS_MAX_ANTIGUEDAD_S = {
+    "vw_giros_general_historico_ies": _env_int("VW_GIROS_GENERAL_MAX_ANTIGUEDAD_S", 1800),
+    # Periodo cerrado: casi no cambia.
+    "vw_matricula_cero_2025_2": _env_int("VW_MATRICULA_CERO_2025_2_MAX_ANTIGUEDAD_S", 3600),
+    # Periodo vigente: los beneficiarios ven su formulario recién enviado.
+    "vw_matricula_cero_2026_2": _env_int("VW_MATRICULA_CERO_2026_2_MAX_ANTIGUEDAD_S", 900),
+}
+
+# Los totales de /vw-giros-general/totales/ se guardan en el caché de
+# respuestas por combinación de parámetros y vencen todos juntos en cada
+# múltiplo de RENOVACION_S (contado desde la medianoche UTC, así que todas
+# las instancias renuevan a la vez y muestran las mismas cifras). 0 los
+# calcula en cada request.
+TOTALES_GIROS_RENOVACION_S = _env_int("TOTALES_GIROS_RENOVACION_S", 900)
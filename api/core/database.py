@@ -1,9 +1,150 @@
+import time
+from typing import Any, Dict, List, Type
+
+from fastapi import Depends, Request
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
 from sqlmodel import create_engine, Session
-from .config import CONVOCATORIA_DB_URL, ANALITICA_DB_URL, DTF_FINANCIERA_DB_URL
 
-engine_analitica = create_engine(ANALITICA_DB_URL, pool_pre_ping=True)
-engine_convocatoria = create_engine(CONVOCATORIA_DB_URL, pool_pre_ping=True)
-engine_dtf_financiera = create_engine(DTF_FINANCIERA_DB_URL, pool_pre_ping=True)
+from .config import (
+    ANALITICA_DB_URL,
+    ANALITICA_POOL,
+    ANALITICA_READ_DB_URL,
+    ANALITICA_READ_POOL,
+    CONVOCATORIA_DB_URL,
+    CONVOCATORIA_POOL,
+    DTF_FINANCIERA_DB_URL,
+    DTF_FINANCIERA_POOL,
+)
+from .instrumentacion_sql import instrumentar_engine
+from .metricas import Contador, Histograma, lineas_histograma, lineas_valor
+from .plazos import aplicar_plazos
+from .vitalidad_conexiones import INVALIDADAS, REINTENTOS, VALIDADAS, registrar_vitalidad
+
+# Métricas de checkout por engine, expuestas en /internal/pools.
+ESPERA_CHECKOUT: Dict[str, Histograma] = {}
+TIMEOUTS_CHECKOUT: Dict[str, Contador] = {}
+
+
+def clase_pool_medida(base: Type[Pool], nombre: str) -> Type[Pool]:
+    """
+    Subclase del pool que mide cuánto espera cada checkout (incluye abrir la
+    conexión si el pool tenía que crear una nueva) y cuenta los timeouts.
+    Se crea una clase por engine porque SQLAlchemy reconstruye el pool con
+    self.__class__ en dispose()/recreate(): así las métricas sobreviven.
+    """
+    histograma = ESPERA_CHECKOUT.setdefault(nombre, Histograma())
+    timeouts = TIMEOUTS_CHECKOUT.setdefault(nombre, Contador())
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return base._do_get(self)
+        except PoolTimeoutError:
+            timeouts.incrementar()
+            raise
+        finally:
+            histograma.observar(time.perf_counter() - inicio)
+
+    return type(f"{base.__name__}_{nombre}", (base,), {"_do_get": _do_get})
+
+
+ENGINES: Dict[str, Engine] = {}
+
+
+def registrar_engine(nombre: str, engine: Engine) -> None:
+    """Deja el engine (sync, o el sync_engine de uno async) visible para
+    /internal/pools y /metrics, con sus tiempos SQL instrumentados."""
+    ENGINES[nombre] = engine
+    instrumentar_engine(nombre, engine)
+    registrar_vitalidad(nombre, engine)
+    aplicar_plazos(engine)
+
+
+def _crear_engine(nombre: str, url: str, pool: Dict[str, int]) -> Engine:
+    engine = create_engine(
+        url,
+        poolclass=clase_pool_medida(QueuePool, nombre),
+        # Siempre con pre_ping, aun con DB_LIVENESS=validacion: las lecturas
+        # sync (seguimiento, informes, reintegros, usuarios...) no pasan por
+        # leer_con_reintento(), que es solo para el engine async.
+        pool_pre_ping=True,
+        **pool,
+    )
+    registrar_engine(nombre, engine)
+    return engine
+
+
+engine_analitica = _crear_engine("analitica", ANALITICA_DB_URL, ANALITICA_POOL)
+engine_convocatoria = _crear_engine("convocatoria", CONVOCATORIA_DB_URL, CONVOCATORIA_POOL)
+engine_dtf_financiera = _crear_engine("dtf_financiera", DTF_FINANCIERA_DB_URL, DTF_FINANCIERA_POOL)
+
+# Réplica de lectura de analitica; si no está configurada es la misma primaria.
+engine_analitica_lectura = (
+    _crear_engine("analitica_lectura", ANALITICA_READ_DB_URL, ANALITICA_READ_POOL)
+    if ANALITICA_READ_DB_URL
+    else engine_analitica
+)
+
+
+def estado_pools() -> Dict[str, Dict[str, Any]]:
+    """Conexiones prestadas/libres/overflow y espera de checkout por engine."""
+    estado = {}
+    for nombre, engine in ENGINES.items():
+        pool = engine.pool
+        estado[nombre] = {
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # overflow() arranca en -pool_size; solo interesa cuando ya se desbordó.
+            "overflow": max(pool.overflow(), 0),
+            "checkout_timeouts": TIMEOUTS_CHECKOUT[nombre].valor,
+            "checkout_wait_seconds": ESPERA_CHECKOUT[nombre].snapshot(),
+            "idle_validations": VALIDADAS[nombre].valor,
+            "idle_invalidations": INVALIDADAS[nombre].valor,
+            "disconnect_retries": REINTENTOS[nombre].valor,
+        }
+    return estado
+
+
+def lineas_prometheus_pools() -> List[str]:
+    lineas = [
+        "# HELP api_pool_conexiones Conexiones del pool por engine y estado.",
+        "# TYPE api_pool_conexiones gauge",
+    ]
+    estado = estado_pools()
+    for nombre, e in estado.items():
+        for campo in ("checked_out", "idle", "overflow"):
+            lineas += lineas_valor("api_pool_conexiones", {"engine": nombre, "estado": campo}, e[campo])
+    lineas += [
+        "# HELP api_pool_checkout_timeouts_total Checkouts que agotaron pool_timeout.",
+        "# TYPE api_pool_checkout_timeouts_total counter",
+    ]
+    for nombre, e in estado.items():
+        lineas += lineas_valor("api_pool_checkout_timeouts_total", {"engine": nombre}, e["checkout_timeouts"])
+    lineas += [
+        "# HELP api_pool_validaciones_ociosas_total Pings de fondo a conexiones ociosas, por resultado.",
+        "# TYPE api_pool_validaciones_ociosas_total counter",
+    ]
+    for nombre, e in estado.items():
+        lineas += lineas_valor("api_pool_validaciones_ociosas_total", {"engine": nombre, "resultado": "ok"}, e["idle_validations"])
+        lineas += lineas_valor("api_pool_validaciones_ociosas_total", {"engine": nombre, "resultado": "invalidada"}, e["idle_invalidations"])
+    lineas += [
+        "# HELP api_pool_reintentos_desconexion_total Lecturas reintentadas por encontrar la conexión caída.",
+        "# TYPE api_pool_reintentos_desconexion_total counter",
+    ]
+    for nombre, e in estado.items():
+        lineas += lineas_valor("api_pool_reintentos_desconexion_total", {"engine": nombre}, e["disconnect_retries"])
+    lineas += [
+        "# HELP api_pool_espera_checkout_segundos Espera por una conexión del pool.",
+        "# TYPE api_pool_espera_checkout_segundos histogram",
+    ]
+    for nombre in estado:
+        lineas += lineas_histograma("api_pool_espera_checkout_segundos", {"engine": nombre}, ESPERA_CHECKOUT[nombre])
+    return lineas
 
 # Expose a session dependency factory
 
@@ -17,4 +158,30 @@ def get_session_convocatoria():
 
 def get_session_dtf_financiera():
     with Session(engine_dtf_financiera) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+# Ruteo primaria/réplica de analitica: GET/HEAD van a la réplica, todo lo
+# demás (escrituras y sus lecturas de verificación) a la primaria.
+
+def get_engine_analitica_lectura(request: Request) -> Engine:
+    if request.method in ("GET", "HEAD"):
+        return engine_analitica_lectura
+    return engine_analitica
+
+def get_session_analitica_lectura(engine: Engine = Depends(get_engine_analitica_lectura)):
+    with Session(engine) as session:
+        yield session
+
+# Unidad de trabajo por request: UNA conexión (un checkout del pool, un
+# pre-ping) y UNA transacción para todo el request. El endpoint hace
+# conn.commit() al final; si sale por una excepción (HTTPException incluida)
+# sin haber hecho commit, al cerrar la conexión se hace rollback de todo, así
+# que las escrituras de varios pasos quedan atómicas.
+
+def get_conexion_analitica():
+    with engine_analitica.connect() as conn:
+        yield conn
+
+def get_conexion_analitica_lectura(engine: Engine = Depends(get_engine_analitica_lectura)):
+    with engine.connect() as conn:
+        yield conn
@@ -0,0 +1,67 @@
+"""
+Capa async (aiomysql) paralela a api/core/database.py, para los endpoints de
+lectura más calientes (/consulta/*, /matricula-cero/*, /vw-giros-general/*).
+
+Los endpoints sync corren en el threadpool de Starlette (40 tokens por
+defecto), así que el techo de throughput de las consultas por documento es
+el número de hilos, no la base de datos. Estos engines se usan desde
+endpoints `async def`, que esperan la consulta sin ocupar un hilo.
+
+Mismas URLs y mismos parámetros de pool por prefijo que los engines sync
+(ver config._build_pool_settings). Son pools distintos: el total de
+conexiones por instancia contra cada MySQL es la suma de ambos.
+"""
+from typing import Dict
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .config import (
+    ANALITICA_DB_URL,
+    ANALITICA_POOL,
+    CONVOCATORIA_DB_URL,
+    CONVOCATORIA_POOL,
+    DB_LIVENESS,
+    DTF_FINANCIERA_DB_URL,
+    DTF_FINANCIERA_POOL,
+)
+from .database import clase_pool_medida, registrar_engine
+
+
+def _url_async(url: str) -> str:
+    if url.startswith("sqlite://"):
+        # Solo para el banco de carga local (benchmarks/), con aiosqlite.
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url.replace("mysql+mysqlconnector://", "mysql+aiomysql://", 1)
+
+
+def _crear_engine_async(nombre: str, url: str, pool: Dict[str, int]) -> AsyncEngine:
+    engine = create_async_engine(
+        _url_async(url),
+        poolclass=clase_pool_medida(AsyncAdaptedQueuePool, nombre),
+        pool_pre_ping=DB_LIVENESS == "pre_ping",
+        **pool,
+    )
+    # Se registra el sync_engine, que es el que lleva el pool y los eventos.
+    registrar_engine(nombre, engine.sync_engine)
+    return engine
+
+
+async_engine_analitica = _crear_engine_async("analitica_async", ANALITICA_DB_URL, ANALITICA_POOL)
+async_engine_convocatoria = _crear_engine_async("convocatoria_async", CONVOCATORIA_DB_URL, CONVOCATORIA_POOL)
+async_engine_dtf_financiera = _crear_engine_async("dtf_financiera_async", DTF_FINANCIERA_DB_URL, DTF_FINANCIERA_POOL)
+
+# Dependencias equivalentes a get_session_analitica & co.
+
+async def get_async_session_analitica():
+    async with AsyncSession(async_engine_analitica) as session:
+        yield session
+
+async def get_async_session_convocatoria():
+    async with AsyncSession(async_engine_convocatoria) as session:
+        yield session
+
+async def get_async_session_dtf_financiera():
+    async with AsyncSession(async_engine_dtf_financiera) as session:
+        yield session
@@ -0,0 +1,212 @@
+"""
+Tabla en memoria del estado de los usuarios de Seguimiento.
+
+Los tokens de Seguimiento duran 7 días y solo se verificaba la firma: un
+usuario desactivado (PATCH /seguimiento/usuarios/{id}/estado), eliminado o
+con la contraseña reseteada seguía entrando hasta que vencía su token. Para
+revocarlos sin una consulta a usuarios_seg_proceso_mc por request, cada
+instancia guarda aquí (activo, rol, versión de contraseña) de todos los
+usuarios:
+
+- se carga completa al arrancar y se recarga cada ESTADO_USUARIOS_INTERVALO_S;
+- los endpoints de administración de usuarios la actualizan en el acto en
+  la instancia que atiende el cambio (las demás se enteran en la siguiente
+  recarga);
+- un usuario que no está en la tabla (creado en otra instancia después de
+  la última recarga) se busca una vez en la base y queda registrado. Esa
+  búsqueda va por leer_con_reintento y el compartimento "analitica", como
+  las demás lecturas. Mientras la tabla no haya cargado nunca (la base no
+  respondió al arrancar), cada usuario pasa una vez por ese camino; el
+  estado se ve en /internal/estado-usuarios;
+- los cambios locales hechos mientras corre una recarga se vuelven a
+  aplicar sobre la tabla nueva (su SELECT pudo leer antes del commit), así
+  que un usuario desactivado aquí no vuelve a quedar activo por la recarga.
+
+La "versión de contraseña" es un resumen del password_hash que viaja en el
+token (claim "pwv"); si la contraseña cambia, los tokens emitidos antes dejan
+de servir. Los tokens sin ese claim (emitidos antes de este cambio) no se
+validan contra la versión.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from .compartimentos import COMPARTIMENTOS
+from .database_async import async_engine_analitica
+from .metricas import Contador, lineas_valor
+from .vitalidad_conexiones import leer_con_reintento
+
+logger = logging.getLogger("api.seguimiento.usuarios")
+
+_CONSULTA = """
+    SELECT id, activo, rol, password_hash
+    FROM usuarios_seg_proceso_mc
+"""
+
+
+def version_password(password_hash: Optional[str]) -> str:
+    return hashlib.sha256((password_hash or "").encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class EstadoUsuario:
+    activo: bool
+    rol: str
+    version_password: str
+
+
+def _estado(row: Any) -> EstadoUsuario:
+    return EstadoUsuario(activo=bool(row.activo), rol=row.rol, version_password=version_password(row.password_hash))
+
+
+# Marca de "sacar de la tabla" (que la próxima consulta lo lea de la base),
+# distinta de None (usuario eliminado).
+_QUITAR = object()
+
+
+class TablaEstadoUsuarios:
+    def __init__(self) -> None:
+        # usuario_id -> estado, o None si el usuario no existe (eliminado).
+        self._estados: Dict[int, Optional[EstadoUsuario]] = {}
+        self._lock = threading.Lock()
+        # Cambios locales hechos mientras corre una recarga (usuario_id ->
+        # estado o _QUITAR); se reaplican sobre la tabla nueva.
+        self._cambios_en_recarga: Optional[Dict[int, Any]] = None
+        # time.time() de la última recarga completa; None = nunca cargó.
+        self.recargada_en: Optional[float] = None
+        self.recargas_fallidas = Contador()
+        self.busquedas = Contador()
+
+    async def recargar(self) -> None:
+        with self._lock:
+            self._cambios_en_recarga = {}
+        try:
+            rows = (await leer_con_reintento(async_engine_analitica, text(_CONSULTA))).fetchall()
+            estados = {row.id: _estado(row) for row in rows}
+        except BaseException:
+            with self._lock:
+                self._cambios_en_recarga = None
+            raise
+        with self._lock:
+            cambios, self._cambios_en_recarga = self._cambios_en_recarga, None
+            for usuario_id, estado in cambios.items():
+                if estado is _QUITAR:
+                    estados.pop(usuario_id, None)
+                else:
+                    estados[usuario_id] = estado
+            # Se reemplaza el dict entero: las lecturas concurrentes ven el
+            # anterior o el nuevo, nunca uno a medio llenar.
+            self._estados = estados
+            self.recargada_en = time.time()
+
+    def _poner(self, usuario_id: int, estado: Any) -> None:
+        # Con el lock tomado.
+        if estado is _QUITAR:
+            self._estados.pop(usuario_id, None)
+        else:
+            self._estados[usuario_id] = estado
+        if self._cambios_en_recarga is not None:
+            self._cambios_en_recarga[usuario_id] = estado
+
+    async def obtener(self, usuario_id: int) -> Optional[EstadoUsuario]:
+        estados = self._estados
+        if usuario_id in estados:
+            return estados[usuario_id]
+        self.busquedas.incrementar()
+        async with COMPARTIMENTOS["analitica"].cupo():
+            row = (await leer_con_reintento(
+                async_engine_analitica, text(_CONSULTA + " WHERE id = :id"), {"id": usuario_id},
+            )).fetchone()
+        estado = _estado(row) if row else None
+        with self._lock:
+            self._poner(usuario_id, estado)
+        return estado
+
+    def actualizar(self, usuario_id: int, **cambios: Any) -> None:
+        """Aplica un cambio hecho por un endpoint de administración."""
+        with self._lock:
+            actual = self._estados.get(usuario_id)
+            if actual is None:
+                # Sin estado previo completo: que la próxima consulta lo lea.
+                self._poner(usuario_id, _QUITAR)
+                return
+            self._poner(usuario_id, EstadoUsuario(**{**actual.__dict__, **cambios}))
+
+    def registrar(self, usuario_id: int, activo: bool, rol: str, password_hash: str) -> None:
+        with self._lock:
+            self._poner(usuario_id, EstadoUsuario(activo, rol, version_password(password_hash)))
+
+    def eliminar(self, usuario_id: int) -> None:
+        with self._lock:
+            self._poner(usuario_id, None)
+
+    def __len__(self) -> int:
+        return len(self._estados)
+
+
+ESTADO_USUARIOS = TablaEstadoUsuarios()
+
+
+async def recargar_periodicamente(intervalo: float) -> None:
+    """Tarea de fondo (se lanza en el lifespan de la app)."""
+    while True:
+        try:
+            await ESTADO_USUARIOS.recargar()
+        except Exception:
+            ESTADO_USUARIOS.recargas_fallidas.incrementar()
+            if ESTADO_USUARIOS.recargada_en is None:
+                logger.exception(
+                    "No se pudo cargar el estado de los usuarios de Seguimiento; "
+                    "hasta que cargue, cada usuario se busca en la base en su primer request"
+                )
+            else:
+                logger.exception("No se pudo recargar el estado de los usuarios de Seguimiento")
+        await asyncio.sleep(intervalo)
+
+
+def estado_usuarios() -> Dict[str, Any]:
+    t = ESTADO_USUARIOS
+    return {
+        "loaded": t.recargada_en is not None,
+        "users": len(t),
+        "last_reload_age_seconds": round(time.time() - t.recargada_en, 1) if t.recargada_en is not None else None,
+        "reload_failures": t.recargas_fallidas.valor,
+        "db_lookups": t.busquedas.valor,
+    }
+
+
+def lineas_prometheus() -> List[str]:
+    t = ESTADO_USUARIOS
+    lineas = [
+        "# HELP api_estado_usuarios_cargada 1 si la tabla de estado de usuarios de Seguimiento cargó al menos una vez.",
+        "# TYPE api_estado_usuarios_cargada gauge",
+    ]
+    lineas += lineas_valor("api_estado_usuarios_cargada", {}, int(t.recargada_en is not None))
+    lineas += [
+        "# HELP api_estado_usuarios_entradas Usuarios en la tabla en memoria.",
+        "# TYPE api_estado_usuarios_entradas gauge",
+    ]
+    lineas += lineas_valor("api_estado_usuarios_entradas", {}, len(t))
+    if t.recargada_en is not None:
+        lineas += [
+            "# HELP api_estado_usuarios_antiguedad_segundos Segundos desde la última recarga completa.",
+            "# TYPE api_estado_usuarios_antiguedad_segundos gauge",
+        ]
+        lineas += lineas_valor("api_estado_usuarios_antiguedad_segundos", {}, round(time.time() - t.recargada_en, 1))
+    lineas += [
+        "# HELP api_estado_usuarios_recargas_fallidas_total Recargas de la tabla que fallaron.",
+        "# TYPE api_estado_usuarios_recargas_fallidas_total counter",
+    ]
+    lineas += lineas_valor("api_estado_usuarios_recargas_fallidas_total", {}, t.recargas_fallidas.valor)
+    lineas += [
+        "# HELP api_estado_usuarios_busquedas_total Usuarios que no estaban en la tabla y se buscaron en la base.",
+        "# TYPE api_estado_usuarios_busquedas_total counter",
+    ]
+    lineas += lineas_valor("api_estado_usuarios_busquedas_total", {}, t.busquedas.valor)
+    return lineas
@@ -0,0 +1,223 @@
+"""
+Exportaciones completas en streaming (CSV o NDJSON).
+
+Finanzas pide extractos completos de la vista de giros (por fondo, IES o
+periodo), que hasta ahora se sacaban paginando /vw-giros-general/ de a 100
+filas durante horas. respuesta_exportacion() lanza la consulta UNA vez con
+cursor del lado del servidor y va mandando el archivo a medida que llegan
+las filas, en lotes de EXPORTACION_LOTE: la memoria de la instancia no
+depende del tamaño del extracto.
+
+- Usa el engine async (aiomysql). El sync usa mysql-connector, que en
+  SQLAlchemy siempre lee el resultado completo al cliente (buffered=True),
+  así que stream_results/yield_per ahí no ahorrarían memoria.
+- La conexión se abre dentro del generador: las dependencias con yield de
+  FastAPI (sesión, compartimento) ya se cerraron cuando empieza el
+  streaming.
+- Cada exportación ocupa una conexión del pool mientras dure; a lo sumo
+  EXPORTACION_MAX_SIMULTANEAS a la vez por instancia, y la siguiente recibe
+  503 en el acto. El lugar se reserva al armar la respuesta (no cuando
+  empieza el streaming, que es después: si no, varias pedidas juntas
+  pasaban todas el control) y se libera al terminar el generador o, si
+  este nunca llegó a correr (el cliente se fue antes), al terminar de
+  enviarse la respuesta.
+- Si la consulta falla a mitad de camino ya salieron el 200 y parte del
+  archivo: se registra el error y se corta la conexión, así el cliente ve
+  una descarga fallida y no un archivo que parece completo.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime, time as hora
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import Select
+
+from .config import EXPORTACION_LOTE, EXPORTACION_MAX_SIMULTANEAS
+from .metricas import Contador, lineas_valor
+
+logger = logging.getLogger("api.exportacion")
+
+# Con cursor del lado del servidor MySQL espera a que el cliente lea cada
+# paquete; si la descarga va lenta (el cliente HTTP lee despacio), el
+# default de 60 s corta la consulta a mitad del extracto.
+_NET_WRITE_TIMEOUT_S = 600
+
+
+class FormatoExportacion(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+_TIPOS_MEDIA = {
+    FormatoExportacion.csv: "text/csv; charset=utf-8",
+    FormatoExportacion.ndjson: "application/x-ndjson",
+}
+
+
+class Exportaciones:
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self.en_curso = 0
+        self.completas = Contador()
+        self.fallidas = Contador()
+        self.rechazadas = Contador()
+        self.filas = Contador()
+
+
+EXPORTACIONES = Exportaciones(EXPORTACION_MAX_SIMULTANEAS)
+
+
+class _Cupo:
+    """Un lugar de EXPORTACIONES.en_curso; se libera una sola vez."""
+
+    def __init__(self):
+        EXPORTACIONES.en_curso += 1
+        self._liberado = False
+
+    def liberar(self) -> bool:
+        """True si lo liberó esta llamada."""
+        if self._liberado:
+            return False
+        self._liberado = True
+        EXPORTACIONES.en_curso -= 1
+        return True
+
+
+class _RespuestaExportacion(StreamingResponse):
+    def __init__(self, contenido: AsyncIterator[bytes], cupo: _Cupo, **kwargs: Any):
+        super().__init__(contenido, **kwargs)
+        self._cupo = cupo
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Si el generador no lo liberó, no llegó a correr (o no terminó
+            # de arrancar): cuenta como fallida.
+            if self._cupo.liberar():
+                EXPORTACIONES.fallidas.incrementar()
+
+
+def valor_json(valor: Any) -> Any:
+    """`default` de json.dumps para las filas crudas de la base (como jsonable_encoder)."""
+    if isinstance(valor, (datetime, date, hora)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+def _lote_csv(filas: List[Any]) -> bytes:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerows(filas)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _lote_ndjson(columnas: List[str], filas: List[Any]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columnas, fila)), default=valor_json, ensure_ascii=False) + "\n" for fila in filas
+    ).encode("utf-8")
+
+
+async def _generar(
+    engine: AsyncEngine, statement: Select, formato: FormatoExportacion, cupo: _Cupo,
+) -> AsyncIterator[bytes]:
+    filas = 0
+    try:
+        async with engine.connect() as conexion:
+            if engine.dialect.name == "mysql":
+                await conexion.exec_driver_sql(f"SET SESSION net_write_timeout = {_NET_WRITE_TIMEOUT_S}")
+            try:
+                resultado = await conexion.stream(statement.execution_options(yield_per=EXPORTACION_LOTE))
+                columnas = list(resultado.keys())
+                if formato is FormatoExportacion.csv:
+                    # BOM: sin él Excel abre el CSV como Latin-1 y rompe las tildes.
+                    yield "\ufeff".encode("utf-8") + _lote_csv([columnas])
+                async for lote in resultado.partitions():
+                    filas += len(lote)
+                    if formato is FormatoExportacion.csv:
+                        yield _lote_csv(lote)
+                    else:
+                        yield _lote_ndjson(columnas, lote)
+            finally:
+                if engine.dialect.name == "mysql":
+                    # El rollback al devolverla no deshace el SET SESSION: sin
+                    # esto, los requests que la reciban después heredan el
+                    # net_write_timeout de 10 minutos. Se descarta (el pool
+                    # abre otra) en vez de restaurar el valor, que falla si
+                    # la exportación se cortó con el resultado a medio leer.
+                    await conexion.invalidate()
+        EXPORTACIONES.completas.incrementar()
+    except Exception:
+        EXPORTACIONES.fallidas.incrementar()
+        logger.exception("Exportación cortada después de %d filas", filas)
+        raise
+    except BaseException:
+        # Cancelada (el cliente cerró la conexión).
+        EXPORTACIONES.fallidas.incrementar()
+        raise
+    finally:
+        cupo.liberar()
+        EXPORTACIONES.filas.incrementar(filas)
+
+
+def respuesta_exportacion(
+    engine: AsyncEngine, statement: Select, formato: FormatoExportacion, nombre_archivo: str,
+) -> StreamingResponse:
+    """StreamingResponse con el resultado de `statement`; 503 si ya hay el máximo en curso."""
+    if EXPORTACIONES.en_curso >= EXPORTACIONES.maximo:
+        EXPORTACIONES.rechazadas.incrementar()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Ya hay {EXPORTACIONES.maximo} exportaciones en curso; intente de nuevo en unos minutos.",
+            headers={"Retry-After": "60"},
+        )
+    cupo = _Cupo()
+    return _RespuestaExportacion(
+        _generar(engine, statement, formato, cupo),
+        cupo,
+        media_type=_TIPOS_MEDIA[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}.{formato.value}"'},
+    )
+
+
+def estado_exportaciones() -> Dict[str, Any]:
+    e = EXPORTACIONES
+    return {
+        "max_concurrent": e.maximo,
+        "in_progress": e.en_curso,
+        "completed": e.completas.valor,
+        "failed": e.fallidas.valor,
+        "rejected": e.rechazadas.valor,
+        "rows": e.filas.valor,
+    }
+
+
+def lineas_prometheus() -> List[str]:
+    e = EXPORTACIONES
+    lineas = [
+        "# HELP api_exportaciones_en_curso Exportaciones en streaming en curso.",
+        "# TYPE api_exportaciones_en_curso gauge",
+    ]
+    lineas += lineas_valor("api_exportaciones_en_curso", {}, e.en_curso)
+    lineas += [
+        "# HELP api_exportaciones_total Exportaciones en streaming por resultado.",
+        "# TYPE api_exportaciones_total counter",
+    ]
+    lineas += lineas_valor("api_exportaciones_total", {"resultado": "completa"}, e.completas.valor)
+    lineas += lineas_valor("api_exportaciones_total", {"resultado": "fallida"}, e.fallidas.valor)
+    lineas += lineas_valor("api_exportaciones_total", {"resultado": "rechazada"}, e.rechazadas.valor)
+    lineas += [
+        "# HELP api_exportaciones_filas_total Filas enviadas por las exportaciones en streaming.",
+        "# TYPE api_exportaciones_filas_total counter",
+    ]
+    lineas += lineas_valor("api_exportaciones_filas_total", {}, e.filas.valor)
+    return lineas
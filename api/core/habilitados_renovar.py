@@ -0,0 +1,188 @@
+"""
+Índice en memoria de los documentos de fondos_habilitados_renovar.
+
+En ventanas de renovación /consulta/existe-tabla-habilitados-renovar recibe
+miles de requests por minuto y cada uno hacía un COUNT(*) contra
+convocatoria_sapiencia. La tabla cambia poco (altas por
+/renovaciones-extemporaneas/agrega-tabla-ti y cargas masivas de TI), así
+que cada instancia guarda el conjunto de documentos:
+
+- los documentos numéricos (casi todos) como un array ordenado de enteros
+  sin signo de 8 bytes, consultado con búsqueda binaria; los que no son un
+  entero canónico (letras, ceros a la izquierda) en un set aparte;
+- al cargar y al consultar, cada documento pasa por clave_documento()
+  (api/core/busqueda.py): sin distinguir mayúsculas ni espacios al final,
+  como comparaba el WHERE documento = :d con la intercalación de la columna;
+- se carga al arrancar y se recarga completo cada
+  HABILITADOS_RENOVAR_INTERVALO_S (solo la columna documento, que es la
+  PK), para ver las cargas hechas directo en la base;
+- agrega-tabla-ti lo actualiza en el acto en la instancia que hace el alta.
+
+Mientras no haya una carga exitosa, `cargado` es False y los endpoints
+consultan la base como antes.
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from .busqueda import clave_documento
+from .database_async import async_engine_convocatoria
+from .metricas import Contador, lineas_valor
+from .vitalidad_conexiones import leer_con_reintento
+
+logger = logging.getLogger("api.consulta")
+
+_MAX_ENTERO = 2 ** 64
+
+
+def _como_entero(documento: str) -> Optional[int]:
+    """El entero del documento si su texto es exactamente str(entero)."""
+    if not (documento.isascii() and documento.isdigit()):
+        return None
+    if len(documento) > 1 and documento[0] == "0":
+        return None
+    valor = int(documento)
+    return valor if valor < _MAX_ENTERO else None
+
+
+def _construir(documentos: Iterable[Any]) -> Tuple[array, Set[str]]:
+    numeros: List[int] = []
+    otros: Set[str] = set()
+    for documento in documentos:
+        documento = clave_documento(documento)
+        valor = _como_entero(documento)
+        if valor is None:
+            otros.add(documento)
+        else:
+            numeros.append(valor)
+    return array("Q", sorted(set(numeros))), otros
+
+
+class IndiceHabilitados:
+    def __init__(self) -> None:
+        # (enteros ordenados, resto); se reemplaza la tupla entera al
+        # recargar, así una lectura nunca ve uno nuevo y otro viejo.
+        self._datos: Tuple[array, Set[str]] = (array("Q"), set())
+        self.cargado = False
+        self.ultima_carga: Optional[float] = None
+        self.aciertos = Contador()
+        self.fallos = Contador()
+        self.recargas = Contador()
+        self._lock = threading.Lock()
+        # Altas hechas mientras corre una recarga: la lectura de la base
+        # pudo ser anterior a su commit, así que se reaplican al final.
+        self._altas_en_recarga: Optional[List[Any]] = None
+
+    async def recargar(self) -> None:
+        with self._lock:
+            self._altas_en_recarga = []
+        try:
+            rows = (await leer_con_reintento(
+                async_engine_convocatoria, text("SELECT documento FROM fondos_habilitados_renovar"),
+            )).fetchall()
+            datos = _construir(row.documento for row in rows)
+        except BaseException:
+            with self._lock:
+                self._altas_en_recarga = None
+            raise
+        with self._lock:
+            altas, self._altas_en_recarga = self._altas_en_recarga, None
+            self._datos = datos
+        for documento in altas:
+            self.agregar(documento)
+        self.cargado = True
+        self.ultima_carga = time.time()
+        self.recargas.incrementar()
+
+    def contiene(self, documento: str) -> bool:
+        numeros, otros = self._datos
+        documento = clave_documento(documento)
+        valor = _como_entero(documento)
+        if valor is None:
+            encontrado = documento in otros
+        else:
+            i = bisect.bisect_left(numeros, valor)
+            encontrado = i < len(numeros) and numeros[i] == valor
+        (self.aciertos if encontrado else self.fallos).incrementar()
+        return encontrado
+
+    def agregar(self, documento: Any) -> None:
+        """Alta hecha por agrega-tabla-ti (se llama después del commit)."""
+        documento = clave_documento(documento)
+        valor = _como_entero(documento)
+        with self._lock:
+            if self._altas_en_recarga is not None:
+                self._altas_en_recarga.append(documento)
+            numeros, otros = self._datos
+            if valor is None:
+                otros.add(documento)
+                return
+            i = bisect.bisect_left(numeros, valor)
+            if i == len(numeros) or numeros[i] != valor:
+                numeros.insert(i, valor)
+
+    def __len__(self) -> int:
+        numeros, otros = self._datos
+        return len(numeros) + len(otros)
+
+    def bytes_aproximados(self) -> int:
+        numeros, otros = self._datos
+        return numeros.itemsize * len(numeros) + sum(len(d) + 50 for d in otros)
+
+
+HABILITADOS_RENOVAR = IndiceHabilitados()
+
+
+async def recargar_periodicamente(intervalo: float) -> None:
+    """Tarea de fondo (se lanza en el lifespan de la app)."""
+    while True:
+        try:
+            await HABILITADOS_RENOVAR.recargar()
+        except Exception:
+            logger.exception("No se pudo recargar el índice de fondos_habilitados_renovar")
+        await asyncio.sleep(intervalo)
+
+
+def estado_habilitados_renovar() -> Dict[str, Any]:
+    h = HABILITADOS_RENOVAR
+    return {
+        "loaded": h.cargado,
+        "documents": len(h),
+        "approx_bytes": h.bytes_aproximados(),
+        "last_reload_age_seconds": round(time.time() - h.ultima_carga, 1) if h.ultima_carga else None,
+        "reloads": h.recargas.valor,
+        "found": h.aciertos.valor,
+        "not_found": h.fallos.valor,
+    }
+
+
+def lineas_prometheus() -> List[str]:
+    h = HABILITADOS_RENOVAR
+    lineas = [
+        "# HELP api_habilitados_renovar_documentos Documentos en el índice en memoria de fondos_habilitados_renovar.",
+        "# TYPE api_habilitados_renovar_documentos gauge",
+    ]
+    lineas += lineas_valor("api_habilitados_renovar_documentos", {}, len(h))
+    lineas += [
+        "# HELP api_habilitados_renovar_cargado 1 si el índice ya se cargó (si no, se consulta la base).",
+        "# TYPE api_habilitados_renovar_cargado gauge",
+    ]
+    lineas += lineas_valor("api_habilitados_renovar_cargado", {}, int(h.cargado))
+    lineas += [
+        "# HELP api_habilitados_renovar_consultas_total Consultas de existencia respondidas por el índice, por resultado.",
+        "# TYPE api_habilitados_renovar_consultas_total counter",
+    ]
+    lineas += lineas_valor("api_habilitados_renovar_consultas_total", {"resultado": "existe"}, h.aciertos.valor)
+    lineas += lineas_valor("api_habilitados_renovar_consultas_total", {"resultado": "no_existe"}, h.fallos.valor)
+    lineas += [
+        "# HELP api_habilitados_renovar_recargas_total Recargas completas del índice desde la base.",
+        "# TYPE api_habilitados_renovar_recargas_total counter",
+    ]
+    lineas += lineas_valor("api_habilitados_renovar_recargas_total", {}, h.recargas.valor)
+    return lineas
@@ -0,0 +1,211 @@
+"""
+Hashing de contraseñas en un ejecutor dedicado y acotado.
+
+verify_password del login genérico (PBKDF2-SHA256, 100k iteraciones) y el
+bcrypt de Seguimiento tardan decenas/cientos de ms de CPU cada uno. Hechos
+dentro del endpoint ocupaban un hilo del threadpool cada uno: una ráfaga de
+logins a las 8 a.m. se quedaba con todos los hilos y frenaba al resto de la
+API. Aquí corren en un pool aparte (procesos por defecto, para usar todos
+los núcleos sin pelear por el GIL) de HASH_TRABAJADORES trabajadores:
+
+- como mucho HASH_TRABAJADORES hashes en curso a la vez;
+- hasta HASH_MAX_EN_COLA esperando turno en el event loop (sin ocupar hilo);
+- si la cola está llena, o la espera pasa de HASH_ESPERA_S, 503 con
+  Retry-After en vez de encolar sin límite;
+- el turno se devuelve cuando el trabajador termina, no cuando termina el
+  request: si el cliente se va (request cancelado) el hash sigue corriendo
+  en el pool, y liberar antes dejaría entrar más trabajo que trabajadores.
+
+Los endpoints llaman a las funciones async de este módulo en lugar de las de
+security.py / security_seguimiento.py, que siguen siendo las que hacen el
+cálculo (en el proceso trabajador).
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+from . import security, security_seguimiento
+from .config import HASH_EJECUTOR, HASH_ESPERA_S, HASH_MAX_EN_COLA, HASH_TRABAJADORES
+from .metricas import Contador, Histograma, lineas_histograma, lineas_valor
+
+# Operaciones con su propio histograma de duración.
+OPERACIONES = ("pbkdf2_verificar", "pbkdf2_generar", "bcrypt_verificar", "bcrypt_generar")
+
+
+def _calentar() -> None:
+    """No-op para que el pool levante sus procesos antes del primer login."""
+
+
+class EjecutorHash:
+    def __init__(self, tipo: str, trabajadores: int, max_en_cola: int, espera_max: float):
+        self.tipo = tipo
+        self.trabajadores = max(1, trabajadores)
+        self.max_en_cola = max_en_cola
+        self.espera_max = espera_max
+        self.en_curso = 0
+        self.en_espera = 0
+        self.espera = Histograma()
+        self.duracion = {operacion: Histograma() for operacion in OPERACIONES}
+        self.rechazos = Contador()
+        self._semaforo = asyncio.Semaphore(self.trabajadores)
+        self._ejecutor: Optional[Executor] = None
+
+    def _obtener_ejecutor(self) -> Executor:
+        if self._ejecutor is None:
+            if self.tipo == "procesos":
+                # spawn y no fork: el proceso de la API ya tiene hilos (anyio,
+                # pools de conexión) y hacer fork con hilos vivos no es seguro.
+                self._ejecutor = ProcessPoolExecutor(
+                    max_workers=self.trabajadores, mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._ejecutor = ThreadPoolExecutor(max_workers=self.trabajadores, thread_name_prefix="hash")
+        return self._ejecutor
+
+    def _rechazar(self, motivo: str) -> HTTPException:
+        self.rechazos.incrementar()
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Demasiados inicios de sesión simultáneos ({motivo}); intente de nuevo en unos segundos.",
+            headers={"Retry-After": "5"},
+        )
+
+    async def ejecutar(self, operacion: str, funcion: Callable[..., Any], *args: Any) -> Any:
+        inicio = time.perf_counter()
+        if not self._semaforo.locked():
+            # Hay un trabajador libre: acquire() no suspende.
+            await self._semaforo.acquire()
+        else:
+            if self.en_espera >= self.max_en_cola:
+                raise self._rechazar("cola llena")
+            self.en_espera += 1
+            # Como en Compartimento.dependencia: asyncio.timeout() y no
+            # wait_for(), que en 3.11 puede vencer con el turno ya tomado y
+            # perderlo para siempre.
+            adquirido = False
+            try:
+                async with asyncio.timeout(self.espera_max):
+                    await self._semaforo.acquire()
+                    adquirido = True
+            except TimeoutError:
+                if adquirido:
+                    self._semaforo.release()
+                raise self._rechazar("espera agotada")
+            finally:
+                self.en_espera -= 1
+        self.espera.observar(time.perf_counter() - inicio)
+
+        self.en_curso += 1
+        inicio = time.perf_counter()
+
+        def liberar() -> None:
+            self.duracion[operacion].observar(time.perf_counter() - inicio)
+            self.en_curso -= 1
+            self._semaforo.release()
+
+        def terminado(futuro: "asyncio.Future[Any]") -> None:
+            liberar()
+            if not futuro.cancelled():
+                # Marca la excepción como leída si nadie espera el resultado.
+                futuro.exception()
+
+        try:
+            futuro = asyncio.get_running_loop().run_in_executor(self._obtener_ejecutor(), funcion, *args)
+        except BaseException:
+            # El ejecutor ya se cerró: no llegó a enviarse nada.
+            liberar()
+            raise
+        futuro.add_done_callback(terminado)
+        # shield: cancelar el request no cancela el trabajo ya enviado al
+        # pool, así que el turno se libera recién en terminado().
+        return await asyncio.shield(futuro)
+
+    async def iniciar(self) -> None:
+        """Levanta los trabajadores (se llama en el lifespan de la app)."""
+        loop = asyncio.get_running_loop()
+        ejecutor = self._obtener_ejecutor()
+        await asyncio.gather(*(loop.run_in_executor(ejecutor, _calentar) for _ in range(self.trabajadores)))
+
+    def cerrar(self) -> None:
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown(wait=False, cancel_futures=True)
+            self._ejecutor = None
+
+
+EJECUTOR_HASH = EjecutorHash(HASH_EJECUTOR, HASH_TRABAJADORES, HASH_MAX_EN_COLA, HASH_ESPERA_S)
+
+
+# ── Login genérico (tabla usuarios, PBKDF2 + sal) ───────────────────────────
+
+async def verificar_password(salt: str, stored_hash: str, provided_password: str) -> bool:
+    return await EJECUTOR_HASH.ejecutar(
+        "pbkdf2_verificar", security.verify_password, salt, stored_hash, provided_password,
+    )
+
+
+async def generar_hash_con_sal(password: str) -> Dict[str, str]:
+    return await EJECUTOR_HASH.ejecutar("pbkdf2_generar", security.hash_password_with_salt, password)
+
+
+# ── Seguimiento (usuarios_seg_proceso_mc, bcrypt) ───────────────────────────
+
+async def verificar_password_seguimiento(password: str, password_hash: str) -> bool:
+    return await EJECUTOR_HASH.ejecutar(
+        "bcrypt_verificar", security_seguimiento.verify_password, password, password_hash,
+    )
+
+
+async def generar_hash_seguimiento(password: str) -> str:
+    return await EJECUTOR_HASH.ejecutar("bcrypt_generar", security_seguimiento.hash_password, password)
+
+
+# ── Observabilidad ──────────────────────────────────────────────────────────
+
+def estado_hashing() -> Dict[str, Any]:
+    e = EJECUTOR_HASH
+    return {
+        "executor": e.tipo,
+        "workers": e.trabajadores,
+        "max_queue": e.max_en_cola,
+        "in_flight": e.en_curso,
+        "queued": e.en_espera,
+        "rejected": e.rechazos.valor,
+        "wait_seconds": e.espera.snapshot(),
+        "duration_seconds": {operacion: h.snapshot() for operacion, h in e.duracion.items()},
+    }
+
+
+def lineas_prometheus() -> List[str]:
+    e = EJECUTOR_HASH
+    lineas = [
+        "# HELP api_hash_operaciones Hashes de contraseña en curso y en espera de trabajador.",
+        "# TYPE api_hash_operaciones gauge",
+    ]
+    lineas += lineas_valor("api_hash_operaciones", {"estado": "en_curso"}, e.en_curso)
+    lineas += lineas_valor("api_hash_operaciones", {"estado": "en_espera"}, e.en_espera)
+    lineas += [
+        "# HELP api_hash_trabajadores Trabajadores del ejecutor de hashing.",
+        "# TYPE api_hash_trabajadores gauge",
+    ]
+    lineas += lineas_valor("api_hash_trabajadores", {"ejecutor": e.tipo}, e.trabajadores)
+    lineas += [
+        "# HELP api_hash_rechazos_total Hashes rechazados con 503 (cola llena o espera agotada).",
+        "# TYPE api_hash_rechazos_total counter",
+    ]
+    lineas += lineas_valor("api_hash_rechazos_total", {}, e.rechazos.valor)
+    lineas += [
+        "# HELP api_hash_espera_segundos Espera por un trabajador del ejecutor de hashing.",
+        "# TYPE api_hash_espera_segundos histogram",
+    ]
+    lineas += lineas_histograma("api_hash_espera_segundos", {}, e.espera)
+    lineas += [
+        "# HELP api_hash_duracion_segundos Duración de cada hash en el trabajador (incluye el envío al proceso).",
+        "# TYPE api_hash_duracion_segundos histogram",
+    ]
+    for operacion, histograma in e.duracion.items():
+        lineas += lineas_histograma("api_hash_duracion_segundos", {"operacion": operacion}, histograma)
+    return lineas
@@ -2,13 +2,17 @@
 Helpers para el informe de estado de un período/convenio — portados tal cual
 de app/seguimiento/ui.py (get_historial_comentarios_periodo,
 get_datos_informe_periodo, texto_fecha_estado, generar_pdf_informe).
+
+Los lectores reciben la Connection del request (ver
+database.get_conexion_analitica_lectura): un informe consolidado hace
+decenas de consultas y así todas van por un solo checkout del pool.
 """
 from datetime import date
 from typing import Any, Dict, List, Optional, Tuple
 from xml.sax.saxutils import escape as xml_escape
  
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection
  
 ROL_LABELS = {
     "ADMIN": "Administrador",
@@ -21,70 +25,67 @@ ROL_LABELS = {
 }
  
  
-def _get_actividades_periodo(engine: Engine, convenio_periodo_id: int, tipo: str) -> List[Dict[str, Any]]:
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text("""
-                SELECT ab.id AS actividad_base_id, ab.nombre, ab.subcategoria, ab.subcategoria_orden, ab.orden,
-                       ab.es_relevante, ab.tiene_fecha_limite,
-                       ac.id AS actividad_convenio_id, ac.estado, ac.porcentaje_avance, ac.ultimo_comentario,
-                       ac.ultima_actualizacion, u.nombre AS resp_nombre, u.rol AS resp_rol,
-                       ac.fecha_completado, COALESCE(ac.no_aplica, 0) AS no_aplica
-                FROM actividades_base_seg_mc ab
-                LEFT JOIN actividades_convenio_seg_mc ac
-                    ON ac.actividad_base_id = ab.id AND ac.convenio_periodo_id = :pid
-                LEFT JOIN usuarios_seg_proceso_mc u ON ac.responsable_id = u.id
-                WHERE ab.tipo = :tipo
-                ORDER BY ab.orden
-            """),
-            {"pid": convenio_periodo_id, "tipo": tipo},
-        ).mappings().all()
+def _get_actividades_periodo(conn: Connection, convenio_periodo_id: int, tipo: str) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        text("""
+            SELECT ab.id AS actividad_base_id, ab.nombre, ab.subcategoria, ab.subcategoria_orden, ab.orden,
+                   ab.es_relevante, ab.tiene_fecha_limite,
+                   ac.id AS actividad_convenio_id, ac.estado, ac.porcentaje_avance, ac.ultimo_comentario,
+                   ac.ultima_actualizacion, u.nombre AS resp_nombre, u.rol AS resp_rol,
+                   ac.fecha_completado, COALESCE(ac.no_aplica, 0) AS no_aplica
+            FROM actividades_base_seg_mc ab
+            LEFT JOIN actividades_convenio_seg_mc ac
+                ON ac.actividad_base_id = ab.id AND ac.convenio_periodo_id = :pid
+            LEFT JOIN usuarios_seg_proceso_mc u ON ac.responsable_id = u.id
+            WHERE ab.tipo = :tipo
+            ORDER BY ab.orden
+        """),
+        {"pid": convenio_periodo_id, "tipo": tipo},
+    ).mappings().all()
     return [dict(r) for r in rows]
  
  
-def _get_progreso_periodo(engine: Engine, convenio_periodo_id: int, tipo: str) -> int:
-    with engine.connect() as conn:
-        resultado = conn.execute(
-            text("""
-                SELECT ROUND(AVG(ac.porcentaje_avance), 0) AS promedio
-                FROM actividades_convenio_seg_mc ac
-                JOIN actividades_base_seg_mc ab ON ac.actividad_base_id = ab.id
-                WHERE ac.convenio_periodo_id = :pid AND ab.tipo = :tipo AND ab.es_relevante = 1
-            """),
-            {"pid": convenio_periodo_id, "tipo": tipo},
-        ).scalar()
+def _get_progreso_periodo(conn: Connection, convenio_periodo_id: int, tipo: str) -> int:
+    resultado = conn.execute(
+        text("""
+            SELECT ROUND(AVG(ac.porcentaje_avance), 0) AS promedio
+            FROM actividades_convenio_seg_mc ac
+            JOIN actividades_base_seg_mc ab ON ac.actividad_base_id = ab.id
+            WHERE ac.convenio_periodo_id = :pid AND ab.tipo = :tipo AND ab.es_relevante = 1
+        """),
+        {"pid": convenio_periodo_id, "tipo": tipo},
+    ).scalar()
     return int(resultado) if resultado is not None else 0
  
  
-def get_historial_comentarios_periodo(engine: Engine, convenio_periodo_id: int) -> Dict[int, List[Tuple]]:
-    with engine.connect() as conn:
-        registros = conn.execute(
-            text("""
-                SELECT h.actividad_convenio_id, h.fecha_cambio, h.usuario_nombre, h.comentario
-                FROM historial_actividades_seg_mc h
-                JOIN actividades_convenio_seg_mc ac ON h.actividad_convenio_id = ac.id
-                WHERE ac.convenio_periodo_id = :pid AND h.comentario IS NOT NULL AND h.comentario != ''
-                ORDER BY h.actividad_convenio_id, h.fecha_cambio DESC
-            """),
-            {"pid": convenio_periodo_id},
-        ).all()
+def get_historial_comentarios_periodo(conn: Connection, convenio_periodo_id: int) -> Dict[int, List[Tuple]]:
+    registros = conn.execute(
+        text("""
+            SELECT h.actividad_convenio_id, h.fecha_cambio, h.usuario_nombre, h.comentario
+            FROM historial_actividades_seg_mc h
+            JOIN actividades_convenio_seg_mc ac ON h.actividad_convenio_id = ac.id
+            WHERE ac.convenio_periodo_id = :pid AND h.comentario IS NOT NULL AND h.comentario != ''
+            ORDER BY h.actividad_convenio_id, h.fecha_cambio DESC
+        """),
+        {"pid": convenio_periodo_id},
+    ).all()
     historial: Dict[int, List[Tuple]] = {}
     for act_id, fecha, usuario, comentario in registros:
         historial.setdefault(act_id, []).append((fecha, usuario, comentario))
     return historial
  
  
-def get_datos_informe_periodo(engine: Engine, convenio_periodo_id: int) -> Dict[str, Any]:
+def get_datos_informe_periodo(conn: Connection, convenio_periodo_id: int) -> Dict[str, Any]:
     """
     Retorna un dict con todo lo necesario para el informe de un período:
     actividades agrupadas por tipo→subcategoría, con su historial completo de
     comentarios, y contadores de resumen por tipo. Réplica exacta de
     ui.py::get_datos_informe_periodo.
     """
-    historial = get_historial_comentarios_periodo(engine, convenio_periodo_id)
+    historial = get_historial_comentarios_periodo(conn, convenio_periodo_id)
     resultado: Dict[str, Any] = {}
     for tipo in ("ejecucion", "liquidacion", "cierre"):
-        actividades = _get_actividades_periodo(engine, convenio_periodo_id, tipo)
+        actividades = _get_actividades_periodo(conn, convenio_periodo_id, tipo)
         subcats: Dict[str, Any] = {}
         contadores = {"Completada": 0, "En curso": 0, "Pendiente": 0, "Bloqueada": 0, "Atrasada": 0, "No aplica": 0}
         for a in actividades:
@@ -138,7 +139,7 @@ def get_datos_informe_periodo(engine: Engine, convenio_periodo_id: int) -> Dict[
         resultado[tipo] = {
             "subcats": subcats,
             "contadores": contadores,
-            "pct_global": _get_progreso_periodo(engine, convenio_periodo_id, tipo),
+            "pct_global": _get_progreso_periodo(conn, convenio_periodo_id, tipo),
             "total": len(actividades),
         }
     return resultado
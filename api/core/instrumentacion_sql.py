@@ -0,0 +1,183 @@
+"""
+Tiempos por sentencia SQL, etiquetados con la ruta de FastAPI que la emitió.
+
+Se engancha a los eventos before/after_cursor_execute de cada engine (sync y
+el sync_engine de los async) y acumula, por (engine, ruta, sentencia):
+conteo, histograma de latencia y filas devueltas. Se exponen en formato
+Prometheus en /metrics.
+
+La "sentencia" se normaliza (espacios colapsados, literales y listas IN
+reemplazados por "?") para que el mismo text(...) con distintos valores
+caiga siempre en la misma serie.
+
+La ruta se toma del scope ASGI del request en curso, que guarda
+RutaActualMiddleware en un contextvar (los contextvars se propagan al
+threadpool de los endpoints sync, así que funciona igual para ambos).
+"""
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import SQL_SLOW_QUERY_MS
+from .metricas import Contador, Histograma, lineas_histograma, lineas_valor
+
+logger_lento = logging.getLogger("api.sql.lento")
+
+# Tope de series distintas: si algún día se cuela SQL armado con valores
+# literales, no queremos que la memoria crezca sin control.
+MAX_SERIES = 2000
+SIN_RUTA = "sin_ruta"
+
+_scope_actual: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("scope_actual", default=None)
+
+
+class RutaActualMiddleware:
+    """Middleware ASGI puro que deja el scope del request en un contextvar."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _scope_actual.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope_actual.reset(token)
+
+
+def ruta_actual() -> str:
+    """'METODO /plantilla/{de}/la/ruta' del request en curso, o 'sin_ruta'."""
+    scope = _scope_actual.get()
+    if scope is None:
+        return SIN_RUTA
+    # FastAPI deja la APIRoute en scope["route"] al resolver el endpoint.
+    ruta = scope.get("route")
+    return f"{scope.get('method', '')} {getattr(ruta, 'path', scope.get('path', ''))}"
+
+
+_RE_ESPACIOS = re.compile(r"\s+")
+_RE_CADENAS = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_HINTS = re.compile(r"/\*\+.*?\*/\s*")
+_RE_LISTAS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))*\s*\)")
+
+
+def normalizar_sql(sentencia: str) -> str:
+    sql = _RE_ESPACIOS.sub(" ", sentencia).strip()
+    sql = _RE_CADENAS.sub("?", sql)
+    sql = _RE_NUMEROS.sub("?", sql)
+    return _RE_LISTAS.sub("(?)", sql)
+
+
+@dataclass
+class EstadisticaSQL:
+    sql: str
+    latencia: Histograma = field(default_factory=Histograma)
+    filas: Contador = field(default_factory=Contador)
+
+
+_series: Dict[Tuple[str, str, str], EstadisticaSQL] = {}
+_lock_series = threading.Lock()
+_cache_normalizado: Dict[str, Tuple[str, str]] = {}
+
+
+def _id_sentencia(sentencia: str) -> Tuple[str, str]:
+    """(sql_id, sql_normalizado), memoizado por texto exacto de la sentencia."""
+    encontrado = _cache_normalizado.get(sentencia)
+    if encontrado is None:
+        sql = normalizar_sql(sentencia)
+        encontrado = (hashlib.sha1(sql.encode("utf-8")).hexdigest()[:10], sql)
+        if len(_cache_normalizado) < MAX_SERIES * 4:
+            _cache_normalizado[sentencia] = encontrado
+    return encontrado
+
+
+def _serie(engine: str, ruta: str, sentencia: str) -> EstadisticaSQL:
+    # El hint de MAX_EXECUTION_TIME (ver plazos.py) cambia en cada request.
+    if "/*+" in sentencia:
+        sentencia = _RE_HINTS.sub("", sentencia)
+    sql_id, sql = _id_sentencia(sentencia)
+    clave = (engine, ruta, sql_id)
+    serie = _series.get(clave)
+    if serie is None:
+        with _lock_series:
+            serie = _series.get(clave)
+            if serie is None:
+                if len(_series) >= MAX_SERIES:
+                    clave = (engine, ruta, "otros")
+                    serie = _series.setdefault(clave, EstadisticaSQL(sql="otros"))
+                else:
+                    serie = _series[clave] = EstadisticaSQL(sql=sql[:300])
+    return serie
+
+
+def _redactar(parametros: Any) -> Any:
+    if isinstance(parametros, dict):
+        return {k: "<redactado>" for k in parametros}
+    if isinstance(parametros, (list, tuple)):
+        return ["<redactado>"] * len(parametros)
+    return "<redactado>" if parametros is not None else None
+
+
+def instrumentar_engine(nombre: str, engine: Engine) -> None:
+    """Registra los listeners de tiempos SQL sobre un engine sync."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_inicios_sql", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        duracion = time.perf_counter() - conn.info["_inicios_sql"].pop()
+        ruta = ruta_actual()
+        serie = _serie(nombre, ruta, statement)
+        serie.latencia.observar(duracion)
+        filas = getattr(cursor, "rowcount", -1)
+        if filas and filas > 0:
+            serie.filas.incrementar(filas)
+        if SQL_SLOW_QUERY_MS and duracion * 1000 >= SQL_SLOW_QUERY_MS:
+            logger_lento.warning(
+                "SQL lento (%.0f ms) engine=%s ruta=%s sql=%s params=%s",
+                duracion * 1000, nombre, ruta, serie.sql, _redactar(parameters),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto_excepcion):
+        # after_cursor_execute no se dispara si la sentencia falló: se saca
+        # el inicio pendiente para no desalinear la pila de esa conexión.
+        conn = contexto_excepcion.connection
+        if conn is not None and conn.info.get("_inicios_sql"):
+            conn.info["_inicios_sql"].pop()
+
+
+def lineas_prometheus() -> List[str]:
+    with _lock_series:
+        series = list(_series.items())
+    lineas = [
+        "# HELP api_sql_duracion_segundos Latencia de cada sentencia SQL por engine y ruta.",
+        "# TYPE api_sql_duracion_segundos histogram",
+    ]
+    for (engine, ruta, sql_id), serie in series:
+        lineas += lineas_histograma(
+            "api_sql_duracion_segundos",
+            {"engine": engine, "ruta": ruta, "sql_id": sql_id, "sql": serie.sql},
+            serie.latencia,
+        )
+    lineas += [
+        "# HELP api_sql_filas_total Filas devueltas/afectadas por sentencia SQL.",
+        "# TYPE api_sql_filas_total counter",
+    ]
+    for (engine, ruta, sql_id), serie in series:
+        lineas += lineas_valor("api_sql_filas_total", {"engine": engine, "ruta": ruta, "sql_id": sql_id}, serie.filas.valor)
+    return lineas
@@ -0,0 +1,128 @@
+"""
+Límite de intentos de login por usuario y por IP (cubetas de tokens).
+
+Cada intento fallido de /auth/login o /seguimiento/auth/login cuesta un
+PBKDF2 o un bcrypt completo: un script martillando el login se come la CPU
+de la instancia y degrada todos los demás endpoints. Cada usuario y cada IP
+tienen una cubeta de RAFAGA intentos que se rellena a POR_MIN intentos por
+minuto; sin tokens en alguna de las dos, el login responde 429 con
+Retry-After sin llegar a consultar la base ni a hashear.
+
+La IP es request.client.host: el contenedor arranca uvicorn con
+--proxy-headers (ver Dockerfile), así que detrás del balanceador de Cloud
+Run ya es la del cliente real (X-Forwarded-For) y no la del proxy.
+
+Es por instancia y en memoria, como el resto de métricas: con N instancias
+el límite efectivo es hasta N veces el configurado.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from .config import (
+    LOGIN_LIMITE_IP_POR_MIN,
+    LOGIN_LIMITE_IP_RAFAGA,
+    LOGIN_LIMITE_USUARIO_POR_MIN,
+    LOGIN_LIMITE_USUARIO_RAFAGA,
+)
+from .metricas import Contador, lineas_valor
+
+# Cubetas que se guardan como mucho por tipo; las menos usadas se descartan
+# (una cubeta descartada equivale a una llena).
+MAX_CUBETAS = 50_000
+
+
+class CubetasTokens:
+    def __init__(self, rafaga: int, por_minuto: int, max_cubetas: int = MAX_CUBETAS):
+        self.rafaga = float(rafaga)
+        self.tasa = por_minuto / 60.0
+        self.max_cubetas = max_cubetas
+        self._cubetas: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _tokens(self, clave: str, ahora: float) -> float:
+        tokens, visto = self._cubetas.get(clave, (self.rafaga, ahora))
+        return min(self.rafaga, tokens + (ahora - visto) * self.tasa)
+
+    def espera(self, clave: str, ahora: float) -> float:
+        """Segundos hasta que `clave` tenga un token (0 si ya lo tiene)."""
+        faltante = 1.0 - self._tokens(clave, ahora)
+        if faltante <= 0:
+            return 0.0
+        return faltante / self.tasa if self.tasa > 0 else math.inf
+
+    def consumir(self, clave: str, ahora: float) -> None:
+        self._cubetas[clave] = (self._tokens(clave, ahora) - 1.0, ahora)
+        self._cubetas.move_to_end(clave)
+        while len(self._cubetas) > self.max_cubetas:
+            self._cubetas.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._cubetas)
+
+
+POR_USUARIO = CubetasTokens(LOGIN_LIMITE_USUARIO_RAFAGA, LOGIN_LIMITE_USUARIO_POR_MIN)
+POR_IP = CubetasTokens(LOGIN_LIMITE_IP_RAFAGA, LOGIN_LIMITE_IP_POR_MIN)
+
+PERMITIDOS: Dict[str, Contador] = {"api": Contador(), "seguimiento": Contador()}
+RECHAZOS: Dict[Tuple[str, str], Contador] = {
+    (modulo, motivo): Contador() for modulo in PERMITIDOS for motivo in ("usuario", "ip")
+}
+
+
+def limitar_login(request: Request, modulo: str, usuario: str) -> None:
+    """
+    Consume un intento de `usuario` y de la IP del request, o lanza 429. Se
+    llama al principio del endpoint de login, antes de tocar la base.
+    """
+    ahora = time.monotonic()
+    ip = request.client.host if request.client else "desconocida"
+    clave_usuario = f"{modulo}:{usuario.strip().lower()}"
+
+    espera_usuario = POR_USUARIO.espera(clave_usuario, ahora)
+    espera_ip = POR_IP.espera(ip, ahora)
+    if espera_usuario or espera_ip:
+        motivo = "usuario" if espera_usuario >= espera_ip else "ip"
+        RECHAZOS[(modulo, motivo)].incrementar()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos de inicio de sesión. Espere un momento e intente de nuevo.",
+            headers={"Retry-After": str(max(1, math.ceil(max(espera_usuario, espera_ip))))},
+        )
+
+    POR_USUARIO.consumir(clave_usuario, ahora)
+    POR_IP.consumir(ip, ahora)
+    PERMITIDOS[modulo].incrementar()
+
+
+def estado_limite_login() -> Dict[str, Any]:
+    return {
+        "per_user": {"burst": POR_USUARIO.rafaga, "per_minute": POR_USUARIO.tasa * 60, "buckets": len(POR_USUARIO)},
+        "per_ip": {"burst": POR_IP.rafaga, "per_minute": POR_IP.tasa * 60, "buckets": len(POR_IP)},
+        "allowed": {modulo: c.valor for modulo, c in PERMITIDOS.items()},
+        "rejected": {f"{modulo}:{motivo}": c.valor for (modulo, motivo), c in RECHAZOS.items()},
+    }
+
+
+def lineas_prometheus() -> List[str]:
+    lineas = [
+        "# HELP api_login_intentos_total Intentos de login que pasaron el límite, por módulo.",
+        "# TYPE api_login_intentos_total counter",
+    ]
+    for modulo, c in PERMITIDOS.items():
+        lineas += lineas_valor("api_login_intentos_total", {"modulo": modulo}, c.valor)
+    lineas += [
+        "# HELP api_login_limitados_total Intentos de login rechazados con 429, por módulo y cubeta agotada.",
+        "# TYPE api_login_limitados_total counter",
+    ]
+    for (modulo, motivo), c in RECHAZOS.items():
+        lineas += lineas_valor("api_login_limitados_total", {"modulo": modulo, "motivo": motivo}, c.valor)
+    lineas += [
+        "# HELP api_login_cubetas Cubetas de intentos de login en memoria.",
+        "# TYPE api_login_cubetas gauge",
+    ]
+    lineas += lineas_valor("api_login_cubetas", {"clave": "usuario"}, len(POR_USUARIO))
+    lineas += lineas_valor("api_login_cubetas", {"clave": "ip"}, len(POR_IP))
+    return lineas
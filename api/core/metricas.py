@@ -0,0 +1,89 @@
+"""
+Primitivas de métricas en memoria (contadores e histogramas acumulativos)
+para los endpoints internos de observabilidad. Sin dependencias externas:
+cada instancia de Cloud Run lleva sus propios números desde que arrancó.
+"""
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Buckets en segundos, estilo Prometheus: desde 1 ms hasta 30 s.
+BUCKETS_SEGUNDOS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histograma:
+    """Histograma acumulativo thread-safe (count, sum y conteo por bucket)."""
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS_SEGUNDOS):
+        self.buckets = tuple(sorted(buckets))
+        self._conteos = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self._suma = 0.0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float) -> None:
+        indice = len(self.buckets)
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                indice = i
+                break
+        with self._lock:
+            self._conteos[indice] += 1
+            self._suma += valor
+            self._total += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            conteos = list(self._conteos)
+            suma, total = self._suma, self._total
+        acumulado = 0
+        buckets: Dict[str, int] = {}
+        for limite, conteo in zip(self.buckets, conteos):
+            acumulado += conteo
+            buckets[repr(limite)] = acumulado
+        buckets["+Inf"] = total
+        return {"count": total, "sum": round(suma, 6), "buckets": buckets}
+
+
+class Contador:
+    """Contador monotónico thread-safe."""
+
+    def __init__(self) -> None:
+        self._valor = 0
+        self._lock = threading.Lock()
+
+    def incrementar(self, cantidad: int = 1) -> None:
+        with self._lock:
+            self._valor += cantidad
+
+    @property
+    def valor(self) -> int:
+        return self._valor
+
+
+# ── Formato de exposición de Prometheus ─────────────────────────────────────
+
+def _escapar(valor: object) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def formatear_etiquetas(etiquetas: Dict[str, object]) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items()) + "}"
+
+
+def lineas_valor(nombre: str, etiquetas: Dict[str, object], valor: float) -> List[str]:
+    return [f"{nombre}{formatear_etiquetas(etiquetas)} {valor}"]
+
+
+def lineas_histograma(nombre: str, etiquetas: Dict[str, object], histograma: "Histograma") -> List[str]:
+    snap = histograma.snapshot()
+    lineas = [
+        f"{nombre}_bucket{formatear_etiquetas({**etiquetas, 'le': le})} {conteo}"
+        for le, conteo in snap["buckets"].items()
+    ]
+    lineas.append(f"{nombre}_sum{formatear_etiquetas(etiquetas)} {snap['sum']}")
+    lineas.append(f"{nombre}_count{formatear_etiquetas(etiquetas)} {snap['count']}")
+    return lineas
@@ -0,0 +1,111 @@
+"""
+Plazo (time budget) por endpoint para las consultas SQL.
+
+Consultas abiertas como obtener_vista_giros con filtros contains() o
+get_reintegros con LIKE por beneficiario pueden tardar decenas de segundos y
+ocupar una conexión del pool todo ese tiempo. Un endpoint declara su plazo
+como dependencia:
+
+    @router.get("/...", dependencies=[Depends(plazo(8))])
+
+y cada SELECT que se ejecute durante ese request (en cualquier engine MySQL,
+sync o async) sale con el hint /*+ MAX_EXECUTION_TIME(ms) */ por el tiempo
+que le queda al presupuesto, así que MySQL la corta solo. Si se corta (error
+3024) o el presupuesto ya estaba agotado antes de lanzarla, el request
+responde 504 con el tiempo transcurrido.
+
+MAX_EXECUTION_TIME solo aplica a SELECT; las escrituras no se tocan.
+"""
+import contextvars
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Error de MySQL "Query execution was interrupted, maximum statement
+# execution time exceeded".
+ER_QUERY_TIMEOUT = 3024
+
+_RE_SELECT = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+
+@dataclass
+class Plazo:
+    segundos: float
+    inicio: float
+
+    def transcurrido(self) -> float:
+        return time.perf_counter() - self.inicio
+
+    def restante_ms(self) -> int:
+        return int((self.segundos - self.transcurrido()) * 1000)
+
+
+class PlazoExcedido(Exception):
+    """El presupuesto del request se agotó antes de lanzar la consulta."""
+
+
+_plazo_actual: contextvars.ContextVar[Optional[Plazo]] = contextvars.ContextVar("plazo_actual", default=None)
+
+
+def plazo(segundos: float) -> Callable:
+    """Dependencia que fija el presupuesto de tiempo SQL del request."""
+
+    async def dependencia():
+        actual = Plazo(segundos=segundos, inicio=time.perf_counter())
+        token = _plazo_actual.set(actual)
+        try:
+            yield
+        except Exception as e:
+            # Los endpoints suelen envolver todo en HTTPException(500); el
+            # error original queda en la cadena __cause__/__context__.
+            if _es_plazo_excedido(e):
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail=(
+                        f"La consulta superó el plazo de {segundos:g} s "
+                        f"(transcurrido: {actual.transcurrido():.2f} s). Acote los filtros."
+                    ),
+                )
+            raise
+        finally:
+            _plazo_actual.reset(token)
+
+    return dependencia
+
+
+def _es_plazo_excedido(error: Optional[BaseException]) -> bool:
+    vistos = set()
+    while error is not None and id(error) not in vistos:
+        vistos.add(id(error))
+        if isinstance(error, PlazoExcedido):
+            return True
+        original = getattr(error, "orig", None)
+        if original is not None:
+            codigo = getattr(original, "errno", None)
+            if codigo is None and original.args and isinstance(original.args[0], int):
+                codigo = original.args[0]
+            if codigo == ER_QUERY_TIMEOUT:
+                return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def aplicar_plazos(engine: Engine) -> None:
+    """Agrega el hint MAX_EXECUTION_TIME a los SELECT de requests con plazo."""
+    if engine.dialect.name != "mysql":
+        return
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _hint(conn, cursor, statement, parameters, context, executemany):
+        actual = _plazo_actual.get()
+        if actual is None or not _RE_SELECT.match(statement):
+            return statement, parameters
+        restante = actual.restante_ms()
+        if restante <= 0:
+            raise PlazoExcedido()
+        return _RE_SELECT.sub(f"SELECT /*+ MAX_EXECUTION_TIME({restante}) */", statement, count=1), parameters
@@ -7,16 +7,18 @@ usuarios_seg_proceso_mc usa bcrypt — exactamente como ya lo hacía la app
 Streamlit — y son dos universos de usuarios distintos.
 
 create_token()/decode_token() de api/core/security.py SÍ se reutilizan tal
-cual (son JWT genéricos); aquí solo se agrega el claim "modulo": "seguimiento"
+cual (son JWT genéricos; decode_token a través del caché de
+api/core/cache_tokens.py); aquí solo se agrega el claim "modulo": "seguimiento"
 para que un token de este módulo no sirva para autorizar los endpoints del
 login genérico de la API, ni viceversa.
 """
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import bcrypt
 from fastapi import HTTPException, status
 
-from api.core.security import create_token, decode_token
+from api.core.cache_tokens import decodificar_token
+from api.core.security import create_token
 
 MODULO_CLAIM = "seguimiento"
 
@@ -32,18 +34,24 @@ def verify_password(password: str, password_hash: str) -> bool:
         return False
 
 
-def create_token_seguimiento(usuario_id: int, usuario: str, nombre: str, rol: str) -> str:
-    return create_token({
+def create_token_seguimiento(
+    usuario_id: int, usuario: str, nombre: str, rol: str, version_password: Optional[str] = None,
+) -> str:
+    payload = {
         "modulo": MODULO_CLAIM,
         "usuario_id": usuario_id,
         "usuario": usuario,
         "nombre": nombre,
         "rol": rol,
-    })
+    }
+    if version_password is not None:
+        # Ver api/core/estado_usuarios.py: revoca el token si la contraseña cambia.
+        payload["pwv"] = version_password
+    return create_token(payload)
 
 
 def decode_token_seguimiento(token: str) -> Dict[str, Any]:
-    data = decode_token(token)
+    data = decodificar_token(token)
     if data.get("modulo") != MODULO_CLAIM:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
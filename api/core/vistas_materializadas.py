@@ -0,0 +1,419 @@
+"""
+Copias materializadas (tablas indexadas) de las vistas pesadas de reportes.
+
+vw_giros_general_historico_ies y las vistas de Matrícula Cero las arma
+MySQL en cada consulta (JOINs sobre las tablas base, sin índices propios)
+aunque cambian pocas veces al día. Para las vistas de VISTAS_MATERIALIZADAS
+se mantiene una copia en una tabla normal de la misma base, con índices
+para los filtros de los endpoints:
+
+- Reconstrucción completa cada VISTAS_MATERIALIZADAS_RECONSTRUCCION_S: se
+  crea una tabla nueva, snap_<vista>_<generación>, con las columnas de la
+  vista más fila_id (autoincremental, único por fila: desempata órdenes que
+  en la vista no son totales); se llena con INSERT ... SELECT y después se
+  le crean los índices.
+  El cambio a la nueva es atómico: es actualizar la fila de la vista en la
+  tabla de estado (vistas_materializadas). La generación anterior se borra
+  en la reconstrucción siguiente, cuando ya ninguna instancia la lee.
+- Refresco incremental cada VISTAS_MATERIALIZADAS_INTERVALO_S, en las
+  vistas con fecha_registro: en una transacción se borran de la copia las
+  filas desde su fecha_registro más reciente y se vuelven a traer de la
+  vista desde ahí (así entran también las registradas en el mismo segundo
+  que la última copiada). Los cambios a filas ya copiadas (un giro que
+  cambia de estado), las borradas y las que no tienen fecha_registro solo
+  se ven en la reconstrucción siguiente.
+- Con varias instancias, una sola refresca cada vista a la vez (GET_LOCK de
+  MySQL); todas leen la tabla de estado para saber cuál es la copia
+  vigente y de cuándo es.
+- fuente()/tabla() es lo que usan los routers: la copia si está dentro de
+  la antigüedad máxima de su vista (VISTAS_MATERIALIZADAS_MAX_ANTIGUEDAD_S),
+  la vista si no hay copia, si los refrescos están fallando o si quedó
+  vieja. Se decide en memoria, sin consultar la base.
+
+La antigüedad se mide desde que empezó el último refresco exitoso, con el
+reloj de la instancia que lo hizo. El usuario de cada base necesita
+permisos de CREATE, DROP, INSERT y DELETE para las copias y la tabla de
+estado.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import BigInteger, Column, Double, Index, Integer, MetaData, String, Table, Text, text
+from sqlalchemy import delete, func, insert, inspect, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.sql.expression import ColumnElement
+
+from .config import (
+    VISTAS_MATERIALIZADAS,
+    VISTAS_MATERIALIZADAS_MAX_ANTIGUEDAD_S,
+    VISTAS_MATERIALIZADAS_RECONSTRUCCION_S,
+)
+from .database_async import async_engine_convocatoria, async_engine_dtf_financiera
+from .metricas import Contador, lineas_valor
+
+logger = logging.getLogger("api.vistas_materializadas")
+
+# Largo de los índices sobre columnas TEXT en MySQL (no admite índices sin
+# largo sobre ellas); 191 caracteres utf8mb4 caben en el límite de InnoDB.
+_LARGO_INDICE_TEXTO = 191
+
+# Columna que las copias agregan a las de la vista. En SQLite solo INTEGER
+# PRIMARY KEY es autoincremental.
+COLUMNA_FILA = "fila_id"
+_TIPO_FILA = BigInteger().with_variant(Integer, "sqlite")
+
+_ESTADO = Table(
+    "vistas_materializadas",
+    MetaData(),
+    Column("vista", String(64), primary_key=True),
+    Column("generacion", Integer, nullable=False),
+    Column("reconstruida_en", Double, nullable=False),
+    Column("actualizada_en", Double, nullable=False),
+    Column("filas", BigInteger, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class EstadoCopia:
+    generacion: int
+    reconstruida_en: float
+    actualizada_en: float
+    filas: int
+
+
+class VistaMaterializada:
+    def __init__(
+        self,
+        nombre: str,
+        engine: AsyncEngine,
+        columna_incremental: Optional[str],
+        indices: Sequence[Tuple[str, ...]],
+        max_antiguedad_s: int,
+    ):
+        self.nombre = nombre
+        self.engine = engine
+        self.columna_incremental = columna_incremental
+        self.indices = indices
+        self.max_antiguedad_s = max_antiguedad_s
+        # Se reemplaza entero al leer la tabla de estado.
+        self.vigente: Optional[EstadoCopia] = None
+        # Si la copia vigente tiene COLUMNA_FILA (las creadas antes de que
+        # existiera no); se actualiza junto con vigente.
+        self.con_fila = False
+        self.ultima_duracion_s: Optional[float] = None
+        self.reconstrucciones = Contador()
+        self.incrementales = Contador()
+        self.errores = Contador()
+        self.lecturas_copia = Contador()
+        self.lecturas_vista = Contador()
+        # (nombre de la copia, Table) para tabla(); solo la vigente.
+        self._tabla: Optional[Tuple[str, Table]] = None
+
+    def tabla_copia(self, generacion: int) -> str:
+        return f"snap_{self.nombre}_{generacion}"
+
+    def fuente(self) -> str:
+        vigente = self.vigente
+        if vigente is not None and time.time() - vigente.actualizada_en <= self.max_antiguedad_s:
+            self.lecturas_copia.incrementar()
+            return self.tabla_copia(vigente.generacion)
+        self.lecturas_vista.incrementar()
+        return self.nombre
+
+    def tabla(self, vista: Table) -> Table:
+        nombre = self.fuente()
+        if nombre == vista.name:
+            return vista
+        actual = self._tabla
+        if actual is None or actual[0] != nombre:
+            copia = vista.to_metadata(MetaData(), name=nombre)
+            copia.info[COLUMNA_FILA] = self.con_fila
+            actual = (nombre, copia)
+            self._tabla = actual
+        return actual[1]
+
+
+# Índices de cada copia: los filtros de los endpoints que la leen, más la
+# columna incremental (el refresco borra e inserta por ella). El de
+# (documento, fecha_registro, solicitud, fila_id) es el orden de
+# /vw-giros-general/pagina/.
+_REGISTRO = {
+    "vw_giros_general_historico_ies": (
+        async_engine_dtf_financiera,
+        "fecha_registro",
+        (
+            ("documento", "periodo_academico"),
+            ("documento", "fecha_registro", "solicitud", COLUMNA_FILA),
+            ("fondo",),
+            ("ies",),
+            ("fecha_registro",),
+        ),
+    ),
+    "vw_matricula_cero_2025_2": (async_engine_convocatoria, "fecha_registro", (("documento",), ("fecha_registro",))),
+    "vw_matricula_cero_2026_2": (async_engine_convocatoria, "fecha_registro", (("documento",), ("fecha_registro",))),
+}
+
+
+def _crear_vistas(nombres: Sequence[str]) -> Dict[str, VistaMaterializada]:
+    desconocidas = [n for n in nombres if n not in _REGISTRO]
+    if desconocidas:
+        raise ValueError(
+            f"VISTAS_MATERIALIZADAS: {', '.join(desconocidas)} no se puede(n) materializar "
+            f"(disponibles: {', '.join(_REGISTRO)})"
+        )
+    vistas = {}
+    for nombre in nombres:
+        engine, columna, indices = _REGISTRO[nombre]
+        vistas[nombre] = VistaMaterializada(nombre, engine, columna, indices, VISTAS_MATERIALIZADAS_MAX_ANTIGUEDAD_S[nombre])
+    return vistas
+
+
+VISTAS = _crear_vistas(VISTAS_MATERIALIZADAS)
+
+
+def fuente(vista: str) -> str:
+    """Nombre de la tabla de la que leer `vista` (su copia o ella misma), para SQL armado a mano."""
+    v = VISTAS.get(vista)
+    return v.fuente() if v is not None else vista
+
+
+def tabla(vista: Table) -> Table:
+    """Como fuente(), para consultas Core: la Table de la copia, con las mismas columnas."""
+    v = VISTAS.get(vista.name)
+    return v.tabla(vista) if v is not None else vista
+
+
+def columna_fila(vista: Table) -> Optional[ColumnElement]:
+    """COLUMNA_FILA si `vista` es una copia que la tiene (de tabla()); None si es la vista.
+
+    No es parte de vista.c (select(*vista.c) sigue trayendo solo las de la
+    vista): se nombra sin tabla, así que sirve en consultas de una sola.
+    """
+    if not vista.info.get(COLUMNA_FILA):
+        return None
+    return literal_column(COLUMNA_FILA, _TIPO_FILA)
+
+
+# ── Refresco ────────────────────────────────────────────────────────────────
+
+@asynccontextmanager
+async def _candado(v: VistaMaterializada) -> AsyncIterator[bool]:
+    """True si esta instancia es la que refresca `v` ahora."""
+    if v.engine.dialect.name != "mysql":
+        # SQLite (banco local): una sola instancia.
+        yield True
+        return
+    nombre = f"api.vistas_materializadas.{v.nombre}"
+    async with v.engine.connect() as conexion:
+        tomado = bool(await conexion.scalar(text("SELECT GET_LOCK(:nombre, 0)"), {"nombre": nombre}))
+        try:
+            yield tomado
+        finally:
+            if tomado:
+                await conexion.execute(text("SELECT RELEASE_LOCK(:nombre)"), {"nombre": nombre})
+
+
+async def _leer_estado(conexion: AsyncConnection, v: VistaMaterializada) -> Optional[EstadoCopia]:
+    fila = (await conexion.execute(select(_ESTADO).where(_ESTADO.c.vista == v.nombre))).mappings().first()
+    if fila is None:
+        return None
+    return EstadoCopia(fila["generacion"], fila["reconstruida_en"], fila["actualizada_en"], fila["filas"])
+
+
+async def _guardar_estado(conexion: AsyncConnection, v: VistaMaterializada, estado: EstadoCopia) -> None:
+    await conexion.execute(delete(_ESTADO).where(_ESTADO.c.vista == v.nombre))
+    await conexion.execute(insert(_ESTADO).values(
+        vista=v.nombre,
+        generacion=estado.generacion,
+        reconstruida_en=estado.reconstruida_en,
+        actualizada_en=estado.actualizada_en,
+        filas=estado.filas,
+    ))
+
+
+async def _columnas_vista(conexion: AsyncConnection, v: VistaMaterializada) -> Table:
+    return await conexion.run_sync(lambda c: Table(v.nombre, MetaData(), autoload_with=c))
+
+
+async def _tiene_fila(conexion: AsyncConnection, v: VistaMaterializada, estado: EstadoCopia) -> bool:
+    columnas = await conexion.run_sync(lambda c: inspect(c).get_columns(v.tabla_copia(estado.generacion)))
+    return any(c["name"] == COLUMNA_FILA for c in columnas)
+
+
+def _indices(v: VistaMaterializada, copia: Table) -> List[Index]:
+    indices = []
+    for i, columnas in enumerate(v.indices):
+        opciones = {}
+        texto = {c: _LARGO_INDICE_TEXTO for c in columnas if isinstance(copia.c[c].type, Text)}
+        if texto:
+            opciones["mysql_length"] = texto
+        indices.append(Index(f"ix_{copia.name}_{i}", *(copia.c[c] for c in columnas), **opciones))
+    return indices
+
+
+def _engine_refresco(v: VistaMaterializada) -> AsyncEngine:
+    # En REPEATABLE READ, INSERT ... SELECT deja un lock compartido en cada
+    # fila que lee de las tablas base: las escrituras sobre ellas esperarían
+    # a que termine la reconstrucción.
+    if v.engine.dialect.name == "mysql":
+        return v.engine.execution_options(isolation_level="READ COMMITTED")
+    return v.engine
+
+
+async def _reconstruir(v: VistaMaterializada, anterior: Optional[EstadoCopia]) -> None:
+    inicio = time.time()
+    generacion = anterior.generacion + 1 if anterior is not None else 1
+    async with _engine_refresco(v).begin() as conexion:
+        vista = await _columnas_vista(conexion, v)
+        copia = Table(
+            v.tabla_copia(generacion),
+            MetaData(),
+            Column(COLUMNA_FILA, _TIPO_FILA, primary_key=True, autoincrement=True),
+            *(Column(c.name, c.type) for c in vista.columns),
+        )
+        # Resto de una reconstrucción que falló a mitad de camino.
+        await conexion.run_sync(lambda c: copia.drop(c, checkfirst=True))
+        await conexion.run_sync(copia.create)
+        resultado = await conexion.execute(insert(copia).from_select(list(vista.c.keys()), select(*vista.c)))
+        # Después de llenarla: crear los índices de una vez es más rápido
+        # que mantenerlos fila por fila.
+        for indice in _indices(v, copia):
+            await conexion.run_sync(indice.create)
+    async with v.engine.begin() as conexion:
+        await _guardar_estado(conexion, v, EstadoCopia(generacion, inicio, inicio, resultado.rowcount))
+    if generacion > 2:
+        async with v.engine.begin() as conexion:
+            vieja = v.tabla_copia(generacion - 2)
+            await conexion.exec_driver_sql(f"DROP TABLE IF EXISTS {conexion.dialect.identifier_preparer.quote(vieja)}")
+    v.reconstrucciones.incrementar()
+
+
+async def _refrescar_incremental(v: VistaMaterializada, anterior: EstadoCopia) -> None:
+    inicio = time.time()
+    async with _engine_refresco(v).begin() as conexion:
+        vista = await _columnas_vista(conexion, v)
+        # Sin COLUMNA_FILA: la base le asigna una nueva a cada fila insertada.
+        copia = vista.to_metadata(MetaData(), name=v.tabla_copia(anterior.generacion))
+        columna = v.columna_incremental
+        marca = await conexion.scalar(select(func.max(copia.c[columna])))
+        borrar = delete(copia)
+        traer = select(*vista.c)
+        if marca is not None:
+            borrar = borrar.where(copia.c[columna] >= marca)
+            traer = traer.where(vista.c[columna] >= marca)
+        borradas = (await conexion.execute(borrar)).rowcount
+        insertadas = (await conexion.execute(insert(copia).from_select(list(vista.c.keys()), traer))).rowcount
+        await _guardar_estado(conexion, v, EstadoCopia(
+            anterior.generacion, anterior.reconstruida_en, inicio, anterior.filas - borradas + insertadas,
+        ))
+    v.incrementales.incrementar()
+
+
+async def refrescar(v: VistaMaterializada, intervalo: float) -> None:
+    """Reconstruye o refresca la copia de `v` si le toca a esta instancia, y relee su estado."""
+    async with v.engine.begin() as conexion:
+        await conexion.run_sync(lambda c: _ESTADO.create(c, checkfirst=True))
+    async with _candado(v) as tomado:
+        if tomado:
+            async with v.engine.connect() as conexion:
+                estado = await _leer_estado(conexion, v)
+                # Una copia de antes de COLUMNA_FILA se reemplaza ya.
+                vieja = estado is not None and not await _tiene_fila(conexion, v, estado)
+            ahora = time.time()
+            inicio = time.perf_counter()
+            if (
+                estado is None
+                or vieja
+                or v.columna_incremental is None
+                or ahora - estado.reconstruida_en >= VISTAS_MATERIALIZADAS_RECONSTRUCCION_S
+            ):
+                await _reconstruir(v, estado)
+                v.ultima_duracion_s = time.perf_counter() - inicio
+            # Si otra instancia la acaba de refrescar, se espera al siguiente.
+            elif ahora - estado.actualizada_en >= intervalo / 2:
+                await _refrescar_incremental(v, estado)
+                v.ultima_duracion_s = time.perf_counter() - inicio
+    async with v.engine.connect() as conexion:
+        vigente = await _leer_estado(conexion, v)
+        if vigente is None:
+            con_fila = False
+        elif v.vigente is not None and v.vigente.generacion == vigente.generacion:
+            con_fila = v.con_fila
+        else:
+            con_fila = await _tiene_fila(conexion, v, vigente)
+    v.vigente, v.con_fila = vigente, con_fila
+
+
+async def refrescar_periodicamente(intervalo: float) -> None:
+    """Tarea de fondo (se lanza en el lifespan de la app si hay vistas en VISTAS_MATERIALIZADAS)."""
+    while True:
+        for v in VISTAS.values():
+            try:
+                await refrescar(v, intervalo)
+            except Exception:
+                v.errores.incrementar()
+                logger.exception("No se pudo refrescar la copia de %s", v.nombre)
+        await asyncio.sleep(intervalo)
+
+
+def estado_vistas_materializadas() -> Dict[str, Any]:
+    ahora = time.time()
+    vistas: Dict[str, Any] = {}
+    for v in VISTAS.values():
+        vigente = v.vigente
+        antiguedad = ahora - vigente.actualizada_en if vigente is not None else None
+        vistas[v.nombre] = {
+            "table": v.tabla_copia(vigente.generacion) if vigente is not None else None,
+            "in_use": antiguedad is not None and antiguedad <= v.max_antiguedad_s,
+            "age_seconds": round(antiguedad, 1) if antiguedad is not None else None,
+            "max_age_seconds": v.max_antiguedad_s,
+            "rows": vigente.filas if vigente is not None else None,
+            "last_rebuild_age_seconds": round(ahora - vigente.reconstruida_en, 1) if vigente is not None else None,
+            "last_refresh_seconds": round(v.ultima_duracion_s, 3) if v.ultima_duracion_s is not None else None,
+            "rebuilds": v.reconstrucciones.valor,
+            "incremental_refreshes": v.incrementales.valor,
+            "errors": v.errores.valor,
+            "reads_from_snapshot": v.lecturas_copia.valor,
+            "reads_from_view": v.lecturas_vista.valor,
+        }
+    return {"views": vistas}
+
+
+def lineas_prometheus() -> List[str]:
+    ahora = time.time()
+    lineas = [
+        "# HELP api_vistas_materializadas_antiguedad_segundos Segundos desde el último refresco de la copia de cada vista.",
+        "# TYPE api_vistas_materializadas_antiguedad_segundos gauge",
+    ]
+    for v in VISTAS.values():
+        if v.vigente is not None:
+            lineas += lineas_valor(
+                "api_vistas_materializadas_antiguedad_segundos", {"vista": v.nombre}, round(ahora - v.vigente.actualizada_en, 1),
+            )
+    lineas += [
+        "# HELP api_vistas_materializadas_filas Filas en la copia vigente de cada vista.",
+        "# TYPE api_vistas_materializadas_filas gauge",
+    ]
+    for v in VISTAS.values():
+        if v.vigente is not None:
+            lineas += lineas_valor("api_vistas_materializadas_filas", {"vista": v.nombre}, v.vigente.filas)
+    lineas += [
+        "# HELP api_vistas_materializadas_refrescos_total Refrescos de las copias por tipo (los errores, de cualquiera).",
+        "# TYPE api_vistas_materializadas_refrescos_total counter",
+    ]
+    for v in VISTAS.values():
+        lineas += lineas_valor("api_vistas_materializadas_refrescos_total", {"vista": v.nombre, "tipo": "completo"}, v.reconstrucciones.valor)
+        lineas += lineas_valor("api_vistas_materializadas_refrescos_total", {"vista": v.nombre, "tipo": "incremental"}, v.incrementales.valor)
+        lineas += lineas_valor("api_vistas_materializadas_refrescos_total", {"vista": v.nombre, "tipo": "error"}, v.errores.valor)
+    lineas += [
+        "# HELP api_vistas_materializadas_lecturas_total Consultas de los endpoints por origen (copia o vista).",
+        "# TYPE api_vistas_materializadas_lecturas_total counter",
+    ]
+    for v in VISTAS.values():
+        lineas += lineas_valor("api_vistas_materializadas_lecturas_total", {"vista": v.nombre, "origen": "copia"}, v.lecturas_copia.valor)
+        lineas += lineas_valor("api_vistas_materializadas_lecturas_total", {"vista": v.nombre, "origen": "vista"}, v.lecturas_vista.valor)
+    return lineas
@@ -0,0 +1,164 @@
+"""
+Vitalidad de las conexiones del pool sin pool_pre_ping (DB_LIVENESS=validacion).
+
+pool_pre_ping hace un SELECT 1 en cada checkout, o sea un round trip extra
+por request contra MySQL. En los engines async (database_async.py), en su
+lugar:
+
+- pool_recycle (por engine, ver config._build_pool_settings) descarta las
+  conexiones antes de que el servidor las cierre por wait_timeout. Al
+  arrancar se compara contra el @@wait_timeout real y se avisa en el log si
+  quedó por encima.
+- validar_ociosas_periodicamente() recorre en segundo plano las conexiones
+  que llevan más de DB_VALIDACION_OCIOSA_S sin usarse (las que un
+  firewall/NAT intermedio pudo cortar) y les hace ping; las caídas se
+  invalidan para que el pool abra otra la próxima vez.
+- leer_con_reintento() ejecuta una lectura idempotente y, si igual se
+  encontró con una conexión caída, la reintenta UNA vez con otra conexión.
+  Solo para SELECTs: una escritura no se puede repetir a ciegas.
+
+Los engines sync (database.py) siguen con pool_pre_ping: sus lecturas no
+tienen reintento, y la validación de fondo los saltea.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, Result
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.util import greenlet_spawn
+from sqlalchemy.util.queue import Empty
+
+from .metricas import Contador
+
+logger = logging.getLogger("api.db.vitalidad")
+
+VALIDADAS: Dict[str, Contador] = {}
+INVALIDADAS: Dict[str, Contador] = {}
+REINTENTOS: Dict[str, Contador] = {}
+
+_nombres: Dict[int, str] = {}
+
+# Clave en connection_record.info (persiste mientras viva la conexión DBAPI).
+_ULTIMO_USO = "ultimo_uso"
+
+
+def registrar_vitalidad(nombre: str, engine: Engine) -> None:
+    """Marca en cada checkin desde cuándo está ociosa la conexión."""
+    VALIDADAS.setdefault(nombre, Contador())
+    INVALIDADAS.setdefault(nombre, Contador())
+    REINTENTOS.setdefault(nombre, Contador())
+    _nombres[id(engine)] = nombre
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        if connection_record is None:
+            return
+        connection_record.info[_ULTIMO_USO] = time.monotonic()
+
+
+def _validar_ociosas(nombre: str, engine: Engine, antiguedad: float) -> None:
+    """
+    Hace ping a las conexiones libres que llevan más de `antiguedad` segundos
+    sin usarse. Saca cada una directo de la cola del pool y la vuelve a poner
+    al final: no pasa por pool.connect(), así que no cuenta como checkout en
+    las métricas (clase_pool_medida), no dispara eventos, y nunca abre ni
+    recicla conexiones; si la cola se vacía (hay tráfico), termina. La cola
+    es FIFO, así que una vuelta recorre las que estaban.
+    """
+    pool = engine.pool
+    cola = pool._pool
+    ahora = time.monotonic()
+    for _ in range(pool.checkedin()):
+        try:
+            registro = cola.get_nowait()
+        except Empty:
+            return
+        try:
+            ultimo_uso = registro.info.get(_ULTIMO_USO)
+            if registro.dbapi_connection is None or ultimo_uso is None or ahora - ultimo_uso < antiguedad:
+                continue
+            try:
+                engine.dialect.do_ping(registro.dbapi_connection)
+                VALIDADAS[nombre].incrementar()
+            except Exception:
+                INVALIDADAS[nombre].incrementar()
+                logger.info("Conexión ociosa caída en %s; se invalida", nombre)
+                # Cierra la conexión DBAPI; el próximo checkout del registro
+                # abre otra.
+                registro.invalidate()
+        finally:
+            cola.put_nowait(registro)
+
+
+def _verificar_recycle(nombre: str, engine: Engine) -> None:
+    if engine.dialect.name != "mysql":
+        return
+    with engine.connect() as conn:
+        wait_timeout = conn.execute(text("SELECT @@SESSION.wait_timeout")).scalar()
+    recycle = engine.pool._recycle
+    if wait_timeout and (recycle < 0 or recycle >= int(wait_timeout)):
+        logger.warning(
+            "pool_recycle de %s (%ss) no queda por debajo del wait_timeout del servidor (%ss): "
+            "sin pre_ping el pool puede entregar conexiones ya cerradas por MySQL",
+            nombre, recycle, wait_timeout,
+        )
+
+
+async def _en_segundo_plano(engine: Engine, funcion, *args) -> None:
+    # Los engines async (aiomysql) necesitan contexto greenlet para usar su
+    # pool desde código sync; los sync van a un hilo para no frenar el loop.
+    if engine.dialect.is_async:
+        await greenlet_spawn(funcion, *args)
+    else:
+        await asyncio.to_thread(funcion, *args)
+
+
+async def validar_ociosas_periodicamente(engines: Dict[str, Engine], intervalo: float, antiguedad: float) -> None:
+    """Tarea de fondo (se lanza en el lifespan de la app); saltea los engines con pre_ping."""
+    for nombre, engine in list(engines.items()):
+        if engine.pool._pre_ping:
+            continue
+        try:
+            await _en_segundo_plano(engine, _verificar_recycle, nombre, engine)
+        except Exception:
+            logger.warning("No se pudo leer el wait_timeout de %s", nombre, exc_info=True)
+
+    while True:
+        await asyncio.sleep(intervalo)
+        for nombre, engine in list(engines.items()):
+            if engine.pool._pre_ping:
+                continue
+            try:
+                await _en_segundo_plano(engine, _validar_ociosas, nombre, engine, antiguedad)
+            except Exception:
+                logger.exception("Falló la validación de conexiones ociosas de %s", nombre)
+
+
+async def leer_con_reintento(
+    engine: AsyncEngine,
+    sentencia: Any,
+    parametros: Optional[Mapping[str, Any]] = None,
+) -> Result:
+    """
+    Ejecuta una lectura en una conexión propia y devuelve el resultado ya
+    bufferizado (se puede recorrer después de soltar la conexión). Si falla
+    porque la conexión estaba caída (SQLAlchemy la marca connection_invalidated
+    e invalida el resto del pool), se reintenta una sola vez.
+    """
+    try:
+        async with engine.connect() as conn:
+            return await conn.execute(sentencia, parametros)
+    except DBAPIError as e:
+        if not e.connection_invalidated:
+            raise
+        nombre = _nombres.get(id(engine.sync_engine), "desconocido")
+        if nombre in REINTENTOS:
+            REINTENTOS[nombre].incrementar()
+        logger.info("Conexión caída en %s; se reintenta la lectura una vez", nombre)
+
+    async with engine.connect() as conn:
+        return await conn.execute(sentencia, parametros)
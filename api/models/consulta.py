@@ -1,7 +1,17 @@
 from typing import Any, Dict, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, StringConstraints
+from typing_extensions import Annotated
+
+from api.core.config import CONSULTA_LOTE_MAX
 
 
 class ConsultaResponse(BaseModel):
     count: int
     results: List[Dict[str, Any]]
+
+
+class ConsultaLoteRequest(BaseModel):
+    # Cada documento con el mismo largo que aceptan los GET de un documento.
+    documentos: List[Annotated[str, StringConstraints(strip_whitespace=True, min_length=6, max_length=15)]] = Field(
+        ..., min_length=1, max_length=CONSULTA_LOTE_MAX,
+    )
@@ -1,16 +1,15 @@
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import text
 
-from api.core.database import engine_analitica
-from api.core.security import (
-    create_token,
-    decode_token,
-    hash_password_with_salt,
-    verify_password,
-)
+from api.core.database_async import async_engine_analitica
+from api.core.hashing import generar_hash_con_sal, verificar_password
+from api.core.limite_login import limitar_login
+from api.core.cache_tokens import MODULO_API, decodificar_token, invalidar_usuario
+from api.core.security import create_token
+from api.core.vitalidad_conexiones import leer_con_reintento
 from api.models.auth import (
     ChangePasswordRequest,
     LoginRequest,
@@ -26,7 +25,7 @@ def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depen
     if credentials is None or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Falta token Bearer")
     token = credentials.credentials
-    data = decode_token(token)
+    data = decodificar_token(token)
     return data
 
 
@@ -37,7 +36,8 @@ def require_admin(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str,
 
 
 @router.post("/login", response_model=TokenResponse, tags=["Auth"], summary="Iniciar sesión")
-def login(body: LoginRequest):
+async def login(body: LoginRequest, request: Request):
+    limitar_login(request, "api", body.username)
     q = text(
         """
         SELECT username, password_hash, sal, activo, nombre_completo, tipo_usuario
@@ -45,8 +45,7 @@ def login(body: LoginRequest):
         WHERE username = :username
         """
     )
-    with engine_analitica.connect() as conn:
-        row = conn.execute(q, {"username": body.username}).fetchone()
+    row = (await leer_con_reintento(async_engine_analitica, q, {"username": body.username})).fetchone()
     if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario o contraseña inválidos")
 
@@ -58,42 +57,48 @@ def login(body: LoginRequest):
 
     if not active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cuenta desactivada")
-    if not (stored_hash and salt) or not verify_password(salt, stored_hash, body.password):
+    if not (stored_hash and salt) or not await verificar_password(salt, stored_hash, body.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario o contraseña inválidos")
 
     token = create_token({"username": body.username, "full_name": full_name, "tipo_usuario": tipo_usuario})
     return TokenResponse(access_token=token, user={"username": body.username, "full_name": full_name, "tipo_usuario": tipo_usuario})
 
 @router.post("/change-password", tags=["Auth"], summary="Cambiar contraseña")
-def change_password(body: ChangePasswordRequest, user: Dict[str, Any] = Depends(get_current_user)):
+async def change_password(body: ChangePasswordRequest, user: Dict[str, Any] = Depends(get_current_user)):
     username = user["username"]
 
-    with engine_analitica.connect() as conn:
-        row = conn.execute(text("SELECT password_hash, sal FROM usuarios WHERE username=:u"), {"u": username}).fetchone()
-        if not row:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
-        stored_hash, salt = row[0], row[1]
-        if not verify_password(salt, stored_hash, body.current_password):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Contraseña actual incorrecta")
-
-        new_vals = hash_password_with_salt(body.new_password)
-        conn.execute(
+    # Los hashes se calculan sin tener una conexión del pool tomada.
+    row = (await leer_con_reintento(
+        async_engine_analitica, text("SELECT password_hash, sal FROM usuarios WHERE username=:u"), {"u": username},
+    )).fetchone()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    stored_hash, salt = row[0], row[1]
+    if not await verificar_password(salt, stored_hash, body.current_password):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Contraseña actual incorrecta")
+
+    new_vals = await generar_hash_con_sal(body.new_password)
+    async with async_engine_analitica.connect() as conn:
+        await conn.execute(
             text("UPDATE usuarios SET password_hash=:h, sal=:s WHERE username=:u"),
             {"h": new_vals["hash"], "s": new_vals["salt"], "u": username},
         )
-        conn.commit()
+        await conn.commit()
+    invalidar_usuario(MODULO_API, username)
     return {"status": "ok"}
 
 
 @router.post("/register", tags=["Auth"], summary="Registrar un nuevo usuario (solo administradores)")
-def register_user(body: RegisterUserRequest, _: Dict[str, Any] = Depends(require_admin)):
-    with engine_analitica.connect() as conn:
-        exists = conn.execute(text("SELECT COUNT(*) FROM usuarios WHERE username=:u"), {"u": body.username}).scalar()
-        if exists:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El usuario ya existe")
-
-        vals = hash_password_with_salt(body.password)
-        conn.execute(
+async def register_user(body: RegisterUserRequest, _: Dict[str, Any] = Depends(require_admin)):
+    exists = (await leer_con_reintento(
+        async_engine_analitica, text("SELECT COUNT(*) FROM usuarios WHERE username=:u"), {"u": body.username},
+    )).scalar()
+    if exists:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El usuario ya existe")
+
+    vals = await generar_hash_con_sal(body.password)
+    async with async_engine_analitica.connect() as conn:
+        await conn.execute(
             text(
                 """
                 INSERT INTO usuarios (username, password_hash, sal, nombre_completo, activo)
@@ -102,5 +107,5 @@ def register_user(body: RegisterUserRequest, _: Dict[str, Any] = Depends(require
             ),
             {"u": body.username, "h": vals["hash"], "s": vals["salt"], "n": body.full_name},
         )
-        conn.commit()
+        await conn.commit()
     return {"status": "ok"}
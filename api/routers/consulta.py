@@ -1,55 +1,111 @@
-from typing import Any, Dict, List
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import text
+from fastapi import APIRouter, Depends, Path, Query
+from sqlalchemy import bindparam, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from api.core.database import engine_convocatoria, engine_analitica
-from api.models.consulta import ConsultaResponse
+from api.core.busqueda import clave_documento
+from api.core.cache_respuestas import cachear
+from api.core.campos import FIELDS_QUERY, lista_select, parsear_campos
+from api.core.compartimentos import COMPARTIMENTOS, compartimento
+from api.core.database_async import async_engine_analitica, async_engine_convocatoria, async_engine_dtf_financiera
+from api.core.habilitados_renovar import HABILITADOS_RENOVAR
+from api.core.vistas_materializadas import fuente
+from api.core.vitalidad_conexiones import leer_con_reintento
+from api.models.consulta import ConsultaLoteRequest, ConsultaResponse
 from api.routers.auth import get_current_user
+from api.routers.matricula_cero import giros_tablero_mc, info_personal_mc
+from api.routers.seguimiento_auth import get_current_user_seguimiento
+from api.routers.vw_giros_general_historico_ies import resumen_convocatorias_fondos
 
 router = APIRouter()
+logger = logging.getLogger("api.consulta")
 
+# Documentos por sentencia en los endpoints .../lote: un IN (...) de miles de
+# valores cuesta más de planear que varios de unos cientos.
+TAMANO_BLOQUE_IN = 500
 
-@router.get("/formulario-mc", response_model=ConsultaResponse, tags=["Consulta"], summary="Consultar formulario de Matrícula Cero")
-def consulta(documento: str = Query(..., min_length=6, max_length=15), _: Dict[str, Any] = Depends(get_current_user)):
-    q = text("SELECT * FROM vw_matricula_cero_2025_2 WHERE documento = :doc")
-    with engine_convocatoria.connect() as conn:
-        rows = conn.execute(q, {"doc": documento}).fetchall()
+
+@router.get("/formulario-mc", response_model=ConsultaResponse, tags=["Consulta"], summary="Consultar formulario de Matrícula Cero", dependencies=[Depends(compartimento("convocatoria"))])
+@cachear("consulta/formulario-mc", "documento", "fields")
+async def consulta(documento: str = Query(..., min_length=6, max_length=15), fields: Optional[str] = FIELDS_QUERY, _: Dict[str, Any] = Depends(get_current_user)) -> ConsultaResponse:
+    return await formulario_mc(documento, fields)
+
+
+async def formulario_mc(documento: str, fields: Optional[str] = None) -> ConsultaResponse:
+    columnas, _ = await lista_select(async_engine_convocatoria, "vw_matricula_cero_2025_2", fields)
+    q = text(f"SELECT {columnas} FROM {fuente('vw_matricula_cero_2025_2')} WHERE documento = :doc")
+    rows = (await leer_con_reintento(async_engine_convocatoria, q, {"doc": documento})).fetchall()
 
     results: List[Dict[str, Any]] = [dict(r._mapping) for r in rows]
     return ConsultaResponse(count=len(results), results=results)
 
 
-@router.get("/consulta-nombre", response_model=ConsultaResponse, tags=["Consulta"], summary="Consultar nombre por documento")
-def consulta(documento: str = Query(..., min_length=6, max_length=15), _: Dict[str, Any] = Depends(get_current_user)):
+@router.get("/consulta-nombre", response_model=ConsultaResponse, tags=["Consulta"], summary="Consultar nombre por documento", dependencies=[Depends(compartimento("convocatoria"))])
+@cachear("consulta/consulta-nombre", "documento")
+async def consulta(documento: str = Query(..., min_length=6, max_length=15), _: Dict[str, Any] = Depends(get_current_user)) -> ConsultaResponse:
     q = text("SELECT id_usuario, primerNombre, segundoNombre, primerApellido, segundoApellido FROM login_usuario WHERE documento = :doc")
-    with engine_convocatoria.connect() as conn:
-        rows = conn.execute(q, {"doc": documento}).fetchall()
+    rows = (await leer_con_reintento(async_engine_convocatoria, q, {"doc": documento})).fetchall()
     
     results: List[Dict[str, Any]] = [dict(r._mapping) for r in rows]
     return ConsultaResponse(count=len(results), results=results)
 
 
+# Los dos endpoints de habilitados para renovar responden desde el índice en
+# memoria (api/core/habilitados_renovar.py) sin tocar convocatoria_sapiencia,
+# por eso no llevan el compartimento como dependencia: solo lo toman si el
+# índice todavía no cargó y hay que ir a la base.
+_compartimento_convocatoria = asynccontextmanager(COMPARTIMENTOS["convocatoria"].dependencia)
+
+
 @router.get("/existe-tabla-habilitados-renovar", response_model=ConsultaResponse, tags=["Consulta"], summary="Verificar si un documento existe en la tabla de habilitados para renovar")
-def consulta(documento: str = Query(...,min_length=3, max_length=20), _: Dict[str, Any] = Depends(get_current_user)):
-    q = text("SELECT COUNT(*) AS existe FROM fondos_habilitados_renovar WHERE documento = :d")
-    with engine_convocatoria.connect() as conn:
-        rows = conn.execute(q, {"d": documento}).fetchall()
+async def consulta(documento: str = Query(...,min_length=3, max_length=20), _: Dict[str, Any] = Depends(get_current_user)):
+    if HABILITADOS_RENOVAR.cargado:
+        return ConsultaResponse(count=1, results=[{"existe": int(HABILITADOS_RENOVAR.contiene(documento))}])
+    # 0/1 como el índice, no COUNT(*): el documento puede estar repetido.
+    q = text("SELECT EXISTS(SELECT 1 FROM fondos_habilitados_renovar WHERE documento = :d) AS existe")
+    async with _compartimento_convocatoria():
+        rows = (await leer_con_reintento(async_engine_convocatoria, q, {"d": documento})).fetchall()
     results: List[Dict[str, Any]] = [dict(r._mapping) for r in rows]
     return ConsultaResponse(count=len(results), results=results)
 
 
 
-@router.get("/fondos", tags=["Consulta"], summary="Consultar fondos de un beneficiario")
-def consulta(documento: str = Query(..., min_length=6, max_length=15), _: Dict[str, Any] = Depends(get_current_user)):
-    q = text("SELECT * FROM vw_informacion_beneficiario WHERE documento = :doc")
+@router.get("/fondos", tags=["Consulta"], summary="Consultar fondos de un beneficiario", dependencies=[Depends(compartimento("analitica"))])
+@cachear("consulta/fondos", "documento", "fields")
+async def consulta(documento: str = Query(..., min_length=6, max_length=15), fields: Optional[str] = FIELDS_QUERY, _: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    return await fondos_beneficiario(documento, fields)
 
-    with engine_analitica.connect() as conn:
-        
-        rows = conn.execute(q, {"doc": documento}).fetchall()
+
+# Campo de la respuesta agregada -> columna de vw_informacion_beneficiario
+# de la que sale. Es todo lo que se lee de la vista.
+COLUMNAS_FONDOS = {
+    "nombre": "nombre_completo",
+    "id_usuario": "id_usuario",
+    "convocatoria": "convocatoria",
+    "fondo": "fondo_sapiencia",
+    "tiene_varios_registros": "tiene_varios_fondos",
+}
+
+
+async def fondos_beneficiario(documento: str, fields: Optional[str] = None) -> Dict[str, Any]:
+    # Aquí `fields` se valida contra los campos de la respuesta (no contra
+    # la vista): la respuesta es un agregado, no las filas.
+    campos = parsear_campos(fields, COLUMNAS_FONDOS) or list(COLUMNAS_FONDOS)
+    columnas = ", ".join(dict.fromkeys(COLUMNAS_FONDOS[c] for c in campos))
+    q = text(f"SELECT {columnas} FROM vw_informacion_beneficiario WHERE documento = :doc")
+
+    rows = (await leer_con_reintento(async_engine_analitica, q, {"doc": documento})).fetchall()
 
     results_from_db: List[Dict[str, Any]] = [dict(r._mapping) for r in rows]
+    return _agregar_fondos(results_from_db, campos)
+
 
+def _agregar_fondos(results_from_db: List[Dict[str, Any]], campos: Optional[List[str]] = None) -> Dict[str, Any]:
     if not results_from_db:
         return {}
 
@@ -60,5 +116,183 @@ def consulta(documento: str = Query(..., min_length=6, max_length=15), _: Dict[s
         "fondo": [r.get("fondo_sapiencia") for r in results_from_db],
         "tiene_varios_registros": results_from_db[0].get("tiene_varios_fondos"),
     }
+    if campos is not None:
+        aggregated_result = {c: aggregated_result[c] for c in campos}
     
     return aggregated_result
+
+
+# ── Versiones por lote ──────────────────────────────────────────────────────
+# Para los procesos de back-office que consultan miles de documentos: en vez
+# de un request HTTP (y una consulta de una fila) por documento, un POST con
+# la lista que se resuelve con WHERE documento IN (...) por bloques de
+# TAMANO_BLOQUE_IN. La respuesta es un mapa documento -> lo mismo que
+# devolvería el endpoint GET de un documento.
+
+def _documentos_unicos(body: ConsultaLoteRequest) -> List[str]:
+    return list(dict.fromkeys(body.documentos))
+
+
+async def _filas_por_documento(engine, sql: str, documentos: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Filas de cada documento pedido, con la clave tal como se pidió. El IN
+    compara con la intercalación de la columna: la fila puede traer el
+    documento con otras mayúsculas o espacios al final, así que se empareja
+    con clave_documento() y no con el texto de la base.
+    """
+    q = text(sql).bindparams(bindparam("docs", expanding=True))
+    filas: Dict[str, List[Dict[str, Any]]] = {d: [] for d in documentos}
+    pedidos: Dict[str, List[str]] = {}
+    for d in documentos:
+        pedidos.setdefault(clave_documento(d), []).append(d)
+    # Uno por clave: "ABC123" y "abc123" traen las mismas filas.
+    consultar = [iguales[0] for iguales in pedidos.values()]
+    for i in range(0, len(consultar), TAMANO_BLOQUE_IN):
+        bloque = consultar[i:i + TAMANO_BLOQUE_IN]
+        for r in (await leer_con_reintento(engine, q, {"docs": bloque})).fetchall():
+            fila = dict(r._mapping)
+            for d in pedidos.get(clave_documento(fila["documento"]), ()):
+                filas[d].append(fila)
+    return filas
+
+
+@router.post("/fondos/lote", tags=["Consulta"], summary="Consultar fondos de varios beneficiarios", dependencies=[Depends(compartimento("analitica"))])
+async def consulta_fondos_lote(body: ConsultaLoteRequest, _: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Dict[str, Any]]:
+    filas = await _filas_por_documento(
+        async_engine_analitica,
+        "SELECT * FROM vw_informacion_beneficiario WHERE documento IN :docs",
+        _documentos_unicos(body),
+    )
+    return {documento: _agregar_fondos(rows) for documento, rows in filas.items()}
+
+
+@router.post("/consulta-nombre/lote", tags=["Consulta"], summary="Consultar nombres de varios documentos", dependencies=[Depends(compartimento("convocatoria"))])
+async def consulta_nombre_lote(body: ConsultaLoteRequest, _: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, ConsultaResponse]:
+    filas = await _filas_por_documento(
+        async_engine_convocatoria,
+        "SELECT documento, id_usuario, primerNombre, segundoNombre, primerApellido, segundoApellido "
+        "FROM login_usuario WHERE documento IN :docs",
+        _documentos_unicos(body),
+    )
+    resultado: Dict[str, ConsultaResponse] = {}
+    for documento, rows in filas.items():
+        results = [{k: v for k, v in r.items() if k != "documento"} for r in rows]
+        resultado[documento] = ConsultaResponse(count=len(results), results=results)
+    return resultado
+
+
+@router.post("/existe-tabla-habilitados-renovar/lote", tags=["Consulta"], summary="Verificar cuáles documentos existen en la tabla de habilitados para renovar")
+async def consulta_habilitados_renovar_lote(body: ConsultaLoteRequest, _: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, ConsultaResponse]:
+    documentos = _documentos_unicos(body)
+    if HABILITADOS_RENOVAR.cargado:
+        return {
+            documento: ConsultaResponse(count=1, results=[{"existe": int(HABILITADOS_RENOVAR.contiene(documento))}])
+            for documento in documentos
+        }
+    async with _compartimento_convocatoria():
+        filas = await _filas_por_documento(
+            async_engine_convocatoria,
+            "SELECT DISTINCT documento FROM fondos_habilitados_renovar WHERE documento IN :docs",
+            documentos,
+        )
+    return {
+        documento: ConsultaResponse(count=1, results=[{"existe": int(bool(rows))}])
+        for documento, rows in filas.items()
+    }
+
+
+# ── Perfil completo de un beneficiario ──────────────────────────────────────
+# El frontend armaba la ficha de un beneficiario con cuatro o cinco requests
+# en serie contra tres bases distintas. Aquí se lanzan todas las consultas a
+# la vez (una conexión por fuente), así que la latencia es la de la fuente
+# más lenta y no la suma. Si una fuente falla, el resto se devuelve igual y
+# el error queda en "errores".
+# Los dos universos de usuarios siguen separados (ver
+# api/core/security_seguimiento.py): /perfil/, con el login genérico de la
+# API, trae formulario MC, fondos y giros, como los endpoints de /consulta;
+# /perfil-mc/, con login de Seguimiento, trae solo la sección de Matrícula
+# Cero, como los de /matricula-cero (ver la NOTA en
+# api/routers/matricula_cero.py).
+
+async def _medir(fuente: str, consulta: Awaitable[Any], tiempos: Dict[str, float], errores: Dict[str, str]) -> Optional[Any]:
+    inicio = time.perf_counter()
+    try:
+        return await consulta
+    except Exception as e:
+        logger.exception("Falló la fuente %s del perfil", fuente)
+        errores[fuente] = str(e)
+        return None
+    finally:
+        tiempos[fuente] = round((time.perf_counter() - inicio) * 1000, 1)
+
+
+async def _resumen_giros(documento: str) -> Dict[str, Any]:
+    async with AsyncSession(async_engine_dtf_financiera) as db:
+        return await resumen_convocatorias_fondos(db, documento)
+
+
+async def _fuentes(fuentes: Dict[str, Awaitable[Any]], tiempos: Dict[str, float], errores: Dict[str, str]) -> Dict[str, Any]:
+    resultados = await asyncio.gather(*(_medir(f, c, tiempos, errores) for f, c in fuentes.items()))
+    return dict(zip(fuentes, resultados))
+
+
+async def _perfil(documento: str) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    tiempos: Dict[str, float] = {}
+    errores: Dict[str, str] = {}
+    perfil: Dict[str, Any] = {"documento": documento}
+    perfil.update(await _fuentes({
+        "formulario_mc": formulario_mc(documento),
+        "fondos": fondos_beneficiario(documento),
+        "giros": _resumen_giros(documento),
+    }, tiempos, errores))
+    perfil["tiempos_ms"] = {**tiempos, "total": round((time.perf_counter() - inicio) * 1000, 1)}
+    perfil["errores"] = errores
+    return perfil
+
+
+async def _perfil_mc(documento: str) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    tiempos: Dict[str, float] = {}
+    errores: Dict[str, str] = {}
+    matricula_cero = await _fuentes({
+        "info_personal": info_personal_mc(documento),
+        "giros": giros_tablero_mc(documento),
+    }, tiempos, errores)
+    return {
+        "documento": documento,
+        "matricula_cero": matricula_cero,
+        "tiempos_ms": {**tiempos, "total": round((time.perf_counter() - inicio) * 1000, 1)},
+        "errores": errores,
+    }
+
+
+@router.get(
+    "/perfil/{documento}",
+    tags=["Consulta"],
+    summary="Perfil de un beneficiario (formulario MC, fondos y giros) en un solo request",
+    dependencies=[
+        Depends(compartimento("analitica")),
+        Depends(compartimento("convocatoria")),
+        Depends(compartimento("dtf_financiera")),
+    ],
+)
+async def perfil_beneficiario(documento: str = Path(..., min_length=6, max_length=15), _: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    return await _perfil(documento)
+
+
+@router.get(
+    "/perfil-mc/{documento}",
+    tags=["Consulta"],
+    summary="Sección de Matrícula Cero del perfil de un beneficiario (login de Seguimiento)",
+    description="Datos personales y giros del tablero de Matrícula Cero en un solo request. Formulario MC, "
+                "fondos y giros generales están en /consulta/perfil/, con el login de la API.",
+    dependencies=[
+        Depends(compartimento("analitica")),
+        Depends(compartimento("convocatoria")),
+    ],
+)
+async def perfil_beneficiario_mc(
+    documento: str = Path(..., min_length=6, max_length=15), _: Dict[str, Any] = Depends(get_current_user_seguimiento),
+) -> Dict[str, Any]:
+    return await _perfil_mc(documento)
@@ -3,6 +3,7 @@ from typing import Any, Dict, List
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlmodel import Session, select
 
+from api.core.cache_respuestas import invalidar
 from api.core.database import engine_analitica
 from api.models.informacion_cambio_pensum import (
     InformacionCambioPensum,
@@ -43,6 +44,7 @@ def create_informacion_cambio_pensum(
             session.add(db_cambio)
             session.commit()
             session.refresh(db_cambio)
+            invalidar(db_cambio.docconvfondo, db_cambio.documento)
             
             # Convertir a modelo de respuesta
             response_data = InformacionCambioPensumResponse(
@@ -129,6 +131,7 @@ def update_cambio_pensum(
         db_cambio = session.get(InformacionCambioPensum, docconvfondo)
         if not db_cambio:
             raise HTTPException(status_code=404, detail="Registro de cambio de pensum no encontrado")
+        documento_anterior = db_cambio.documento
         
         cambio_data = cambio_pensum.model_dump(exclude_unset=True)
         # Actualizar el responsable de actualización
@@ -140,6 +143,7 @@ def update_cambio_pensum(
         session.add(db_cambio)
         session.commit()
         session.refresh(db_cambio)
+        invalidar(docconvfondo, documento_anterior, db_cambio.documento)
         return db_cambio
 
 
@@ -157,8 +161,10 @@ def delete_cambio_pensum(
         if not cambio_pensum:
             raise HTTPException(status_code=404, detail="Registro de cambio de pensum no encontrado")
         
+        documento = cambio_pensum.documento
         session.delete(cambio_pensum)
         session.commit()
+        invalidar(docconvfondo, documento)
         return {
             "status": "ok",
             "message": "Registro de cambio de pensum eliminado exitosamente"
@@ -3,6 +3,7 @@ from typing import Annotated, Any, Dict, List
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 
+from ..core.cache_respuestas import invalidar
 from ..core.database import get_session_analitica
 from ..models.informacion_deudores import (
     InformacionDeudores,
@@ -57,4 +58,5 @@ def update_informacion_deudor(
     session.add(db_item)
     session.commit()
     session.refresh(db_item)
+    invalidar(docconvfondo, db_item.documento)
     return db_item
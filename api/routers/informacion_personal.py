@@ -1,6 +1,7 @@
 from typing import Annotated, Any, Dict
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
+from ..core.cache_respuestas import invalidar
 from ..core.database import get_session_analitica
 from ..models.informacion_personal import (
     InformacionPersonal,
@@ -42,12 +43,14 @@ def update_informacion_personal(
     item = session.get(InformacionPersonal, docconvfondo)
     if not item:
         raise HTTPException(status_code=404, detail="Registro no encontrado")
+    documento_anterior = item.documento
     update_data = data.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(item, key, value)
     session.add(item)
     session.commit()
     session.refresh(item)
+    invalidar(docconvfondo, documento_anterior, item.documento)
     return item
 
 #@router.delete("/{docconvfondo}")
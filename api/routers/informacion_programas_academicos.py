@@ -3,6 +3,7 @@ from typing import Annotated, Any, Dict
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 
+from ..core.cache_respuestas import cachear, invalidar
 from ..core.database import get_session_analitica
 from ..models.informacion_programas_academicos import (
     InformacionProgramasAcademicos,
@@ -27,6 +28,7 @@ def read_informacion_programas_academicos(
 
 
 @router.get("/{docconvfondo}", response_model=InformacionProgramasAcademicos, summary="Obtener información de un programa académico por docconvfondo")
+@cachear("informacion-programas-academicos", "docconvfondo")
 def get_informacion_programas_academicos(
     docconvfondo: str,
     session: SessionDep,
@@ -48,6 +50,7 @@ def update_informacion_programas_academicos(
     item = session.get(InformacionProgramasAcademicos, docconvfondo)
     if not item:
         raise HTTPException(status_code=404, detail="Registro no encontrado")
+    documento_anterior = item.documento
     # Ignore client-provided responsable_actualizacion; set it from authenticated user
     update_data = data.dict(exclude_unset=True, exclude={"responsable_actualizacion"})
     for key, value in update_data.items():
@@ -56,4 +59,5 @@ def update_informacion_programas_academicos(
     session.add(item)
     session.commit()
     session.refresh(item)
+    invalidar(docconvfondo, documento_anterior, item.documento)
     return item
@@ -0,0 +1,93 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..core.cache_respuestas import estado_cache_respuestas
+from ..core.cache_respuestas import lineas_prometheus as lineas_prometheus_cache_respuestas
+from ..core.cache_tokens import estado_cache_tokens
+from ..core.cache_tokens import lineas_prometheus as lineas_prometheus_cache_tokens
+from ..core.compartimentos import estado_compartimentos
+from ..core.compartimentos import lineas_prometheus as lineas_prometheus_compartimentos
+from ..core.database import estado_pools, lineas_prometheus_pools
+from ..core.estado_usuarios import estado_usuarios
+from ..core.estado_usuarios import lineas_prometheus as lineas_prometheus_estado_usuarios
+from ..core.exportacion import estado_exportaciones
+from ..core.exportacion import lineas_prometheus as lineas_prometheus_exportaciones
+from ..core.habilitados_renovar import estado_habilitados_renovar
+from ..core.habilitados_renovar import lineas_prometheus as lineas_prometheus_habilitados
+from ..core.hashing import estado_hashing
+from ..core.hashing import lineas_prometheus as lineas_prometheus_hashing
+from ..core.limite_login import estado_limite_login
+from ..core.limite_login import lineas_prometheus as lineas_prometheus_limite_login
+from ..core.instrumentacion_sql import lineas_prometheus as lineas_prometheus_sql
+from ..core.vistas_materializadas import estado_vistas_materializadas
+from ..core.vistas_materializadas import lineas_prometheus as lineas_prometheus_vistas
+
+router = APIRouter(tags=["Interno"])
+
+# NOTA: sin autenticación, igual que el healthcheck "/" — solo expone
+# contadores de infraestructura (nada de datos de beneficiarios), y así lo
+# puede consultar el monitoreo (p. ej. el scraper de Prometheus) sin
+# manejar tokens.
+
+
+@router.get("/internal/pools", summary="Estado de los pools de conexión por base de datos")
+def pools() -> Dict[str, Any]:
+    return estado_pools()
+
+
+@router.get("/internal/compartimentos", summary="Cupos de requests simultáneos por base de datos (bulkheads)")
+def compartimentos() -> Dict[str, Any]:
+    return estado_compartimentos()
+
+
+@router.get("/internal/hashing", summary="Cola y tiempos del ejecutor de hashing de contraseñas")
+def hashing() -> Dict[str, Any]:
+    return estado_hashing()
+
+
+@router.get("/internal/cache-tokens", summary="Aciertos y desalojos del caché de tokens verificados")
+def cache_tokens() -> Dict[str, Any]:
+    return estado_cache_tokens()
+
+
+@router.get("/internal/estado-usuarios", summary="Carga de la tabla en memoria de estado de usuarios de Seguimiento")
+def estado_usuarios_seguimiento() -> Dict[str, Any]:
+    return estado_usuarios()
+
+
+@router.get("/internal/cache-respuestas", summary="Aciertos, tamaño y desalojos del caché de respuestas por documento")
+def cache_respuestas() -> Dict[str, Any]:
+    return estado_cache_respuestas()
+
+
+@router.get("/internal/habilitados-renovar", summary="Índice en memoria de documentos habilitados para renovar")
+def habilitados_renovar() -> Dict[str, Any]:
+    return estado_habilitados_renovar()
+
+
+@router.get("/internal/exportaciones", summary="Exportaciones en streaming en curso, completas y rechazadas")
+def exportaciones() -> Dict[str, Any]:
+    return estado_exportaciones()
+
+
+@router.get("/internal/vistas-materializadas", summary="Copias materializadas de vistas: antigüedad, refrescos y lecturas")
+def vistas_materializadas() -> Dict[str, Any]:
+    return estado_vistas_materializadas()
+
+
+@router.get("/internal/limite-login", summary="Intentos de login permitidos y limitados (429)")
+def limite_login() -> Dict[str, Any]:
+    return estado_limite_login()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, summary="Métricas en formato de exposición de Prometheus")
+def metrics() -> PlainTextResponse:
+    lineas = (
+        lineas_prometheus_pools() + lineas_prometheus_compartimentos() + lineas_prometheus_hashing()
+        + lineas_prometheus_cache_tokens() + lineas_prometheus_cache_respuestas() + lineas_prometheus_limite_login()
+        + lineas_prometheus_habilitados() + lineas_prometheus_exportaciones() + lineas_prometheus_vistas()
+        + lineas_prometheus_estado_usuarios() + lineas_prometheus_sql()
+    )
+    return PlainTextResponse("\n".join(lineas) + "\n", media_type="text/plain; version=0.0.4")
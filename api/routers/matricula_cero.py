@@ -1,10 +1,15 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 
-from ..core.database import engine_analitica, engine_convocatoria
+from ..core.cache_respuestas import cachear
+from ..core.campos import FIELDS_QUERY, lista_select, recortar
+from ..core.compartimentos import compartimento
+from ..core.database_async import async_engine_analitica, async_engine_convocatoria
 from ..core.matricula_cero_helpers import calcular_periodo_label
+from ..core.vistas_materializadas import fuente
+from ..core.vitalidad_conexiones import leer_con_reintento
 from ..models.consulta import ConsultaResponse
 from ..models.matricula_cero import InfoPersonalMCResponse
 from .seguimiento_auth import get_current_user_seguimiento
@@ -24,9 +29,12 @@ router = APIRouter(prefix="/matricula-cero", tags=["Matrícula Cero"])
     "/consulta",
     response_model=ConsultaResponse,
     summary="Consultar formulario de Matrícula Cero (vista vigente 2026-2)",
+    dependencies=[Depends(compartimento("convocatoria"))],
 )
-def consulta_formulario_2026_2(
+@cachear("matricula-cero/consulta", "documento", "fields")
+async def consulta_formulario_2026_2(
     documento: str = Query(..., min_length=6, max_length=15),
+    fields: Optional[str] = FIELDS_QUERY,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> ConsultaResponse:
     """
@@ -36,14 +44,14 @@ def consulta_formulario_2026_2(
     app/database/db_operations.py::MatriculaCeroOperations.get_by_documento
     del portal Streamlit.
     """
-    q = text("""
-        SELECT *
-        FROM vw_matricula_cero_2026_2
+    columnas, _ = await lista_select(async_engine_convocatoria, "vw_matricula_cero_2026_2", fields)
+    q = text(f"""
+        SELECT {columnas}
+        FROM {fuente("vw_matricula_cero_2026_2")}
         WHERE documento = :documento
         ORDER BY fecha_registro DESC
     """)
-    with engine_convocatoria.connect() as conn:
-        rows = conn.execute(q, {"documento": documento}).mappings().all()
+    rows = (await leer_con_reintento(async_engine_convocatoria, q, {"documento": documento})).mappings().all()
 
     results: List[Dict[str, Any]] = [dict(r) for r in rows]
     return ConsultaResponse(count=len(results), results=results)
@@ -53,8 +61,9 @@ def consulta_formulario_2026_2(
     "/tablero/info-personal",
     response_model=InfoPersonalMCResponse,
     summary="Información personal del formulario más reciente (Tablero Matrícula Cero)",
+    dependencies=[Depends(compartimento("convocatoria"))],
 )
-def tablero_info_personal(
+async def tablero_info_personal(
     documento: str = Query(..., min_length=6, max_length=15),
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> InfoPersonalMCResponse:
@@ -65,6 +74,37 @@ def tablero_info_personal(
     ninguna vista. A diferencia del original (que arma la consulta con
     f-strings), aquí el documento va parametrizado para evitar inyección SQL.
     """
+    return await info_personal_mc(documento)
+
+
+@router.get(
+    "/tablero/giros",
+    response_model=ConsultaResponse,
+    summary="Historial de giros/seguimiento académico por período (Tablero Matrícula Cero)",
+    dependencies=[Depends(compartimento("analitica"))],
+)
+async def tablero_giros(
+    documento: str = Query(..., min_length=6, max_length=15),
+    solo_proyecto: bool = Query(
+        True,
+        description="Si es True (por defecto), solo incluye períodos desde 2023-2 en adelante "
+                    "(el proyecto actual). Si es False, incluye todo el histórico.",
+    ),
+    fields: Optional[str] = FIELDS_QUERY,
+    _: Dict[str, Any] = Depends(get_current_user_seguimiento),
+) -> ConsultaResponse:
+    """
+    Equivalente a tablero_mc.py::_cargar_analitica + el filtro
+    df_analitica_filtrado (columna 'periodo' es texto tipo 'AAAA-S' en esta
+    tabla — distinto del código entero de matricula_cero — se compara igual
+    que en el original, lexicográficamente).
+    """
+    return await giros_tablero_mc(documento, solo_proyecto, fields)
+
+
+# Consultas de los tableros, reutilizadas por /consulta/perfil/{documento}.
+
+async def info_personal_mc(documento: str) -> InfoPersonalMCResponse:
     q = text("""
         SELECT mc.*,
                a.nombre  AS tipo_documento,
@@ -119,8 +159,7 @@ def tablero_info_personal(
           )
         LIMIT 1
     """)
-    with engine_convocatoria.connect() as conn:
-        row = conn.execute(q, {"documento": documento}).mappings().fetchone()
+    row = (await leer_con_reintento(async_engine_convocatoria, q, {"documento": documento})).mappings().fetchone()
 
     if not row:
         return InfoPersonalMCResponse(encontrado=False)
@@ -130,37 +169,20 @@ def tablero_info_personal(
     return InfoPersonalMCResponse(encontrado=True, periodo_label=periodo_label, datos=datos)
 
 
-@router.get(
-    "/tablero/giros",
-    response_model=ConsultaResponse,
-    summary="Historial de giros/seguimiento académico por período (Tablero Matrícula Cero)",
-)
-def tablero_giros(
-    documento: str = Query(..., min_length=6, max_length=15),
-    solo_proyecto: bool = Query(
-        True,
-        description="Si es True (por defecto), solo incluye períodos desde 2023-2 en adelante "
-                    "(el proyecto actual). Si es False, incluye todo el histórico.",
-    ),
-    _: Dict[str, Any] = Depends(get_current_user_seguimiento),
-) -> ConsultaResponse:
-    """
-    Equivalente a tablero_mc.py::_cargar_analitica + el filtro
-    df_analitica_filtrado (columna 'periodo' es texto tipo 'AAAA-S' en esta
-    tabla — distinto del código entero de matricula_cero — se compara igual
-    que en el original, lexicográficamente).
-    """
-    q = text("""
-        SELECT *
+async def giros_tablero_mc(documento: str, solo_proyecto: bool = True, fields: Optional[str] = None) -> ConsultaResponse:
+    # periodo siempre se lee: el filtro solo_proyecto se hace sobre ella.
+    columnas, campos = await lista_select(async_engine_analitica, "analitica_fondos.mc_final", fields, obligatorias=("periodo",))
+    q = text(f"""
+        SELECT {columnas}
         FROM analitica_fondos.mc_final
         WHERE documento = :documento
         ORDER BY periodo ASC
     """)
-    with engine_analitica.connect() as conn:
-        rows = conn.execute(q, {"documento": documento}).mappings().all()
+    rows = (await leer_con_reintento(async_engine_analitica, q, {"documento": documento})).mappings().all()
 
     results: List[Dict[str, Any]] = [dict(r) for r in rows]
     if solo_proyecto:
         results = [r for r in results if str(r.get("periodo", "")) >= "2023-2"]
+    results = recortar(results, campos)
 
     return ConsultaResponse(count=len(results), results=results)
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, Query, HTTPException
 from pydantic import BaseModel
@@ -8,7 +8,10 @@ import traceback
 
 logger = logging.getLogger(__name__)
 
+from api.core.busqueda import ModoBusqueda, condicion
+from api.core.cache_respuestas import invalidar
 from api.core.database import engine_analitica
+from api.core.plazos import plazo
 from api.models.reintegros import (
     Reintegros,
     ReintegrosCreate,
@@ -25,25 +28,39 @@ router = APIRouter()
     response_model=List[Reintegros],
     tags=["Reintegros"],
     summary="Consultar reintegros por beneficiario o documento",
+    description="Cambio para quienes ya la usaban: beneficiario buscaba el texto en cualquier parte del nombre; "
+                "ahora, por defecto, el nombre tiene que empezar por él (beneficiario=PEREZ ya no encuentra "
+                "\"JUAN PEREZ\"). Con modo_beneficiario=texto se buscan todas las palabras, en cualquier orden, "
+                "cada una como comienzo de una palabra del nombre; necesita el índice FULLTEXT de "
+                "migraciones/001_indices_busqueda.sql. modo_beneficiario=exacto compara el nombre completo.",
+    dependencies=[Depends(plazo(8))],
 )
 def get_reintegros(
     beneficiario: str = Query(None, min_length=1, max_length=100),
     documento: str = Query(None, min_length=1, max_length=20),
+    modo_beneficiario: ModoBusqueda = Query(
+        ModoBusqueda.prefijo, description="prefijo, texto (todas las palabras, en cualquier orden) o exacto",
+    ),
     _: Dict[str, Any] = Depends(get_current_user),
 ):
+    statement = consulta_reintegros(beneficiario, documento, modo_beneficiario)
     with Session(engine_analitica) as session:
-        statement = select(Reintegros)
-        
-        if beneficiario:
-            statement = statement.where(Reintegros.beneficiario.contains(beneficiario))
-        if documento:
-            statement = statement.where(Reintegros.documento == documento)
-            
-        statement = statement.order_by(Reintegros.fecha_inicio_proceso.desc())
         results = session.exec(statement).all()
         return results
 
 
+def consulta_reintegros(beneficiario: Optional[str], documento: Optional[str], modo_beneficiario: ModoBusqueda):
+    """Usada también por benchmarks/planes_busqueda.py."""
+    statement = select(Reintegros)
+    if beneficiario:
+        statement = statement.where(
+            condicion(Reintegros.beneficiario, beneficiario, modo_beneficiario, ModoBusqueda, "beneficiario")
+        )
+    if documento:
+        statement = statement.where(Reintegros.documento == documento)
+    return statement.order_by(Reintegros.fecha_inicio_proceso.desc())
+
+
 @router.get(
     "/consulta/{reintegro_id}",
     response_model=Reintegros,
@@ -80,6 +97,7 @@ def create_reintegro(
             session.add(db_reintegro)
             session.commit()
             session.refresh(db_reintegro)
+            invalidar(db_reintegro.documento)
             
             logger.info(f"Reintegro creado exitosamente con ID: {db_reintegro.id}")
             
@@ -127,6 +145,7 @@ def update_reintegro(
         db_reintegro = session.get(Reintegros, reintegro_id)
         if not db_reintegro:
             raise HTTPException(status_code=404, detail="Reintegro no encontrado")
+        documento_anterior = db_reintegro.documento
         
         reintegro_data = reintegro.model_dump(exclude_unset=True)
         for key, value in reintegro_data.items():
@@ -135,6 +154,7 @@ def update_reintegro(
         session.add(db_reintegro)
         session.commit()
         session.refresh(db_reintegro)
+        invalidar(documento_anterior, db_reintegro.documento)
         return db_reintegro
 
 
@@ -152,8 +172,10 @@ def delete_reintegro(
         if not reintegro:
             raise HTTPException(status_code=404, detail="Reintegro no encontrado")
         
+        documento = reintegro.documento
         session.delete(reintegro)
         session.commit()
+        invalidar(documento)
         return {
             "status": "ok",
             "message": "Reintegro eliminado exitosamente"
@@ -4,7 +4,9 @@ from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 from sqlmodel import Session, select, text
 
+from api.core.compartimentos import compartimento
 from api.core.database import engine_analitica, engine_convocatoria
+from api.core.habilitados_renovar import HABILITADOS_RENOVAR
 from api.models.renovaciones_extemporaneas import (
     RenovacionesExtemporaneas,
     RenovacionesExtemporaneasCreate,
@@ -19,6 +21,7 @@ router = APIRouter()
     response_model=List[RenovacionesExtemporaneas],
     tags=["Renovaciones Extemporaneas"],
     summary="Consultar renovaciones extemporáneas por período",
+    dependencies=[Depends(compartimento("analitica"))],
 )
 def get_renovaciones_extemporaneas(
     periodo: str = Query(..., min_length=6, max_length=6),
@@ -37,6 +40,7 @@ def get_renovaciones_extemporaneas(
     response_model=RenovacionesExtemporaneas,
     tags=["Renovaciones Extemporaneas"],
     summary="Crear una nueva renovación extemporánea",
+    dependencies=[Depends(compartimento("analitica"))],
 )
 def create_renovacion_extemporanea(
     renovacion: RenovacionesExtemporaneasCreate,
@@ -62,6 +66,7 @@ class Documento(BaseModel):
     "/agrega-tabla-ti/",
     tags=["Renovaciones Extemporaneas"],
     summary="Agregar un documento a la tabla de habilitados para renovar (TI)",
+    dependencies=[Depends(compartimento("convocatoria"))],
 )
 def agrega_tabla_ti(
     item: Documento,
@@ -82,6 +87,7 @@ def agrega_tabla_ti(
             )
             session.execute(query, {"documento": item.documento})
             session.commit()
+            HABILITADOS_RENOVAR.agregar(item.documento)
             return {
                 "status" : "ok",
                 "message": "agregado"
@@ -89,6 +95,7 @@ def agrega_tabla_ti(
         except Exception as e:
             session.rollback()
             if "duplicate" in str(e).lower():
+                HABILITADOS_RENOVAR.agregar(item.documento)
                 return {"status": "error", "message": "duplicado"}
             raise e
 
@@ -1,10 +1,11 @@
 from datetime import date, datetime
-from typing import Any, Dict, List
+from typing import Annotated, Any, Dict, List
  
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import text
+from sqlalchemy.engine import Engine
  
-from ..core.database import engine_analitica
+from ..core.database import engine_analitica, get_engine_analitica_lectura
 from ..models.seguimiento_actividades import (
     ActividadPeriodoOut,
     AvanceResponse,
@@ -20,6 +21,11 @@ router = APIRouter(prefix="/seguimiento", tags=["Seguimiento · Actividades"])
  
 TIPOS_VALIDOS = ("ejecucion", "liquidacion", "cierre")
  
+# Lecturas (GET) por la réplica de analitica si está configurada. Las
+# escrituras y _verificar_avance_automatico_convenio (que lee lo que se acaba
+# de guardar) siguen sobre engine_analitica, la primaria.
+EngineLecturaDep = Annotated[Engine, Depends(get_engine_analitica_lectura)]
+ 
 # Cadena de transiciones automáticas de estado del convenio — idéntica a
 # app/seguimiento/ui.py::TRANSICION_ESTADO. 'ejecucion' NO está aquí a
 # propósito: ese paso lo dispara el flujo diario de n8n por fecha_fin_convenio.
@@ -79,13 +85,14 @@ def _verificar_avance_automatico_convenio(convenio_id: int, tipo_actividad: str)
 @router.get("/periodos/{periodo_id}/actividades", response_model=List[ActividadPeriodoOut], summary="Listar actividades de un período (por tipo)")
 def list_actividades_periodo(
     periodo_id: int,
+    engine: EngineLecturaDep,
     tipo: str = "liquidacion",
     solo_relevantes: bool = False,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ):
     _validar_tipo(tipo)
     rel_filter = "AND ab.es_relevante=1" if solo_relevantes else ""
-    with engine_analitica.connect() as conn:
+    with engine.connect() as conn:
         rows = conn.execute(
             text(f"""
                 SELECT ab.id AS actividad_base_id, ab.nombre, ab.subcategoria, ab.subcategoria_orden, ab.orden,
@@ -359,9 +366,10 @@ def update_recordatorio(
 @router.get("/convenios/{convenio_id}/historial", summary="Historial de comentarios de todos los períodos de un convenio")
 def get_historial_convenio(
     convenio_id: int,
+    engine: EngineLecturaDep,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> Dict[str, List[Dict[str, Any]]]:
-    with engine_analitica.connect() as conn:
+    with engine.connect() as conn:
         rows = conn.execute(
             text("""
                 SELECT h.actividad_convenio_id, h.fecha_cambio, h.usuario_nombre, h.comentario
@@ -391,9 +399,10 @@ def get_historial_convenio(
 )
 def list_fechas_limite_periodo(
     periodo_id: int,
+    engine: EngineLecturaDep,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ):
-    with engine_analitica.connect() as conn:
+    with engine.connect() as conn:
         rows = conn.execute(
             text("""
                 SELECT tipo, subcategoria, fecha_limite, fecha_definicion
@@ -488,9 +497,10 @@ def delete_fecha_limite_subcategoria(
 @router.get("/periodos/{periodo_id}/historial", summary="Historial de comentarios de un período específico")
 def get_historial_periodo(
     periodo_id: int,
+    engine: EngineLecturaDep,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> Dict[str, List[Dict[str, Any]]]:
-    with engine_analitica.connect() as conn:
+    with engine.connect() as conn:
         rows = conn.execute(
             text("""
                 SELECT h.actividad_convenio_id, h.fecha_cambio, h.usuario_nombre, h.comentario
@@ -1,16 +1,16 @@
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import text
 
-from api.core.database import engine_analitica
-from api.core.security_seguimiento import (
-    create_token_seguimiento,
-    decode_token_seguimiento,
-    hash_password,
-    verify_password,
-)
+from api.core.cache_tokens import MODULO_SEGUIMIENTO, invalidar_usuario
+from api.core.database_async import async_engine_analitica
+from api.core.estado_usuarios import ESTADO_USUARIOS, version_password
+from api.core.limite_login import limitar_login
+from api.core.hashing import generar_hash_seguimiento, verificar_password_seguimiento
+from api.core.security_seguimiento import create_token_seguimiento, decode_token_seguimiento
+from api.core.vitalidad_conexiones import leer_con_reintento
 from api.models.seguimiento_auth import (
     CambiarPasswordPrimerLoginRequest,
     LoginSeguimientoRequest,
@@ -21,20 +21,39 @@ router = APIRouter(prefix="/seguimiento/auth", tags=["Seguimiento · Auth"])
 _bearer_scheme = HTTPBearer(auto_error=False)
 
 
-def get_current_user_seguimiento(
+async def get_current_user_seguimiento(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer_scheme),
 ) -> Dict[str, Any]:
-    """Dependencia de autenticación para todos los endpoints de /seguimiento/*."""
+    """
+    Dependencia de autenticación para todos los endpoints de /seguimiento/*.
+    Además de la firma, revisa contra la tabla en memoria de
+    api/core/estado_usuarios.py (sin ir a la base, salvo para un usuario que
+    todavía no está en la tabla) que el usuario siga
+    existiendo y activo y que su contraseña no haya cambiado desde que se
+    emitió el token. El rol que se devuelve es el vigente, no el del token.
+    """
     if credentials is None or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Falta token Bearer")
-    return decode_token_seguimiento(credentials.credentials)
+    data = decode_token_seguimiento(credentials.credentials)
+
+    estado = await ESTADO_USUARIOS.obtener(data["usuario_id"])
+    if estado is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
+    if not estado.activo:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario inactivo. Contacta al administrador.")
+    if data.get("pwv") not in (None, estado.version_password):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="La contraseña cambió; inicia sesión de nuevo.")
+    data["rol"] = estado.rol
+    return data
 
 
 def require_rol(*roles_permitidos: str):
     """
     Dependencia factory: uso `Depends(require_rol("ADMIN"))` o
     `Depends(require_rol("ADMIN", "LMC", "AST"))`. Replica los checks que hoy
-    hace la app Streamlit por rol (ej. rol_activo != "DIRECTORA").
+    hace la app Streamlit por rol (ej. rol_activo != "DIRECTORA"). El rol
+    viene de la tabla de estado de usuarios (vía get_current_user_seguimiento),
+    así que un cambio de rol aplica sin esperar a que venza el token.
     """
     def _checker(user: Dict[str, Any] = Depends(get_current_user_seguimiento)) -> Dict[str, Any]:
         if user.get("rol") not in roles_permitidos:
@@ -44,14 +63,14 @@ def require_rol(*roles_permitidos: str):
 
 
 @router.post("/login", response_model=TokenSeguimientoResponse, summary="Iniciar sesión (Seguimiento Convenios MC)")
-def login(body: LoginSeguimientoRequest):
+async def login(body: LoginSeguimientoRequest, request: Request):
+    limitar_login(request, "seguimiento", body.usuario)
     q = text("""
         SELECT id, nombre, usuario, password_hash, rol, activo, primer_login
         FROM usuarios_seg_proceso_mc
         WHERE usuario = :usuario
     """)
-    with engine_analitica.connect() as conn:
-        row = conn.execute(q, {"usuario": body.usuario}).fetchone()
+    row = (await leer_con_reintento(async_engine_analitica, q, {"usuario": body.usuario})).fetchone()
 
     if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
@@ -60,10 +79,13 @@ def login(body: LoginSeguimientoRequest):
 
     if not activo:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario inactivo. Contacta al administrador.")
-    if not verify_password(body.password, password_hash):
+    if not await verificar_password_seguimiento(body.password, password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Contraseña incorrecta")
 
-    token = create_token_seguimiento(usuario_id=uid, usuario=usuario, nombre=nombre, rol=rol)
+    ESTADO_USUARIOS.registrar(uid, activo=bool(activo), rol=rol, password_hash=password_hash)
+    token = create_token_seguimiento(
+        usuario_id=uid, usuario=usuario, nombre=nombre, rol=rol, version_password=version_password(password_hash),
+    )
     return TokenSeguimientoResponse(
         access_token=token,
         usuario={"id": uid, "nombre": nombre, "usuario": usuario, "rol": rol},
@@ -72,15 +94,24 @@ def login(body: LoginSeguimientoRequest):
 
 
 @router.post("/cambiar-password", summary="Cambiar contraseña (obligatorio en el primer login)")
-def cambiar_password(
+async def cambiar_password(
     body: CambiarPasswordPrimerLoginRequest,
     user: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ):
-    nuevo_hash = hash_password(body.nueva_password)
-    with engine_analitica.connect() as conn:
-        conn.execute(
+    nuevo_hash = await generar_hash_seguimiento(body.nueva_password)
+    async with async_engine_analitica.connect() as conn:
+        await conn.execute(
             text("UPDATE usuarios_seg_proceso_mc SET password_hash=:h, primer_login=0 WHERE id=:id"),
             {"h": nuevo_hash, "id": user["usuario_id"]},
         )
-        conn.commit()
-    return {"status": "ok"}
+        await conn.commit()
+    invalidar_usuario(MODULO_SEGUIMIENTO, user["usuario_id"])
+    # El token con el que se hizo el cambio queda revocado (lleva la versión
+    # de la contraseña anterior); se devuelve uno nuevo para seguir la sesión.
+    nueva_version = version_password(nuevo_hash)
+    ESTADO_USUARIOS.actualizar(user["usuario_id"], version_password=nueva_version)
+    token = create_token_seguimiento(
+        usuario_id=user["usuario_id"], usuario=user["usuario"], nombre=user["nombre"], rol=user["rol"],
+        version_password=nueva_version,
+    )
+    return {"status": "ok", "access_token": token, "token_type": "bearer"}
@@ -2,14 +2,16 @@ from typing import Annotated, Any, Dict, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import text
+from sqlalchemy.engine import Engine
 from sqlmodel import Session
 
 from ..core.actividades_seguimiento import crear_instancias_actividades
-from ..core.database import engine_analitica, get_session_analitica
+from ..core.database import engine_analitica, get_engine_analitica_lectura, get_session_analitica
 from ..models.seguimiento_catalogo import ActividadBaseCreate, ActividadBaseUpdate
 from .seguimiento_auth import get_current_user_seguimiento, require_rol
 
 SessionDep = Annotated[Session, Depends(get_session_analitica)]
+EngineLecturaDep = Annotated[Engine, Depends(get_engine_analitica_lectura)]
 router = APIRouter(prefix="/seguimiento/catalogo", tags=["Seguimiento · Catálogo de actividades"])
 
 TIPOS_VALIDOS = ("ejecucion", "liquidacion", "cierre")
@@ -23,10 +25,11 @@ def _validar_tipo(tipo: str) -> None:
 @router.get("/{tipo}", summary="Listar actividades del catálogo por tipo (ejecucion|liquidacion|cierre)")
 def list_catalogo(
     tipo: str,
+    engine: EngineLecturaDep,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> List[Dict[str, Any]]:
     _validar_tipo(tipo)
-    with engine_analitica.connect() as conn:
+    with engine.connect() as conn:
         rows = conn.execute(
             text("""
                 SELECT id, nombre, subcategoria, subcategoria_orden, orden, es_relevante, tiene_fecha_limite
@@ -84,18 +87,20 @@ def create_actividad_catalogo(
                 "tiene_fecha_limite": int(data.tiene_fecha_limite),
             },
         )
-        conn.commit()
         nuevo_id = result.lastrowid
 
         periodos = conn.execute(
             text("SELECT id, convenio_id FROM convenio_periodos_seg_mc")
         ).mappings().all()
 
-    periodos_sincronizados = 0
-    for p in periodos:
-        insertadas = crear_instancias_actividades(engine_analitica, p["convenio_id"], p["id"], tipo)
-        if insertadas:
-            periodos_sincronizados += 1
+        # La actividad nueva y sus instancias en todos los períodos se
+        # confirman juntas en un único commit.
+        periodos_sincronizados = 0
+        for p in periodos:
+            insertadas = crear_instancias_actividades(conn, p["convenio_id"], p["id"], tipo)
+            if insertadas:
+                periodos_sincronizados += 1
+        conn.commit()
 
     return {"id": nuevo_id, "periodos_sincronizados": periodos_sincronizados, "total_periodos": len(periodos)}
 
@@ -4,14 +4,18 @@ from typing import Annotated, Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
-from sqlmodel import Session
+from sqlalchemy.engine import Connection
 
 from ..core.actividades_seguimiento import (
     calcular_nivel_alerta_convenio,
     crear_instancias_actividades,
     preseed_notificaciones_pasadas,
 )
-from ..core.database import engine_analitica, get_session_analitica
+from ..core.database import (
+    engine_analitica,
+    get_conexion_analitica,
+    get_conexion_analitica_lectura,
+)
 from ..core.fechas_seguimiento import calcular_fechas_liquidacion
 from ..core.informes_seguimiento import _get_progreso_periodo
 from ..models.seguimiento_alertas import ConvenioDetalleOut
@@ -22,7 +26,10 @@ from ..models.seguimiento_convenios import (
 )
 from .seguimiento_auth import get_current_user_seguimiento, require_rol
 
-SessionDep = Annotated[Session, Depends(get_session_analitica)]
+# Una sola conexión/transacción por request (ver get_conexion_analitica).
+ConexionDep = Annotated[Connection, Depends(get_conexion_analitica)]
+# Lecturas de tablero: réplica de analitica si está configurada (ver config).
+ConexionLecturaDep = Annotated[Connection, Depends(get_conexion_analitica_lectura)]
 router = APIRouter(prefix="/seguimiento", tags=["Seguimiento · Convenios"])
 
 ESTADOS_VALIDOS = ["En ejecución", "En liquidación", "En cierre", "Cerrado"]
@@ -38,41 +45,39 @@ ESTADO_A_TIPO_ACTIVO = {
 }
 
 
-def _agregar_periodo_convenio(convenio_id: int, periodo: str) -> Optional[int]:
+def _agregar_periodo_convenio(conn: Connection, convenio_id: int, periodo: str) -> Optional[int]:
     """
     Réplica exacta de app/seguimiento/db.py::agregar_periodo_convenio.
     Crea el período (si no existía ya, comparando sin distinguir mayúsculas/espacios)
     y sus instancias de actividades para los 3 tipos. Retorna el id del período
-    creado, o None si ya existía.
+    creado, o None si ya existía. No hace commit: queda en la transacción de `conn`.
     """
     periodo = periodo.strip()
-    with engine_analitica.connect() as conn:
-        existentes = conn.execute(
-            text("SELECT id, periodo, orden FROM convenio_periodos_seg_mc WHERE convenio_id=:cid ORDER BY orden, id"),
-            {"cid": convenio_id},
-        ).fetchall()
-        if any(p.periodo.strip().lower() == periodo.lower() for p in existentes):
-            return None
-        nuevo_orden = (max((p.orden for p in existentes), default=0)) + 1
-        result = conn.execute(
-            text("INSERT INTO convenio_periodos_seg_mc (convenio_id, periodo, orden) VALUES (:cid, :periodo, :orden)"),
-            {"cid": convenio_id, "periodo": periodo, "orden": nuevo_orden},
-        )
-        conn.commit()
-        nuevo_id = result.lastrowid
+    existentes = conn.execute(
+        text("SELECT id, periodo, orden FROM convenio_periodos_seg_mc WHERE convenio_id=:cid ORDER BY orden, id"),
+        {"cid": convenio_id},
+    ).fetchall()
+    if any(p.periodo.strip().lower() == periodo.lower() for p in existentes):
+        return None
+    nuevo_orden = (max((p.orden for p in existentes), default=0)) + 1
+    result = conn.execute(
+        text("INSERT INTO convenio_periodos_seg_mc (convenio_id, periodo, orden) VALUES (:cid, :periodo, :orden)"),
+        {"cid": convenio_id, "periodo": periodo, "orden": nuevo_orden},
+    )
+    nuevo_id = result.lastrowid
 
     if nuevo_id:
         for tipo in ("ejecucion", "liquidacion", "cierre"):
-            crear_instancias_actividades(engine_analitica, convenio_id, nuevo_id, tipo)
+            crear_instancias_actividades(conn, convenio_id, nuevo_id, tipo)
     return nuevo_id
 
 
 @router.get("/convenios", summary="Listar convenios (con datos de la IES y nivel de alerta)")
 def list_convenios(
-    session: SessionDep,
+    conn: ConexionLecturaDep,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> List[Dict[str, Any]]:
-    rows = session.exec(
+    rows = conn.execute(
         text("""
             SELECT c.id, c.codigo, i.nombre AS ies_nombre, i.sigla AS ies_sigla,
                    c.periodo_academico, c.estado, c.valor,
@@ -91,7 +96,7 @@ def list_convenios(
         # Igual que en pagina_tablero() del Streamlit original: cada tarjeta de
         # convenio se colorea según su nivel de alerta más urgente vigente.
         nivel_alerta, motivos_alerta = calcular_nivel_alerta_convenio(
-            engine_analitica,
+            conn,
             d["id"],
             d["fecha_limite_liquidacion_voluntaria"],
             d["fecha_limite_liquidacion_unilateral"],
@@ -109,52 +114,54 @@ def list_convenios(
 @router.post("/convenios", status_code=status.HTTP_201_CREATED, summary="Registrar nuevo convenio (solo ADMIN)")
 def create_convenio(
     data: ConvenioSeguimientoCreate,
+    conn: ConexionDep,
     _: Dict[str, Any] = Depends(require_rol("ADMIN")),
 ) -> Dict[str, Any]:
     f_liq_vol, f_liq_uni, f_liq_jud = calcular_fechas_liquidacion(data.fecha_fin_convenio)
 
-    with engine_analitica.connect() as conn:
-        try:
-            result = conn.execute(
-                text("""
-                    INSERT INTO convenios_seg_proceso_mc
-                        (codigo, ies_id, periodo_academico, estado, valor,
-                         fecha_inicio_convenio, fecha_fin_convenio,
-                         fecha_limite_liquidacion_voluntaria, fecha_limite_liquidacion_unilateral,
-                         fecha_limite_liquidacion_judicial, fecha_vencimiento_poliza,
-                         supervisor, apoyo_supervision, observaciones_generales, creado_por)
-                    VALUES (:codigo, :ies_id, :periodo_academico, 'En ejecución', :valor,
-                            :fecha_inicio_convenio, :fecha_fin_convenio,
-                            :f_liq_vol, :f_liq_uni, :f_liq_jud, :fecha_vencimiento_poliza,
-                            :supervisor, :apoyo_supervision, :observaciones_generales, :creado_por)
-                """),
-                {
-                    "codigo": data.codigo.strip(),
-                    "ies_id": data.ies_id,
-                    "periodo_academico": data.periodo_academico.strip(),
-                    "valor": data.valor,
-                    "fecha_inicio_convenio": data.fecha_inicio_convenio,
-                    "fecha_fin_convenio": data.fecha_fin_convenio,
-                    "f_liq_vol": f_liq_vol,
-                    "f_liq_uni": f_liq_uni,
-                    "f_liq_jud": f_liq_jud,
-                    "fecha_vencimiento_poliza": data.fecha_vencimiento_poliza,
-                    "supervisor": data.supervisor,
-                    "apoyo_supervision": data.apoyo_supervision,
-                    "observaciones_generales": data.observaciones_generales,
-                    "creado_por": data.creado_por,
-                },
-            )
-            conn.commit()
-            new_id = result.lastrowid
-        except IntegrityError:
-            raise HTTPException(status_code=400, detail="Ya existe un convenio con ese código.")
+    try:
+        result = conn.execute(
+            text("""
+                INSERT INTO convenios_seg_proceso_mc
+                    (codigo, ies_id, periodo_academico, estado, valor,
+                     fecha_inicio_convenio, fecha_fin_convenio,
+                     fecha_limite_liquidacion_voluntaria, fecha_limite_liquidacion_unilateral,
+                     fecha_limite_liquidacion_judicial, fecha_vencimiento_poliza,
+                     supervisor, apoyo_supervision, observaciones_generales, creado_por)
+                VALUES (:codigo, :ies_id, :periodo_academico, 'En ejecución', :valor,
+                        :fecha_inicio_convenio, :fecha_fin_convenio,
+                        :f_liq_vol, :f_liq_uni, :f_liq_jud, :fecha_vencimiento_poliza,
+                        :supervisor, :apoyo_supervision, :observaciones_generales, :creado_por)
+            """),
+            {
+                "codigo": data.codigo.strip(),
+                "ies_id": data.ies_id,
+                "periodo_academico": data.periodo_academico.strip(),
+                "valor": data.valor,
+                "fecha_inicio_convenio": data.fecha_inicio_convenio,
+                "fecha_fin_convenio": data.fecha_fin_convenio,
+                "f_liq_vol": f_liq_vol,
+                "f_liq_uni": f_liq_uni,
+                "f_liq_jud": f_liq_jud,
+                "fecha_vencimiento_poliza": data.fecha_vencimiento_poliza,
+                "supervisor": data.supervisor,
+                "apoyo_supervision": data.apoyo_supervision,
+                "observaciones_generales": data.observaciones_generales,
+                "creado_por": data.creado_por,
+            },
+        )
+        new_id = result.lastrowid
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Ya existe un convenio con ese código.")
 
     if not new_id:
         raise HTTPException(status_code=500, detail="No se pudo crear el convenio.")
 
-    _agregar_periodo_convenio(new_id, data.periodo_academico)
-    preseed_notificaciones_pasadas(engine_analitica, new_id, f_liq_vol, f_liq_uni, f_liq_jud, data.fecha_vencimiento_poliza)
+    # Convenio, período inicial, instancias de actividades y notificaciones
+    # precargadas quedan en la misma transacción: o se crea todo o nada.
+    _agregar_periodo_convenio(conn, new_id, data.periodo_academico)
+    preseed_notificaciones_pasadas(conn, new_id, f_liq_vol, f_liq_uni, f_liq_jud, data.fecha_vencimiento_poliza)
+    conn.commit()
 
     return {
         "id": new_id,
@@ -168,30 +175,30 @@ def create_convenio(
 @router.get("/convenios/{convenio_id}", response_model=ConvenioDetalleOut, summary="Detalle de un convenio, con nivel de alerta")
 def get_convenio_detalle(
     convenio_id: int,
+    conn: ConexionLecturaDep,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> ConvenioDetalleOut:
-    with engine_analitica.connect() as conn:
-        row = conn.execute(
-            text("""
-                SELECT c.id, c.codigo, i.nombre AS ies_nombre, i.sigla AS ies_sigla,
-                       c.periodo_academico, c.estado, c.valor,
-                       c.fecha_inicio_convenio, c.fecha_fin_convenio,
-                       c.fecha_limite_liquidacion_voluntaria, c.fecha_limite_liquidacion_unilateral,
-                       c.fecha_limite_liquidacion_judicial, c.fecha_vencimiento_poliza,
-                       c.supervisor, c.apoyo_supervision, c.observaciones_generales,
-                       c.fecha_firma_director_general, c.creado_por
-                FROM convenios_seg_proceso_mc c
-                JOIN ies_seg_proceso_mc i ON c.ies_id = i.id
-                WHERE c.id = :cid
-            """),
-            {"cid": convenio_id},
-        ).mappings().fetchone()
+    row = conn.execute(
+        text("""
+            SELECT c.id, c.codigo, i.nombre AS ies_nombre, i.sigla AS ies_sigla,
+                   c.periodo_academico, c.estado, c.valor,
+                   c.fecha_inicio_convenio, c.fecha_fin_convenio,
+                   c.fecha_limite_liquidacion_voluntaria, c.fecha_limite_liquidacion_unilateral,
+                   c.fecha_limite_liquidacion_judicial, c.fecha_vencimiento_poliza,
+                   c.supervisor, c.apoyo_supervision, c.observaciones_generales,
+                   c.fecha_firma_director_general, c.creado_por
+            FROM convenios_seg_proceso_mc c
+            JOIN ies_seg_proceso_mc i ON c.ies_id = i.id
+            WHERE c.id = :cid
+        """),
+        {"cid": convenio_id},
+    ).mappings().fetchone()
 
     if not row:
         raise HTTPException(status_code=404, detail="Convenio no encontrado")
 
     nivel_alerta, motivos_alerta = calcular_nivel_alerta_convenio(
-        engine_analitica,
+        conn,
         convenio_id,
         row["fecha_limite_liquidacion_voluntaria"],
         row["fecha_limite_liquidacion_unilateral"],
@@ -229,38 +236,38 @@ def get_convenio_detalle(
 def update_convenio(
     convenio_id: int,
     data: ConvenioSeguimientoUpdate,
+    conn: ConexionDep,
     _: Dict[str, Any] = Depends(require_rol("ADMIN")),
 ) -> Dict[str, Any]:
     campos = data.dict(exclude_unset=True)
     if not campos:
         raise HTTPException(status_code=400, detail="No se enviaron campos para actualizar")
 
-    with engine_analitica.connect() as conn:
-        actual = conn.execute(
-            text("SELECT fecha_fin_convenio, fecha_vencimiento_poliza FROM convenios_seg_proceso_mc WHERE id=:cid"),
-            {"cid": convenio_id},
-        ).mappings().fetchone()
-        if not actual:
-            raise HTTPException(status_code=404, detail="Convenio no encontrado")
-
-        nueva_fecha_fin = campos.get("fecha_fin_convenio", actual["fecha_fin_convenio"])
-        nueva_fecha_pol = campos.get("fecha_vencimiento_poliza", actual["fecha_vencimiento_poliza"])
-        f_liq_vol, f_liq_uni, f_liq_jud = calcular_fechas_liquidacion(nueva_fecha_fin)
-        campos["fecha_limite_liquidacion_voluntaria"] = f_liq_vol
-        campos["fecha_limite_liquidacion_unilateral"] = f_liq_uni
-        campos["fecha_limite_liquidacion_judicial"] = f_liq_jud
-
-        set_clause = ", ".join(f"{campo}=:{campo}" for campo in campos)
-        try:
-            conn.execute(
-                text(f"UPDATE convenios_seg_proceso_mc SET {set_clause} WHERE id=:cid"),
-                {**campos, "cid": convenio_id},
-            )
-            conn.commit()
-        except IntegrityError:
-            raise HTTPException(status_code=400, detail="Ya existe un convenio con ese código.")
-
-    preseed_notificaciones_pasadas(engine_analitica, convenio_id, f_liq_vol, f_liq_uni, f_liq_jud, nueva_fecha_pol)
+    actual = conn.execute(
+        text("SELECT fecha_fin_convenio, fecha_vencimiento_poliza FROM convenios_seg_proceso_mc WHERE id=:cid"),
+        {"cid": convenio_id},
+    ).mappings().fetchone()
+    if not actual:
+        raise HTTPException(status_code=404, detail="Convenio no encontrado")
+
+    nueva_fecha_fin = campos.get("fecha_fin_convenio", actual["fecha_fin_convenio"])
+    nueva_fecha_pol = campos.get("fecha_vencimiento_poliza", actual["fecha_vencimiento_poliza"])
+    f_liq_vol, f_liq_uni, f_liq_jud = calcular_fechas_liquidacion(nueva_fecha_fin)
+    campos["fecha_limite_liquidacion_voluntaria"] = f_liq_vol
+    campos["fecha_limite_liquidacion_unilateral"] = f_liq_uni
+    campos["fecha_limite_liquidacion_judicial"] = f_liq_jud
+
+    set_clause = ", ".join(f"{campo}=:{campo}" for campo in campos)
+    try:
+        conn.execute(
+            text(f"UPDATE convenios_seg_proceso_mc SET {set_clause} WHERE id=:cid"),
+            {**campos, "cid": convenio_id},
+        )
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Ya existe un convenio con ese código.")
+
+    preseed_notificaciones_pasadas(conn, convenio_id, f_liq_vol, f_liq_uni, f_liq_jud, nueva_fecha_pol)
+    conn.commit()
 
     return {
         "id": convenio_id,
@@ -273,16 +280,16 @@ def update_convenio(
 @router.get("/convenios/{convenio_id}/periodos", summary="Listar períodos de un convenio, con su % de avance en la etapa activa")
 def list_periodos(
     convenio_id: int,
+    conn: ConexionLecturaDep,
     _: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> List[Dict[str, Any]]:
-    with engine_analitica.connect() as conn:
-        estado = conn.execute(
-            text("SELECT estado FROM convenios_seg_proceso_mc WHERE id=:cid"), {"cid": convenio_id}
-        ).scalar()
-        rows = conn.execute(
-            text("SELECT id, convenio_id, periodo, orden, creado_en FROM convenio_periodos_seg_mc WHERE convenio_id=:cid ORDER BY orden, id"),
-            {"cid": convenio_id},
-        ).mappings().all()
+    estado = conn.execute(
+        text("SELECT estado FROM convenios_seg_proceso_mc WHERE id=:cid"), {"cid": convenio_id}
+    ).scalar()
+    rows = conn.execute(
+        text("SELECT id, convenio_id, periodo, orden, creado_en FROM convenio_periodos_seg_mc WHERE convenio_id=:cid ORDER BY orden, id"),
+        {"cid": convenio_id},
+    ).mappings().all()
 
     # Igual que en pagina_tablero() del Streamlit original: cada período
     # muestra su barra de progreso calculada sobre la etapa (tipo) activa
@@ -291,7 +298,7 @@ def list_periodos(
     resultado = []
     for r in rows:
         d = dict(r)
-        d["porcentaje_avance"] = _get_progreso_periodo(engine_analitica, d["id"], tipo_activo)
+        d["porcentaje_avance"] = _get_progreso_periodo(conn, d["id"], tipo_activo)
         resultado.append(d)
     return resultado
 
@@ -300,18 +307,19 @@ def list_periodos(
 def create_periodo(
     convenio_id: int,
     data: ConvenioPeriodoCreate,
+    conn: ConexionDep,
     _: Dict[str, Any] = Depends(require_rol("ADMIN")),
 ) -> Dict[str, Any]:
-    with engine_analitica.connect() as conn:
-        existe = conn.execute(
-            text("SELECT id FROM convenios_seg_proceso_mc WHERE id=:cid"), {"cid": convenio_id}
-        ).fetchone()
+    existe = conn.execute(
+        text("SELECT id FROM convenios_seg_proceso_mc WHERE id=:cid"), {"cid": convenio_id}
+    ).fetchone()
     if not existe:
         raise HTTPException(status_code=404, detail="Convenio no encontrado")
 
-    nuevo_id = _agregar_periodo_convenio(convenio_id, data.periodo)
+    nuevo_id = _agregar_periodo_convenio(conn, convenio_id, data.periodo)
     if not nuevo_id:
         raise HTTPException(status_code=400, detail="Ese período ya existe para este convenio.")
+    conn.commit()
     return {"id": nuevo_id, "convenio_id": convenio_id, "periodo": data.periodo.strip()}
 
 
@@ -4,16 +4,17 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
-from ..core.database import get_session_analitica
+from ..core.database import get_session_analitica, get_session_analitica_lectura
 from ..models.seguimiento_ies import IESSeguimiento, IESSeguimientoCreate, IESSeguimientoUpdate
 from .seguimiento_auth import get_current_user_seguimiento, require_rol
 
 SessionDep = Annotated[Session, Depends(get_session_analitica)]
+SessionLecturaDep = Annotated[Session, Depends(get_session_analitica_lectura)]
 router = APIRouter(prefix="/seguimiento/ies", tags=["Seguimiento · IES"])
 
 
 @router.get("/", response_model=List[IESSeguimiento], summary="Listar IES activas")
-def list_ies(session: SessionDep, _: Dict[str, Any] = Depends(get_current_user_seguimiento)):
+def list_ies(session: SessionLecturaDep, _: Dict[str, Any] = Depends(get_current_user_seguimiento)):
     statement = select(IESSeguimiento).where(IESSeguimiento.activa == 1).order_by(IESSeguimiento.nombre)
     return session.exec(statement).all()
 
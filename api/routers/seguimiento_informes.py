@@ -1,50 +1,55 @@
 import json
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Annotated, Any, Dict, List, Tuple
  
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import text
+from sqlalchemy.engine import Connection
  
 from ..core.actividades_seguimiento import calcular_nivel_alerta_convenio
-from ..core.database import engine_analitica
+from ..core.database import engine_analitica_lectura, get_conexion_analitica_lectura
 from ..core.informes_seguimiento import generar_pdf_informe, get_datos_informe_periodo
 from .seguimiento_auth import get_current_user_seguimiento
  
 router = APIRouter(prefix="/seguimiento/informes", tags=["Seguimiento · Informes"])
  
- 
-def _get_convenio_detalle_row(convenio_id: int) -> Dict[str, Any]:
-    with engine_analitica.connect() as conn:
-        row = conn.execute(
-            text("""
-                SELECT c.id, c.codigo, i.nombre AS ies_nombre, i.sigla AS ies_sigla,
-                       c.periodo_academico, c.estado, c.valor,
-                       c.fecha_inicio_convenio, c.fecha_fin_convenio,
-                       c.fecha_limite_liquidacion_voluntaria, c.fecha_limite_liquidacion_unilateral,
-                       c.fecha_limite_liquidacion_judicial, c.fecha_vencimiento_poliza,
-                       c.supervisor, c.apoyo_supervision, c.observaciones_generales,
-                       c.creado_por, c.creado_en, c.fecha_firma_director_general
-                FROM convenios_seg_proceso_mc c
-                JOIN ies_seg_proceso_mc i ON c.ies_id = i.id
-                WHERE c.id = :cid
-            """),
-            {"cid": convenio_id},
-        ).mappings().fetchone()
+# Los informes son solo lectura: van por la réplica de analitica si está
+# configurada, incluidos los PDF (que son POST solo porque reciben el
+# multipart con notas/imágenes).
+ConexionLecturaDep = Annotated[Connection, Depends(get_conexion_analitica_lectura)]
+ 
+ 
+def _get_convenio_detalle_row(conn: Connection, convenio_id: int) -> Dict[str, Any]:
+    row = conn.execute(
+        text("""
+            SELECT c.id, c.codigo, i.nombre AS ies_nombre, i.sigla AS ies_sigla,
+                   c.periodo_academico, c.estado, c.valor,
+                   c.fecha_inicio_convenio, c.fecha_fin_convenio,
+                   c.fecha_limite_liquidacion_voluntaria, c.fecha_limite_liquidacion_unilateral,
+                   c.fecha_limite_liquidacion_judicial, c.fecha_vencimiento_poliza,
+                   c.supervisor, c.apoyo_supervision, c.observaciones_generales,
+                   c.creado_por, c.creado_en, c.fecha_firma_director_general
+            FROM convenios_seg_proceso_mc c
+            JOIN ies_seg_proceso_mc i ON c.ies_id = i.id
+            WHERE c.id = :cid
+        """),
+        {"cid": convenio_id},
+    ).mappings().fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Convenio no encontrado")
     return dict(row)
  
  
-def _get_periodos_convenio(convenio_id: int) -> List[Dict[str, Any]]:
-    with engine_analitica.connect() as conn:
-        rows = conn.execute(
-            text("SELECT id, periodo, orden FROM convenio_periodos_seg_mc WHERE convenio_id=:cid ORDER BY orden, id"),
-            {"cid": convenio_id},
-        ).mappings().all()
+def _get_periodos_convenio(conn: Connection, convenio_id: int) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        text("SELECT id, periodo, orden FROM convenio_periodos_seg_mc WHERE convenio_id=:cid ORDER BY orden, id"),
+        {"cid": convenio_id},
+    ).mappings().all()
     return [dict(r) for r in rows]
  
  
 def _armar_contexto(
+    conn: Connection,
     det: Dict[str, Any],
     periodos_a_mostrar: List[Dict[str, Any]],
     titulo_informe: str,
@@ -56,7 +61,7 @@ def _armar_contexto(
     usuario_nombre: str,
 ) -> Dict[str, Any]:
     nivel_alerta, motivos_alerta = calcular_nivel_alerta_convenio(
-        engine_analitica,
+        conn,
         det["id"],
         det["fecha_limite_liquidacion_voluntaria"],
         det["fecha_limite_liquidacion_unilateral"],
@@ -76,7 +81,7 @@ def _armar_contexto(
  
     periodos_contexto = []
     for p in periodos_a_mostrar:
-        datos = get_datos_informe_periodo(engine_analitica, p["id"])
+        datos = get_datos_informe_periodo(conn, p["id"])
         periodos_contexto.append({
             "label": p["periodo"],
             "tipos": [
@@ -124,6 +129,7 @@ def _armar_contexto(
 @router.get("/periodo/{periodo_id}", summary="Datos del informe de un período específico (JSON)")
 def informe_periodo_json(
     periodo_id: int,
+    conn: ConexionLecturaDep,
     incluir_alerta: bool = True,
     incluir_fechas: bool = True,
     incluir_ejecucion: bool = True,
@@ -131,19 +137,18 @@ def informe_periodo_json(
     incluir_cierre: bool = True,
     user: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> Dict[str, Any]:
-    with engine_analitica.connect() as conn:
-        fila = conn.execute(
-            text("SELECT convenio_id, periodo FROM convenio_periodos_seg_mc WHERE id=:pid"), {"pid": periodo_id}
-        ).mappings().fetchone()
+    fila = conn.execute(
+        text("SELECT convenio_id, periodo FROM convenio_periodos_seg_mc WHERE id=:pid"), {"pid": periodo_id}
+    ).mappings().fetchone()
     if not fila:
         raise HTTPException(status_code=404, detail="Período no encontrado")
  
-    det = _get_convenio_detalle_row(fila["convenio_id"])
+    det = _get_convenio_detalle_row(conn, fila["convenio_id"])
     periodos_a_mostrar = [{"id": periodo_id, "periodo": fila["periodo"]}]
     titulo_informe = f"Informe · Período {fila['periodo']}"
  
     return _armar_contexto(
-        det, periodos_a_mostrar, titulo_informe,
+        conn, det, periodos_a_mostrar, titulo_informe,
         incluir_alerta, incluir_fechas, incluir_ejecucion, incluir_liquidacion, incluir_cierre,
         user.get("nombre", "usuario"),
     )
@@ -152,6 +157,7 @@ def informe_periodo_json(
 @router.get("/convenio/{convenio_id}", summary="Datos del informe consolidado de un convenio, todos sus períodos (JSON)")
 def informe_convenio_json(
     convenio_id: int,
+    conn: ConexionLecturaDep,
     incluir_alerta: bool = True,
     incluir_fechas: bool = True,
     incluir_ejecucion: bool = True,
@@ -159,12 +165,12 @@ def informe_convenio_json(
     incluir_cierre: bool = True,
     user: Dict[str, Any] = Depends(get_current_user_seguimiento),
 ) -> Dict[str, Any]:
-    det = _get_convenio_detalle_row(convenio_id)
-    periodos_a_mostrar = _get_periodos_convenio(convenio_id)
+    det = _get_convenio_detalle_row(conn, convenio_id)
+    periodos_a_mostrar = _get_periodos_convenio(conn, convenio_id)
     titulo_informe = "Informe consolidado del convenio"
  
     return _armar_contexto(
-        det, periodos_a_mostrar, titulo_informe,
+        conn, det, periodos_a_mostrar, titulo_informe,
         incluir_alerta, incluir_fechas, incluir_ejecucion, incluir_liquidacion, incluir_cierre,
         user.get("nombre", "usuario"),
     )
@@ -253,12 +259,13 @@ async def informe_periodo_pdf(
     filtros = _leer_filtros_form(form)
     notas_comentarios = await _leer_notas_comentarios_form(form)
  
-    contexto = informe_periodo_json(
-        periodo_id,
-        filtros["incluir_alerta"], filtros["incluir_fechas"], filtros["incluir_ejecucion"],
-        filtros["incluir_liquidacion"], filtros["incluir_cierre"],
-        user,
-    )
+    with engine_analitica_lectura.connect() as conn:
+        contexto = informe_periodo_json(
+            periodo_id, conn,
+            filtros["incluir_alerta"], filtros["incluir_fechas"], filtros["incluir_ejecucion"],
+            filtros["incluir_liquidacion"], filtros["incluir_cierre"],
+            user,
+        )
     contexto["incluir_resumen_ejecutivo"] = filtros["incluir_resumen_ejecutivo"]
     contexto["incluir_detalle_actividades"] = filtros["incluir_detalle_actividades"]
     pdf_bytes = generar_pdf_informe(contexto, notas_comentarios)
@@ -280,12 +287,13 @@ async def informe_convenio_pdf(
     filtros = _leer_filtros_form(form)
     notas_comentarios = await _leer_notas_comentarios_form(form)
  
-    contexto = informe_convenio_json(
-        convenio_id,
-        filtros["incluir_alerta"], filtros["incluir_fechas"], filtros["incluir_ejecucion"],
-        filtros["incluir_liquidacion"], filtros["incluir_cierre"],
-        user,
-    )
+    with engine_analitica_lectura.connect() as conn:
+        contexto = informe_convenio_json(
+            convenio_id, conn,
+            filtros["incluir_alerta"], filtros["incluir_fechas"], filtros["incluir_ejecucion"],
+            filtros["incluir_liquidacion"], filtros["incluir_cierre"],
+            user,
+        )
     contexto["incluir_resumen_ejecutivo"] = filtros["incluir_resumen_ejecutivo"]
     contexto["incluir_detalle_actividades"] = filtros["incluir_detalle_actividades"]
     pdf_bytes = generar_pdf_informe(contexto, notas_comentarios)
@@ -4,8 +4,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
  
+from ..core.cache_tokens import MODULO_SEGUIMIENTO, invalidar_usuario
 from ..core.database import engine_analitica
-from ..core.security_seguimiento import hash_password
+from ..core.database_async import async_engine_analitica
+from ..core.estado_usuarios import ESTADO_USUARIOS, version_password
+from ..core.hashing import generar_hash_seguimiento
 from ..models.seguimiento_usuarios import (
     UsuarioSeguimientoCreate,
     UsuarioSeguimientoEstadoUpdate,
@@ -33,7 +36,7 @@ def list_usuarios(_: Dict[str, Any] = Depends(require_rol("ADMIN"))):
  
  
 @router.post("/", response_model=UsuarioSeguimientoPublic, status_code=status.HTTP_201_CREATED, summary="Crear usuario de Seguimiento (solo ADMIN)")
-def create_usuario(
+async def create_usuario(
     data: UsuarioSeguimientoCreate,
     _: Dict[str, Any] = Depends(require_rol("ADMIN")),
 ):
@@ -44,14 +47,14 @@ def create_usuario(
     if not data.nombre.strip() or not data.usuario.strip():
         raise HTTPException(status_code=400, detail="Nombre y usuario son obligatorios.")
  
-    pwd_hash = hash_password(data.password)
-    with engine_analitica.connect() as conn:
-        existe = conn.execute(
+    pwd_hash = await generar_hash_seguimiento(data.password)
+    async with async_engine_analitica.connect() as conn:
+        existe = (await conn.execute(
             text("SELECT id FROM usuarios_seg_proceso_mc WHERE usuario=:u"), {"u": data.usuario.strip()}
-        ).fetchone()
+        )).fetchone()
         if existe:
             raise HTTPException(status_code=400, detail="Ya existe un usuario con ese nombre de usuario.")
-        result = conn.execute(
+        result = await conn.execute(
             text("""
                 INSERT INTO usuarios_seg_proceso_mc (nombre, usuario, password_hash, rol, primer_login)
                 VALUES (:nombre, :usuario, :password_hash, :rol, 1)
@@ -63,16 +66,17 @@ def create_usuario(
                 "rol": data.rol,
             },
         )
-        conn.commit()
+        await conn.commit()
         nuevo_id = result.lastrowid
  
-        row = conn.execute(
+        row = (await conn.execute(
             text("""
                 SELECT id, nombre, usuario, rol, activo, primer_login, creado_en
                 FROM usuarios_seg_proceso_mc WHERE id=:id
             """),
             {"id": nuevo_id},
-        ).mappings().fetchone()
+        )).mappings().fetchone()
+    ESTADO_USUARIOS.registrar(nuevo_id, activo=bool(row["activo"]), rol=row["rol"], password_hash=pwd_hash)
     return dict(row)
  
  
@@ -95,6 +99,8 @@ def update_estado_usuario(
             {"activo": data.activo, "id": usuario_id},
         )
         conn.commit()
+        invalidar_usuario(MODULO_SEGUIMIENTO, usuario_id)
+        ESTADO_USUARIOS.actualizar(usuario_id, activo=bool(data.activo))
         row = conn.execute(
             text("""
                 SELECT id, nombre, usuario, rol, activo, primer_login, creado_en
@@ -106,7 +112,7 @@ def update_estado_usuario(
  
  
 @router.patch("/{usuario_id}/password", summary="Restablecer la contraseña de un usuario (solo ADMIN)")
-def reset_password_usuario(
+async def reset_password_usuario(
     usuario_id: int,
     data: UsuarioSeguimientoPasswordUpdate,
     _: Dict[str, Any] = Depends(require_rol("ADMIN")),
@@ -122,18 +128,20 @@ def reset_password_usuario(
     if len(data.password) < 8:
         raise HTTPException(status_code=400, detail="La contraseña debe tener al menos 8 caracteres.")
  
-    pwd_hash = hash_password(data.password)
-    with engine_analitica.connect() as conn:
-        existe = conn.execute(
+    pwd_hash = await generar_hash_seguimiento(data.password)
+    async with async_engine_analitica.connect() as conn:
+        existe = (await conn.execute(
             text("SELECT id FROM usuarios_seg_proceso_mc WHERE id=:id"), {"id": usuario_id}
-        ).fetchone()
+        )).fetchone()
         if not existe:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
-        conn.execute(
+        await conn.execute(
             text("UPDATE usuarios_seg_proceso_mc SET password_hash=:h, primer_login=1 WHERE id=:id"),
             {"h": pwd_hash, "id": usuario_id},
         )
-        conn.commit()
+        await conn.commit()
+    invalidar_usuario(MODULO_SEGUIMIENTO, usuario_id)
+    ESTADO_USUARIOS.actualizar(usuario_id, version_password=version_password(pwd_hash))
     return {"status": "ok"}
  
  
@@ -163,6 +171,8 @@ def delete_usuario(
         try:
             conn.execute(text("DELETE FROM usuarios_seg_proceso_mc WHERE id=:id"), {"id": usuario_id})
             conn.commit()
+            invalidar_usuario(MODULO_SEGUIMIENTO, usuario_id)
+            ESTADO_USUARIOS.eliminar(usuario_id)
         except IntegrityError:
             conn.rollback()
             raise HTTPException(
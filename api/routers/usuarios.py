@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session, select
 from sqlalchemy.exc import IntegrityError
 
+from ..core.cache_tokens import MODULO_API, invalidar_usuario
 from ..core.database import get_session_analitica
 from ..models.usuarios import Usuario, UsuarioCreate, UsuarioUpdate
 from .auth import get_current_user
@@ -92,6 +93,8 @@ def update_usuario(
         session.add(db_user)
         session.commit()
         session.refresh(db_user)
+        if update_data.keys() & {"activo", "password_hash", "sal"}:
+            invalidar_usuario(MODULO_API, db_user.username)
         return db_user
     except IntegrityError:
         session.rollback()
@@ -112,6 +115,7 @@ def delete_usuario(user_id: int, session: SessionDep, user: Dict[str, Any] = Dep
     try:
         session.delete(db_user)
         session.commit()
+        invalidar_usuario(MODULO_API, db_user.username)
         return None
     except Exception as e:
         session.rollback()
@@ -1,61 +1,325 @@
-from typing import Annotated, Any, Dict, List, Optional
+import base64
+import hashlib
+import json
+import time
+from datetime import datetime
+from enum import Enum
+from typing import Annotated, Any, Dict, List, Optional, Tuple
 
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, distinct, text
-from api.core.database import get_session_dtf_financiera
+from fastapi.responses import JSONResponse
+from sqlalchemy import JSON, Table, and_, func, or_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlmodel import select, distinct
+from sqlmodel.ext.asyncio.session import AsyncSession
+from api.core.busqueda import ModoBusqueda, condicion
+from api.core.cache_respuestas import cachear
+from api.core.config import TOTALES_GIROS_RENOVACION_S
+from api.core.database_async import async_engine_dtf_financiera, get_async_session_dtf_financiera
+from api.core.exportacion import FormatoExportacion, respuesta_exportacion, valor_json
+from api.core.plazos import plazo
+from api.core.vistas_materializadas import COLUMNA_FILA, columna_fila, tabla
 from api.models.vw_giros_general_historico_ies import VwGirosGeneralHistoricoIes
 
 from .auth import get_current_user
 
 router = APIRouter(tags=["Vista Giros General Historico IES"])
 
-@router.get("/", summary="Obtener todos los registros", description="Retorna todos los registros de la vista con paginación y filtros")
-def obtener_vista_giros(
+# ── Lectura como filas (Core), no como entidades ────────────────────────────
+# El modelo declara documento como PK, pero en la vista cada documento tiene
+# muchos giros. select(VwGirosGeneralHistoricoIes) pasaba cada fila por el
+# identity map, que devolvía la MISMA entidad (la de la primera fila) para
+# todas las de un documento: /documento/.../periodo-academico/... repetía
+# un giro N veces en vez de devolver los N. Además instanciaba un modelo de
+# ~50 columnas por fila. Los endpoints leen las columnas con _leer_filas()
+# (dicts, sin identity map) y / y /pagina/ las serializan directo con
+# RespuestaFilas, sin pasar por jsonable_encoder. Medido con
+# benchmarks/hidratacion_giros.py sobre el banco local (SQLite), lectura +
+# JSON de la respuesta:
+#
+#      filas   antes, ORM (filas/s)   ahora, Core (filas/s)
+#        100                  3,713                  16,037
+#       1000                  3,947                  19,681
+#      10000                  4,072                  21,026
+
+_VISTA = VwGirosGeneralHistoricoIes.__table__
+
+# Con la vista en VISTAS_MATERIALIZADAS, cada endpoint lee de la copia
+# indexada mientras esté dentro de VW_GIROS_GENERAL_MAX_ANTIGUEDAD_S (ver
+# api/core/vistas_materializadas.py): tabla(_VISTA) devuelve la Table de la
+# copia, con las mismas columnas, o _VISTA. Se pide una vez por request y
+# todo el statement se arma sobre ella.
+
+
+async def _leer_filas(db: AsyncSession, statement) -> List[Dict[str, Any]]:
+    return [dict(r) for r in (await db.execute(statement)).mappings()]
+
+
+class RespuestaFilas(JSONResponse):
+    """JSONResponse que acepta las fechas y decimales de las filas crudas."""
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(
+            content, default=valor_json, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        ).encode("utf-8")
+
+
+@router.get(
+    "/",
+    summary="Obtener todos los registros",
+    description="Retorna todos los registros de la vista con paginación y filtros. Cambio para quienes ya la "
+                "usaban: documento, fondo e ies buscaban el texto en cualquier parte del valor; ahora documento "
+                "es exacto y fondo e ies son prefijos por defecto (fondo=EPM ya no encuentra \"Fondo EPM\"), "
+                "con modo_documento, modo_fondo y modo_ies para elegir entre exacto y prefijo. La búsqueda en "
+                "cualquier parte ya no existe: no puede usar índices.",
+    dependencies=[Depends(plazo(10))],
+)
+async def obtener_vista_giros(
     skip: int = 0,
     limit: int = 100,
     documento: str = Query(None, description="Filtrar por documento"),
     estado: str = Query(None, description="Filtrar por estado"),
     fondo: str = Query(None, description="Filtrar por fondo"),
     ies: str = Query(None, description="Filtrar por IES"),
-    db: Session = Depends(get_session_dtf_financiera),
+    modo_documento: ModoBusqueda = Query(ModoBusqueda.exacto, description="exacto o prefijo"),
+    modo_fondo: ModoBusqueda = Query(ModoBusqueda.prefijo, description="exacto o prefijo"),
+    modo_ies: ModoBusqueda = Query(ModoBusqueda.prefijo, description="exacto o prefijo"),
+    db: AsyncSession = Depends(get_async_session_dtf_financiera),
     _: Dict[str, Any] = Depends(get_current_user)
 ):
     try:
-        statement = select(VwGirosGeneralHistoricoIes)
-        
-        # Aplicar filtros
-        if documento:
-            statement = statement.where(VwGirosGeneralHistoricoIes.documento.contains(documento))
-        if estado:
-            statement = statement.where(VwGirosGeneralHistoricoIes.estado == estado)
-        if fondo:
-            statement = statement.where(VwGirosGeneralHistoricoIes.fondo.contains(fondo))
-        if ies:
-            statement = statement.where(VwGirosGeneralHistoricoIes.ies.contains(ies))
+        vista = tabla(_VISTA)
+        statement = _filtrar(
+            select(*vista.c), documento, estado, fondo, ies, modo_documento, modo_fondo, modo_ies, vista,
+        )
         
-        # Aplicar paginación
+        # Aplicar paginación (para recorrer muchas páginas, /pagina/)
         statement = statement.offset(skip).limit(limit)
         
-        resultados = db.exec(statement).all()
-        return resultados
+        return RespuestaFilas(await _leer_filas(db, statement))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al consultar vista: {str(e)}")
 
+# Sin búsqueda por texto: la vista no admite índices y las tablas base
+# están fuera de este repo (ver migraciones/001_indices_busqueda.sql).
+_MODOS_VISTA = (ModoBusqueda.exacto, ModoBusqueda.prefijo)
+
+
+def _filtrar(
+    statement,
+    documento: Optional[str],
+    estado: Optional[str],
+    fondo: Optional[str],
+    ies: Optional[str],
+    modo_documento: ModoBusqueda = ModoBusqueda.exacto,
+    modo_fondo: ModoBusqueda = ModoBusqueda.prefijo,
+    modo_ies: ModoBusqueda = ModoBusqueda.prefijo,
+    vista: Table = _VISTA,
+):
+    if documento:
+        statement = statement.where(condicion(vista.c.documento, documento, modo_documento, _MODOS_VISTA, "documento"))
+    if estado:
+        statement = statement.where(vista.c.estado == estado)
+    if fondo:
+        statement = statement.where(condicion(vista.c.fondo, fondo, modo_fondo, _MODOS_VISTA, "fondo"))
+    if ies:
+        statement = statement.where(condicion(vista.c.ies, ies, modo_ies, _MODOS_VISTA, "ies"))
+    return statement
+
+
+# ── Paginación por cursor (keyset) ──────────────────────────────────────────
+# Con offset(skip), MySQL arma y descarta todas las filas anteriores de la
+# vista: la página 500 cuesta 500 veces la primera. /pagina/ ordena por
+# (documento, fecha_registro, solicitud, fila_id) y cada página arranca
+# "después de la última fila de la anterior", que viene en un cursor opaco;
+# el costo de una página no depende de qué tan lejos esté.
+#
+# Solo funciona sobre la copia materializada de la vista
+# (VISTAS_MATERIALIZADAS, ver api/core/vistas_materializadas.py): fila_id
+# es el desempate único que hace total el orden (un beneficiario puede
+# tener dos giros el mismo día sin solicitud), y el índice (documento,
+# fecha_registro, solicitud, fila_id) de la copia le da a MySQL las filas ya
+# ordenadas, así que cada página lee solo sus filas. La vista no tiene una
+# clave única ni índices: desempatar por todas sus columnas obligaba a
+# ordenarla entera en cada página (1.2 s la primera en el banco local,
+# contra 10 ms con skip). Sin la copia en uso (no configurada, vieja, o de
+# antes de fila_id) /pagina/ responde 409 y queda / con skip.
+#
+# Medido con benchmarks/paginacion_giros.py sobre el banco local (SQLite,
+# 1M filas, 100 por página, leyendo la copia):
+#
+#     página      skip (ms)   cursor (ms)
+#          1           7.6           8.9
+#        100           9.2           9.4
+#       1000          15.6           7.4
+#       5000          51.4          11.6
+#       9000          78.2          11.3
+#
+# SQLite descarta filas mucho más barato que MySQL sobre la vista real (que
+# además arma los JOIN de cada fila descartada); allá la pendiente de skip
+# es mayor.
+# Los NULL van primero (así ordenan ASC MySQL y SQLite) y la condición del
+# cursor los trata aparte (IS NULL / IS NOT NULL) en vez de compararlos.
+# El cursor dice de qué copia salió: si entre dos páginas se reconstruyó
+# (fila_id nuevos), la página siguiente arranca en la (documento,
+# fecha_registro, solicitud) de la última, repitiendo las filas con esa
+# clave en vez de saltarse alguna.
+
+_CLAVE = ("documento", "fecha_registro", "solicitud")
+
+
+def _despues(orden: List[Any], valores: Tuple[Any, ...], incluida: bool) -> Any:
+    """Filas que van en `orden` después de `valores` (o en ellos, si `incluida`), con los NULL primero."""
+    iguales, opciones = [], []
+    for columna, valor in zip(orden, valores):
+        mayor = columna.is_not(None) if valor is None else columna > valor
+        opciones.append(and_(*iguales, mayor))
+        iguales.append(columna.is_(None) if valor is None else columna == valor)
+    if incluida:
+        opciones.append(and_(*iguales))
+    return or_(*opciones)
+
+
+def _huella_filtros(*filtros: Optional[str]) -> str:
+    return hashlib.sha256(json.dumps(filtros).encode("utf-8")).hexdigest()[:12]
+
+
+def _codificar_cursor(origen: str, fila: Dict[str, Any], huella: str) -> str:
+    documento, fecha, solicitud = (fila[c] for c in _CLAVE)
+    crudo = json.dumps(
+        {
+            "t": origen,
+            "v": [documento, fecha.isoformat() if fecha is not None else None, solicitud, fila[COLUMNA_FILA]],
+            "f": huella,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def _decodificar_cursor(cursor: str, huella: str) -> Tuple[str, Tuple[Any, ...]]:
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        documento, fecha, solicitud, fila_id = datos["v"]
+        if datos["f"] != huella:
+            raise ValueError("cursor de otra consulta")
+        fecha = datetime.fromisoformat(fecha) if fecha is not None else None
+        return str(datos["t"]), (documento, fecha, solicitud, int(fila_id))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido o generado con otros filtros")
+
+
+@router.get(
+    "/pagina/",
+    summary="Recorrer la vista por páginas con cursor",
+    description="Misma consulta y filtros que /, paginada con un cursor opaco: se pide la primera página sin cursor "
+                "y cada respuesta trae next_cursor para la siguiente (null en la última). El tiempo por página no "
+                "crece con la profundidad, a diferencia de skip. Solo disponible mientras se lee la copia "
+                "materializada de la vista (VISTAS_MATERIALIZADAS); si no, 409 y hay que usar / con skip.",
+    dependencies=[Depends(plazo(10))],
+)
+async def obtener_vista_giros_por_cursor(
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (vacío para la primera)"),
+    limit: int = Query(100, ge=1, le=1000),
+    documento: str = Query(None, description="Filtrar por documento"),
+    estado: str = Query(None, description="Filtrar por estado"),
+    fondo: str = Query(None, description="Filtrar por fondo"),
+    ies: str = Query(None, description="Filtrar por IES"),
+    modo_documento: ModoBusqueda = Query(ModoBusqueda.exacto, description="exacto o prefijo"),
+    modo_fondo: ModoBusqueda = Query(ModoBusqueda.prefijo, description="exacto o prefijo"),
+    modo_ies: ModoBusqueda = Query(ModoBusqueda.prefijo, description="exacto o prefijo"),
+    db: AsyncSession = Depends(get_async_session_dtf_financiera),
+    _: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    huella = _huella_filtros(documento, estado, fondo, ies, modo_documento, modo_fondo, modo_ies)
+    vista = tabla(_VISTA)
+    fila_id = columna_fila(vista)
+    if fila_id is None:
+        raise HTTPException(
+            status_code=409,
+            detail="La paginación por cursor necesita la copia materializada de la vista, que no está en uso; "
+                   "use /vw-giros-general/ con skip y limit.",
+        )
+    orden = [*(vista.c[c] for c in _CLAVE), fila_id]
+    statement = _filtrar(
+        select(*vista.c, fila_id), documento, estado, fondo, ies, modo_documento, modo_fondo, modo_ies, vista,
+    )
+    if cursor:
+        origen, desde = _decodificar_cursor(cursor, huella)
+        if desde[0] is not None:
+            # Sola, acota el rango por documento (la usa el índice).
+            statement = statement.where(vista.c.documento >= desde[0])
+        if origen == vista.name:
+            statement = statement.where(_despues(orden, desde, incluida=False))
+        else:
+            # Otra copia: sus fila_id no valen aquí, solo la clave.
+            statement = statement.where(_despues(orden[:len(_CLAVE)], desde[:len(_CLAVE)], incluida=True))
+    # Una más, para saber si hay página siguiente.
+    statement = statement.order_by(*orden).limit(limit + 1)
+
+    try:
+        filas = await _leer_filas(db, statement)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar vista: {str(e)}")
+
+    siguiente = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        siguiente = _codificar_cursor(vista.name, filas[-1], huella)
+    for fila in filas:
+        del fila[COLUMNA_FILA]
+    return RespuestaFilas({"count": len(filas), "results": filas, "next_cursor": siguiente})
+
+
+@router.get(
+    "/exportar/",
+    summary="Exportar la vista completa en streaming (CSV o NDJSON)",
+    description="Todas las filas que cumplen los filtros, en un solo archivo que se va enviando a medida que se lee "
+                "de la base (sin paginar y con memoria constante). Sin orden garantizado.",
+)
+async def exportar_vista_giros(
+    formato: FormatoExportacion = Query(FormatoExportacion.csv, description="csv o ndjson (un objeto JSON por línea)"),
+    fondo: str = Query(None, description="Filtrar por fondo"),
+    ies: str = Query(None, description="Filtrar por IES"),
+    periodo_academico: str = Query(None, description="Filtrar por periodo académico"),
+    estado: str = Query(None, description="Filtrar por estado"),
+    documento: str = Query(None, description="Filtrar por documento"),
+    modo_documento: ModoBusqueda = Query(ModoBusqueda.exacto, description="exacto o prefijo"),
+    modo_fondo: ModoBusqueda = Query(ModoBusqueda.prefijo, description="exacto o prefijo"),
+    modo_ies: ModoBusqueda = Query(ModoBusqueda.prefijo, description="exacto o prefijo"),
+    _: Dict[str, Any] = Depends(get_current_user)
+):
+    # Sin ORDER BY: así MySQL manda filas desde el principio en vez de
+    # ordenar todo el extracto antes de la primera.
+    vista = tabla(_VISTA)
+    statement = _filtrar(
+        select(*vista.c), documento, estado, fondo, ies, modo_documento, modo_fondo, modo_ies, vista,
+    )
+    if periodo_academico:
+        statement = statement.where(vista.c.periodo_academico == periodo_academico)
+    return respuesta_exportacion(async_engine_dtf_financiera, statement, formato, "giros_general_historico_ies")
+
+
 @router.get("/documento/{documento}/periodo-academico/{periodo_academico}", summary="Buscar por documento y periodo académico", description="Retorna registros específicos por documento y periodo académico")
-def obtener_por_documento_periodo_academico(
+@cachear("vw-giros-general/documento/periodo-academico", "documento", "periodo_academico")
+async def obtener_por_documento_periodo_academico(
     documento: str,
     periodo_academico: str,
-    db: Session = Depends(get_session_dtf_financiera),
+    db: AsyncSession = Depends(get_async_session_dtf_financiera),
     _: Dict[str, Any] = Depends(get_current_user)
-):
+) -> List[Dict[str, Any]]:
     try:
-        statement = select(VwGirosGeneralHistoricoIes).where(
-            VwGirosGeneralHistoricoIes.documento == documento,
-            VwGirosGeneralHistoricoIes.periodo_academico == periodo_academico
+        vista = tabla(_VISTA)
+        statement = select(*vista.c).where(
+            vista.c.documento == documento,
+            vista.c.periodo_academico == periodo_academico
         )
-        resultados = db.exec(statement).all()
+        resultados = await _leer_filas(db, statement)
         
         if not resultados:
             raise HTTPException(
@@ -70,114 +334,120 @@ def obtener_por_documento_periodo_academico(
         raise HTTPException(status_code=500, detail=f"Error al consultar: {str(e)}")
 
 
-from collections import defaultdict
+# ── /filtros-completo/: agrupación en SQL ───────────────────────────────────
+# Antes se compilaba la consulta con literal_binds y se ejecutaba como
+# text() (sin caché de sentencias de SQLAlchemy ni reutilización de planes
+# en MySQL), se traían todas las filas y se armaban los arreglos en Python.
+# Ahora es una sola consulta parametrizada que devuelve una fila por
+# (documento, convocatoria, fondo), con cada arreglo ya armado por
+# JSON_ARRAYAGG. La respuesta no cambia: los NULL (y los textos vacíos) que
+# el loop anterior saltaba se quitan de cada arreglo al leerlo. Medido con
+# benchmarks/filtros_completo.py sobre el banco local (SQLite), mediana
+# por request:
+#
+#     giros del beneficiario   antes (ms)   ahora (ms)
+#                         10          5.5          3.0
+#                        100          8.7          5.4
+#                        500         28.2         11.8
+#                       2000         87.0         37.7
+
+
+class _json_arrayagg(FunctionElement):
+    """JSON_ARRAYAGG en MySQL; json_group_array en SQLite (banco local)."""
+    type = JSON()
+    name = "json_arrayagg"
+    inherit_cache = True
+
+
+@compiles(_json_arrayagg)
+def _json_arrayagg_mysql(elemento, compiler, **kw):
+    return "JSON_ARRAYAGG(%s)" % compiler.process(elemento.clauses, **kw)
+
+
+@compiles(_json_arrayagg, "sqlite")
+def _json_arrayagg_sqlite(elemento, compiler, **kw):
+    return "json_group_array(%s)" % compiler.process(elemento.clauses, **kw)
+
+
+# Clave de la respuesta -> columna; el orden es el de la respuesta.
+_ARREGLOS_TEXTO = (
+    ("periodos_academicos", "periodo_academico"),
+    ("ies", "ies"),
+    ("programas", "programa"),
+    ("modalidades", "modalidad"),
+    ("estados", "estado"),
+)
+_ARREGLOS_VALOR = (
+    ("valores_pagar_matricula", "valor_pagar_matricula"),
+    ("valores_pagar_sostenimiento", "valor_pagar_sostenimiento"),
+    ("valores_girar", "valor_girar"),
+)
 
-@router.get("/filtros-completo/", summary="Consulta por convocatoria, fondo, documento y periodo académico (opcional)", description="Retorna registros agrupados por documento, convocatoria y fondo")
-def consultar_por_filtros_avanzados(
+
+def _consulta_filtros_completo(
+    convocatoria: str, fondo: str, documento: str, periodo_academico: Optional[str], vista: Table = _VISTA,
+):
+    arreglos = _ARREGLOS_TEXTO + _ARREGLOS_VALOR + (("fechas_registro", "fecha_registro"),)
+    grupo = (vista.c.documento, vista.c.convocatoria, vista.c.fondo)
+    statement = select(
+        *grupo,
+        func.max(vista.c.nombre).label("nombre"),
+        *(_json_arrayagg(vista.c[columna]).label(clave) for clave, columna in arreglos),
+        func.count().label("total_registros"),
+    ).where(
+        vista.c.convocatoria == convocatoria,
+        vista.c.fondo == fondo,
+        vista.c.documento == documento,
+    )
+    if periodo_academico:
+        statement = statement.where(vista.c.periodo_academico == periodo_academico)
+    return statement.group_by(*grupo)
+
+
+def _fecha(valor: Any) -> Any:
+    # Dentro del JSON la fecha viene como texto ("2024-03-01 10:00:00.000000");
+    # se devuelve como datetime, igual que cuando se leía la columna.
+    return datetime.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def _grupo_filtros_completo(fila: Dict[str, Any]) -> Dict[str, Any]:
+    grupo: Dict[str, Any] = {
+        "documento": fila["documento"],
+        "nombre": fila["nombre"],
+        "convocatoria": fila["convocatoria"],
+        "fondo": fila["fondo"],
+    }
+    for clave, _ in _ARREGLOS_TEXTO:
+        grupo[clave] = [v for v in fila[clave] if v]
+    for clave, _ in _ARREGLOS_VALOR:
+        grupo[clave] = [v for v in fila[clave] if v is not None]
+    grupo["fechas_registro"] = [_fecha(v) for v in fila["fechas_registro"] if v]
+    grupo["total_registros"] = fila["total_registros"]
+    return grupo
+
+
+@router.get("/filtros-completo/", summary="Consulta por convocatoria, fondo, documento y periodo académico (opcional)", description="Retorna registros agrupados por documento, convocatoria y fondo", dependencies=[Depends(plazo(10))])
+async def consultar_por_filtros_avanzados(
     convocatoria: str = Query(..., description="Nombre de la convocatoria (requerido)"),
     fondo: str = Query(..., description="Nombre del fondo (requerido)"),
     documento: str = Query(..., description="Número de documento (requerido)"),
     periodo_academico: str = Query(None, description="Periodo académico (opcional)"),
-    db: Session = Depends(get_session_dtf_financiera),
+    db: AsyncSession = Depends(get_async_session_dtf_financiera),
     _: Dict[str, Any] = Depends(get_current_user)
 ):
     try:
-        # Usar SQLModel para construir la consulta
-        statement = select(VwGirosGeneralHistoricoIes).where(
-            VwGirosGeneralHistoricoIes.convocatoria == convocatoria,
-            VwGirosGeneralHistoricoIes.fondo == fondo,
-            VwGirosGeneralHistoricoIes.documento == documento
-        )
-        
-        if periodo_academico:
-            statement = statement.where(VwGirosGeneralHistoricoIes.periodo_academico == periodo_academico)
-        
-        # Ejecutar con db.execute (compilando el statement a SQL)
-        compiled_statement = statement.compile(
-            bind=db.get_bind(), 
-            compile_kwargs={"literal_binds": True}
-        )
-        
-        result = db.execute(text(str(compiled_statement)))
-        rows = result.fetchall()
-        
-        # Convertir a diccionarios
-        resultados_dict = []
-        for row in rows:
-            resultados_dict.append(dict(row._mapping))
-        
-        if not resultados_dict:
+        statement = _consulta_filtros_completo(convocatoria, fondo, documento, periodo_academico, tabla(_VISTA))
+        filas = (await db.execute(statement)).mappings().all()
+
+        if not filas:
             if periodo_academico:
                 detail_msg = f"No se encontraron registros para convocatoria '{convocatoria}', fondo '{fondo}', documento '{documento}' y periodo académico '{periodo_academico}'"
             else:
                 detail_msg = f"No se encontraron registros para convocatoria '{convocatoria}', fondo '{fondo}' y documento '{documento}'"
             
             raise HTTPException(status_code=404, detail=detail_msg)
-        
-        # Agrupar los resultados por documento, convocatoria y fondo
-        grupos = defaultdict(lambda: {
-            "documento": None,
-            "nombre": None,
-            "convocatoria": None,
-            "fondo": None,
-            "periodos_academicos": [],
-            "ies": [],
-            "programas": [],
-            "modalidades": [],
-            "estados": [],
-            "valores_pagar_matricula": [],  # NUEVO CAMPO
-            "valores_pagar_sostenimiento": [],  # NUEVO CAMPO
-            "valores_girar": [],
-            "fechas_registro": [],
-            "total_registros": 0
-        })
-        
-        for registro in resultados_dict:
-            # Crear clave única para el grupo
-            clave = (registro["documento"], registro["convocatoria"], registro["fondo"])
-            
-            # Actualizar datos del grupo
-            grupo = grupos[clave]
-            grupo["documento"] = registro["documento"]
-            grupo["nombre"] = registro["nombre"]
-            grupo["convocatoria"] = registro["convocatoria"]
-            grupo["fondo"] = registro["fondo"]
-            
-            # Agregar datos a los arrays
-            if registro.get("periodo_academico"):
-                grupo["periodos_academicos"].append(registro["periodo_academico"])
-            
-            if registro.get("ies"):
-                grupo["ies"].append(registro["ies"])
-            
-            if registro.get("programa"):
-                grupo["programas"].append(registro["programa"])
-            
-            if registro.get("modalidad"):
-                grupo["modalidades"].append(registro["modalidad"])
-            
-            if registro.get("estado"):
-                grupo["estados"].append(registro["estado"])
-            
-            # NUEVOS CAMPOS - agregados antes de valor_girar
-            if registro.get("valor_pagar_matricula") is not None:
-                grupo["valores_pagar_matricula"].append(registro["valor_pagar_matricula"])
-            
-            if registro.get("valor_pagar_sostenimiento") is not None:
-                grupo["valores_pagar_sostenimiento"].append(registro["valor_pagar_sostenimiento"])
-            
-            if registro.get("valor_girar") is not None:
-                grupo["valores_girar"].append(registro["valor_girar"])
-            
-            if registro.get("fecha_registro"):
-                grupo["fechas_registro"].append(registro["fecha_registro"])
-            
-            grupo["total_registros"] += 1
-        
-        # Convertir a lista
-        resultados_agrupados = list(grupos.values())
-        
-        return resultados_agrupados
+
+        return [_grupo_filtros_completo(fila) for fila in filas]
         
     except HTTPException:
         raise
@@ -185,35 +455,110 @@ def consultar_por_filtros_avanzados(
         raise HTTPException(status_code=500, detail=f"Error al consultar: {str(e)}")
 
 
+# ── /totales/: sumas y conteos agrupados ────────────────────────────────────
+# Los tableros bajaban las filas de la vista y sumaban en el navegador. Aquí
+# la suma la hace la base, agrupando por las columnas pedidas; cada
+# combinación de parámetros queda en el caché de respuestas hasta el
+# siguiente múltiplo de TOTALES_GIROS_RENOVACION_S.
+
+
+class CampoTotales(str, Enum):
+    ies = "ies"
+    fondo = "fondo"
+    convocatoria = "convocatoria"
+    periodo_academico = "periodo_academico"
+    estado = "estado"
+
+
+_VALORES_TOTALES = ("valor_girar", "valor_pagar_matricula", "valor_pagar_sostenimiento")
+
+
+def _hasta_renovacion() -> float:
+    if TOTALES_GIROS_RENOVACION_S <= 0:
+        return 0
+    return TOTALES_GIROS_RENOVACION_S - time.time() % TOTALES_GIROS_RENOVACION_S
+
+
+def _consulta_totales(agrupar: List[CampoTotales], filtros: Dict[str, Optional[str]], vista: Table = _VISTA):
+    grupo = [vista.c[campo.value] for campo in dict.fromkeys(agrupar)]
+    statement = select(
+        *grupo,
+        func.count().label("total_registros"),
+        *(func.coalesce(func.sum(vista.c[columna]), 0).label(columna) for columna in _VALORES_TOTALES),
+    )
+    for columna, valor in filtros.items():
+        if valor:
+            statement = statement.where(vista.c[columna] == valor)
+    return statement.group_by(*grupo).order_by(*grupo)
+
+
+@router.get(
+    "/totales/",
+    summary="Totales y conteos de giros agrupados",
+    description="Suma valor_girar, valor_pagar_matricula y valor_pagar_sostenimiento y cuenta los registros, "
+                "agrupando por las columnas de agrupar (se puede repetir: ?agrupar=fondo&agrupar=ies); sin "
+                "agrupar, un solo total. Los filtros son exactos. Las cifras se renuevan cada "
+                "TOTALES_GIROS_RENOVACION_S segundos.",
+    dependencies=[Depends(plazo(20))],
+)
+@cachear(
+    "vw-giros-general/totales", "agrupar", "ies", "fondo", "convocatoria", "periodo_academico", "estado",
+    vence=_hasta_renovacion,
+)
+async def totales_giros(
+    agrupar: List[CampoTotales] = Query([], description="Columnas por las que agrupar"),
+    ies: str = Query(None, description="Filtrar por IES"),
+    fondo: str = Query(None, description="Filtrar por fondo"),
+    convocatoria: str = Query(None, description="Filtrar por convocatoria"),
+    periodo_academico: str = Query(None, description="Filtrar por periodo académico"),
+    estado: str = Query(None, description="Filtrar por estado"),
+    db: AsyncSession = Depends(get_async_session_dtf_financiera),
+    _: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    filtros = {
+        "ies": ies, "fondo": fondo, "convocatoria": convocatoria,
+        "periodo_academico": periodo_academico, "estado": estado,
+    }
+    try:
+        filas = await _leer_filas(db, _consulta_totales(agrupar, filtros, tabla(_VISTA)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar: {str(e)}")
+    return {"agrupado_por": [campo.value for campo in dict.fromkeys(agrupar)], "count": len(filas), "results": filas}
+
+
 @router.get("/resumen-documento/{documento}", tags=["Consulta"], summary="Consultar convocatorias y fondos de un beneficiario")
-def consulta_convocatorias_fondos(
+async def consulta_convocatorias_fondos(
     documento: str, 
-    db: Session = Depends(get_session_dtf_financiera),
+    db: AsyncSession = Depends(get_async_session_dtf_financiera),
     _: Dict[str, Any] = Depends(get_current_user)
 ):
     try:
-        # Consulta usando SQLModel
-        statement = select(
-            VwGirosGeneralHistoricoIes.nombre,
-            VwGirosGeneralHistoricoIes.convocatoria,
-            VwGirosGeneralHistoricoIes.fondo
-        ).where(
-            VwGirosGeneralHistoricoIes.documento == documento
-        ).distinct().order_by(VwGirosGeneralHistoricoIes.convocatoria)
-        
-        resultados = db.exec(statement).all()
-        
-        if not resultados:
-            return {}
-        
-        # Convertir a la estructura deseada
-        aggregated_result = {
-            "nombre": resultados[0].nombre if resultados else "",
-            "convocatoria": [r.convocatoria for r in resultados],
-            "fondo": [r.fondo for r in resultados],
-        }
-        
-        return aggregated_result
-        
+        return await resumen_convocatorias_fondos(db, documento)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al consultar: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al consultar: {str(e)}")
+
+
+async def resumen_convocatorias_fondos(db: AsyncSession, documento: str) -> Dict[str, Any]:
+    """Usada también por /consulta/perfil/{documento}."""
+    vista = tabla(_VISTA)
+    statement = select(
+        vista.c.nombre,
+        vista.c.convocatoria,
+        vista.c.fondo
+    ).where(
+        vista.c.documento == documento
+    ).distinct().order_by(vista.c.convocatoria)
+    
+    resultados = (await db.exec(statement)).all()
+    
+    if not resultados:
+        return {}
+    
+    # Convertir a la estructura deseada
+    aggregated_result = {
+        "nombre": resultados[0].nombre if resultados else "",
+        "convocatoria": [r.convocatoria for r in resultados],
+        "fondo": [r.fondo for r in resultados],
+    }
+    
+    return aggregated_result
\ No newline at end of file
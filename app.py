@@ -1,8 +1,28 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+import anyio.to_thread
+import asyncio
 import time
 
+from api.core.compartimentos import compartimento
+from api.core.config import (
+	DB_LIVENESS,
+	DB_VALIDACION_INTERVALO_S,
+	DB_VALIDACION_OCIOSA_S,
+	ESTADO_USUARIOS_INTERVALO_S,
+	HABILITADOS_RENOVAR_INTERVALO_S,
+	THREADPOOL_HILOS,
+	VISTAS_MATERIALIZADAS_INTERVALO_S,
+)
+from api.core.database import ENGINES
+from api.core.estado_usuarios import recargar_periodicamente
+from api.core.habilitados_renovar import recargar_periodicamente as recargar_habilitados_periodicamente
+from api.core.hashing import EJECUTOR_HASH
+from api.core.instrumentacion_sql import RutaActualMiddleware
+from api.core.vistas_materializadas import VISTAS, refrescar_periodicamente as refrescar_vistas_periodicamente
+from api.core.vitalidad_conexiones import validar_ociosas_periodicamente
 from api.routers import (
 	auth,
 	consulta,
@@ -32,11 +52,51 @@ from api.routers import (
 	seguimiento_actividades,
 	seguimiento_informes,
 	matricula_cero,
+	internal,
 )
 
 load_dotenv()
 
-app = FastAPI(title="API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	# Hilos para los endpoints sync; los compartimentos por base (ver
+	# api/core/compartimentos.py) se reparten este total.
+	anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_HILOS
+	# Los hashes de contraseña van en su propio ejecutor (ver
+	# api/core/hashing.py); se levanta aquí para que el primer login no
+	# pague el arranque de los procesos.
+	await EJECUTOR_HASH.iniciar()
+	# Sin pool_pre_ping, las conexiones ociosas se validan en segundo plano
+	# (ver api/core/vitalidad_conexiones.py).
+	tarea = None
+	if DB_LIVENESS == "validacion":
+		tarea = asyncio.create_task(
+			validar_ociosas_periodicamente(ENGINES, DB_VALIDACION_INTERVALO_S, DB_VALIDACION_OCIOSA_S)
+		)
+	# Estado (activo/rol/contraseña) de los usuarios de Seguimiento en
+	# memoria, para revocar tokens sin consultar la base en cada request.
+	tarea_usuarios = asyncio.create_task(recargar_periodicamente(ESTADO_USUARIOS_INTERVALO_S))
+	# Documentos habilitados para renovar en memoria, para que
+	# /consulta/existe-tabla-habilitados-renovar no consulte la base.
+	tarea_habilitados = asyncio.create_task(recargar_habilitados_periodicamente(HABILITADOS_RENOVAR_INTERVALO_S))
+	# Copias indexadas de las vistas de VISTAS_MATERIALIZADAS (ver
+	# api/core/vistas_materializadas.py); hasta el primer refresco los
+	# endpoints leen la vista.
+	tarea_vistas = None
+	if VISTAS:
+		tarea_vistas = asyncio.create_task(refrescar_vistas_periodicamente(VISTAS_MATERIALIZADAS_INTERVALO_S))
+	yield
+	if tarea is not None:
+		tarea.cancel()
+	tarea_usuarios.cancel()
+	tarea_habilitados.cancel()
+	if tarea_vistas is not None:
+		tarea_vistas.cancel()
+	EJECUTOR_HASH.cerrar()
+
+
+app = FastAPI(title="API", lifespan=lifespan)
 
 # CORS: sin esto, el navegador bloquea las respuestas hacia el frontend
 # React (portal_mc_fastapi) aunque el backend responda bien — el request
@@ -57,27 +117,36 @@ app.add_middleware(
 	# archivo genérico en vez del nombre real que arma el backend.
 	expose_headers=["Content-Disposition"],
 )
+# Deja el request en curso disponible para etiquetar los tiempos SQL con su
+# ruta (ver api/core/instrumentacion_sql.py y /metrics).
+app.add_middleware(RutaActualMiddleware)
+
+# Compartimento (cupo de requests simultáneos) de la base que usa cada router.
+# consulta, matricula_cero y renovaciones_extemporaneas tocan más de una base
+# y declaran el suyo por ruta.
+ANALITICA = [Depends(compartimento("analitica"))]
+DTF_FINANCIERA = [Depends(compartimento("dtf_financiera"))]
 
-app.include_router(auth.router, prefix="/auth")
+app.include_router(auth.router, prefix="/auth", dependencies=ANALITICA)
 app.include_router(consulta.router, prefix="/consulta")
-app.include_router(usuarios.router, prefix="/usuarios")
-app.include_router(informacion_personal.router, prefix="/informacion_personal")
-app.include_router(changelog.router, prefix="/changelog")
+app.include_router(usuarios.router, prefix="/usuarios", dependencies=ANALITICA)
+app.include_router(informacion_personal.router, prefix="/informacion_personal", dependencies=ANALITICA)
+app.include_router(changelog.router, prefix="/changelog", dependencies=ANALITICA)
 app.include_router(renovaciones_extemporaneas.router, prefix="/renovaciones-extemporaneas")
-app.include_router(informacion_programas_academicos.router, prefix="/informacion-programas-academicos",)
-app.include_router(renuncia_o_terminacion.router, prefix="/renuncia-o-terminacion")
-app.include_router(suspension_especial.router, prefix="/suspension-especial")
-app.include_router(estudiante_obtiene_grado.router, prefix="/estudiante-obtiene-grado")
-app.include_router(prorroga_periodo_de_gracia.router, prefix="/prorroga-periodo-de-gracia")
-app.include_router(renuncia_modalidad.router, prefix="/renuncia-modalidad")
-app.include_router(informacion_deudores.router, prefix="/informacion-deudores")
-app.include_router(suspension_temporal.router, prefix="/suspension-temporal")
-app.include_router(renuncia_giros.router, prefix="/renuncia-giros")
-app.include_router(ies_preg_posg.router, prefix="/ies-preg-posg")
-app.include_router(programas_preg_posg.router, prefix="/programas-preg-posg")
-app.include_router(reintegros.router, prefix="/reintegros")
-app.include_router(vw_giros_general_historico_ies.router, prefix="/vw-giros-general")
-app.include_router(informacion_cambio_pensum.router, prefix="/api/informacion-cambio-pensum")
+app.include_router(informacion_programas_academicos.router, prefix="/informacion-programas-academicos", dependencies=ANALITICA)
+app.include_router(renuncia_o_terminacion.router, prefix="/renuncia-o-terminacion", dependencies=ANALITICA)
+app.include_router(suspension_especial.router, prefix="/suspension-especial", dependencies=ANALITICA)
+app.include_router(estudiante_obtiene_grado.router, prefix="/estudiante-obtiene-grado", dependencies=ANALITICA)
+app.include_router(prorroga_periodo_de_gracia.router, prefix="/prorroga-periodo-de-gracia", dependencies=ANALITICA)
+app.include_router(renuncia_modalidad.router, prefix="/renuncia-modalidad", dependencies=ANALITICA)
+app.include_router(informacion_deudores.router, prefix="/informacion-deudores", dependencies=ANALITICA)
+app.include_router(suspension_temporal.router, prefix="/suspension-temporal", dependencies=ANALITICA)
+app.include_router(renuncia_giros.router, prefix="/renuncia-giros", dependencies=ANALITICA)
+app.include_router(ies_preg_posg.router, prefix="/ies-preg-posg", dependencies=ANALITICA)
+app.include_router(programas_preg_posg.router, prefix="/programas-preg-posg", dependencies=ANALITICA)
+app.include_router(reintegros.router, prefix="/reintegros", dependencies=ANALITICA)
+app.include_router(vw_giros_general_historico_ies.router, prefix="/vw-giros-general", dependencies=DTF_FINANCIERA)
+app.include_router(informacion_cambio_pensum.router, prefix="/api/informacion-cambio-pensum", dependencies=ANALITICA)
 
 # ── Módulo Seguimiento Convenios MC ──────────────────────────────────────────
 # OJO: estos routers ya definen su propio prefix completo en su propio
@@ -85,19 +154,21 @@ app.include_router(informacion_cambio_pensum.router, prefix="/api/informacion-ca
 # (a diferencia de usuarios.router / ies_preg_posg.router arriba, que sí
 # reciben un prefix duplicado sobre el que ya traen — bug preexistente del
 # repo, ver nota al final de este archivo).
-app.include_router(seguimiento_auth.router)
-app.include_router(seguimiento_ies.router)
-app.include_router(seguimiento_convenios.router)
-app.include_router(seguimiento_catalogo.router)
-app.include_router(seguimiento_usuarios.router)
-app.include_router(seguimiento_actividades.router)
-app.include_router(seguimiento_informes.router)
+app.include_router(seguimiento_auth.router, dependencies=ANALITICA)
+app.include_router(seguimiento_ies.router, dependencies=ANALITICA)
+app.include_router(seguimiento_convenios.router, dependencies=ANALITICA)
+app.include_router(seguimiento_catalogo.router, dependencies=ANALITICA)
+app.include_router(seguimiento_usuarios.router, dependencies=ANALITICA)
+app.include_router(seguimiento_actividades.router, dependencies=ANALITICA)
+app.include_router(seguimiento_informes.router, dependencies=ANALITICA)
 
 # ── Matrícula Cero (Consulta + Tablero) ──────────────────────────────────────
 # Nuevo, separado de /consulta (que se deja intacto). También define su
 # propio prefix completo ("/matricula-cero"), sin prefix adicional aquí.
 app.include_router(matricula_cero.router)
 
+# ── Observabilidad interna (pools de conexión, etc.) ─────────────────────────
+app.include_router(internal.router)
 
 
 @app.get("/")
@@ -0,0 +1,126 @@
+"""
+Banco de carga local: mide la API completa sin depender de las MySQL de
+producción.
+
+1. Crea (si no existen) las bases SQLite de benchmarks/bd_local.py con
+   volúmenes parecidos a los reales: 500 convenios × 8 períodos × 60
+   actividades en Seguimiento, 1M de filas en vw_giros_general_historico_ies
+   y 100k beneficiarios en las vistas de consulta/matrícula cero.
+2. Levanta la API con benchmarks/servidor_local.py en un subproceso.
+3. Emite un token del login genérico y otro de Seguimiento (ADMIN) con el
+   mismo JWT_SECRET del servidor.
+4. Corre benchmarks/carga.py sobre una mezcla de endpoints de lectura y
+   reporta p50/p95/p99 y throughput por endpoint.
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.banco_local --concurrencia 50 --duracion 30
+    python -m benchmarks.banco_local --giros 50000 --beneficiarios 5000 --resembrar   # corrida rápida
+
+Los números sirven para comparar un cambio contra sí mismo (antes/después en
+la misma máquina), no como estimación de producción: SQLite no tiene red de
+por medio ni el planificador de MySQL.
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .bd_local import BASES, PASSWORD_BANCO, USUARIO_API, USUARIO_SEGUIMIENTO, Volumen, crear_bases, documento, ruta_base
+from .carga import ejecutar_carga, imprimir_reporte
+from .vitalidad import _esperar_arranque
+
+# Endpoints que usan el login genérico (/auth/login).
+ENDPOINTS_API = [
+    "/consulta/consulta-nombre?documento={documento}",
+    "/consulta/fondos?documento={documento}",
+    "/consulta/formulario-mc?documento={documento}",
+    "/vw-giros-general/resumen-documento/{documento}",
+    "/vw-giros-general/?documento={documento}",
+]
+# Endpoints que usan el login de Seguimiento.
+ENDPOINTS_SEGUIMIENTO = [
+    "/matricula-cero/consulta?documento={documento}",
+    "/matricula-cero/tablero/giros?documento={documento}",
+    "/seguimiento/convenios",
+    "/seguimiento/convenios/{convenio}/periodos",
+]
+
+
+def _emitir_tokens(secreto: str) -> Dict[str, str]:
+    # JWT_SECRET se lee al importar config.py: fijarlo antes del import.
+    os.environ["JWT_SECRET"] = secreto
+    from api.core.security import create_token
+    from api.core.security_seguimiento import create_token_seguimiento
+
+    return {
+        "api": create_token({"username": USUARIO_API, "full_name": "Banco de carga", "tipo_usuario": "ADMIN"}),
+        "seguimiento": create_token_seguimiento(1, USUARIO_SEGUIMIENTO, "Banco de carga", rol="ADMIN"),
+    }
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=".banco_local")
+    parser.add_argument("--resembrar", action="store_true", help="Recrear las bases aunque ya existan")
+    parser.add_argument("--convenios", type=int, default=Volumen.convenios)
+    parser.add_argument("--periodos", type=int, default=Volumen.periodos)
+    parser.add_argument("--actividades", type=int, default=Volumen.actividades)
+    parser.add_argument("--giros", type=int, default=Volumen.giros)
+    parser.add_argument("--beneficiarios", type=int, default=Volumen.beneficiarios)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--puerto", type=int, default=8766)
+    parser.add_argument(
+        "--endpoint", action="append", default=None,
+        help="Reemplaza la mezcla por defecto; los que empiezan por /seguimiento o /matricula-cero usan el token de Seguimiento",
+    )
+    args = parser.parse_args(argv)
+
+    # Antes de sembrar: la siembra importa api.core.security, que fija
+    # JWT_SECRET al importarse.
+    secreto = secrets.token_hex(16)
+    tokens = _emitir_tokens(secreto)
+
+    volumen = Volumen(args.convenios, args.periodos, args.actividades, args.giros, args.beneficiarios)
+    if args.resembrar or not all(os.path.exists(ruta_base(args.directorio, n)) for n in BASES):
+        print(f"Sembrando {args.directorio} con {volumen} ...", flush=True)
+        inicio = time.perf_counter()
+        crear_bases(args.directorio, volumen)
+        print(f"Bases listas en {time.perf_counter() - inicio:.0f}s (usuarios {USUARIO_API} / {USUARIO_SEGUIMIENTO}, clave {PASSWORD_BANCO})")
+
+    endpoints: List[str] = args.endpoint or ENDPOINTS_API + ENDPOINTS_SEGUIMIENTO
+    tokens_endpoint = {
+        ep: tokens["seguimiento"] if ep.startswith(("/seguimiento", "/matricula-cero")) else tokens["api"]
+        for ep in endpoints
+    }
+    azar = random.Random(7)
+    documentos = [documento(azar.randrange(volumen.beneficiarios)) for _ in range(2000)]
+    convenios = [str(azar.randint(1, volumen.convenios)) for _ in range(500)]
+
+    url = f"http://127.0.0.1:{args.puerto}"
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.servidor_local", "--directorio", args.directorio, "--puerto", str(args.puerto)],
+        env={**os.environ, "JWT_SECRET": secreto},
+    )
+    try:
+        _esperar_arranque(url)
+        carga = dict(tokens=tokens_endpoint, documentos=documentos, valores={"convenio": convenios})
+        # Calentamiento: pools abiertos y páginas de SQLite en caché.
+        asyncio.run(ejecutar_carga(url, endpoints, args.concurrencia, 5, **carga))
+        resultados = asyncio.run(ejecutar_carga(url, endpoints, args.concurrencia, args.duracion, **carga))
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+    total = sum(len(r.latencias) for r in resultados.values())
+    imprimir_reporte(resultados, args.duracion)
+    print(f"\nTotal: {total / args.duracion:.1f} req/s con concurrencia {args.concurrencia}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Bases de datos locales (SQLite) que reemplazan a las tres MySQL para correr
+la API bajo carga sin tocar los servidores de 10.120.x / 10.124.x.
+
+- crear_bases() crea analitica_fondos.db, convocatoria_sapiencia.db y
+  dtf_financiera.db en un directorio, con las tablas que usan los routers
+  (las de los modelos SQLModel más las vistas/tablas que solo aparecen en
+  SQL crudo) y las llena con volúmenes sintéticos configurables.
+- aplicar_shims() adapta cada engine de la app a SQLite: adjunta las tres
+  bases con su nombre de MySQL (para que funcione
+  `convocatoria_sapiencia.matricula_cero` o `analitica_fondos.mc_final`) y
+  reescribe lo poco de dialecto MySQL que hay en el SQL crudo
+  (INSERT IGNORE). lastrowid funciona igual en sqlite3. Las columnas DATE
+  salen como datetime.date, igual que con mysql-connector.
+
+Las vistas de MySQL (vw_*) se crean como tablas planas, con índice por
+documento como las tablas base de producción; vw_giros_general_historico_ies
+va SIN la PK del modelo, porque en la vista real el documento se repite.
+Las columnas de texto que se buscan por prefijo (documento, fondo e ies de
+la vista, beneficiario de reintegros) llevan COLLATE NOCASE e índice: en
+MySQL la intercalación no distingue mayúsculas y el mismo índice sirve para
+= y para LIKE 'x%'; en SQLite eso solo pasa si la columna es NOCASE (ver
+benchmarks/planes_busqueda.py).
+"""
+import os
+import random
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import Column, MetaData, String, Table, create_engine, event
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel
+
+import api.models.informacion_cambio_pensum  # noqa: F401  (registran sus tablas en SQLModel.metadata)
+import api.models.informacion_deudores  # noqa: F401
+import api.models.informacion_personal  # noqa: F401
+import api.models.informacion_programas_academicos  # noqa: F401
+import api.models.seguimiento_actividades  # noqa: F401
+import api.models.seguimiento_catalogo  # noqa: F401
+import api.models.seguimiento_convenios  # noqa: F401
+import api.models.seguimiento_historial  # noqa: F401
+import api.models.seguimiento_ies  # noqa: F401
+import api.models.seguimiento_usuarios  # noqa: F401
+import api.models.usuarios  # noqa: F401
+from api.models.reintegros import Reintegros
+from api.models.vw_giros_general_historico_ies import VwGirosGeneralHistoricoIes
+
+# Nombre de la base en MySQL -> prefijo de variables de entorno de la app.
+BASES = {
+    "analitica_fondos": "LOGIN_DB",
+    "convocatoria_sapiencia": "APP_DB",
+    "dtf_financiera": "DTF_DB",
+}
+
+USUARIO_API = "banco.carga"
+USUARIO_SEGUIMIENTO = "banco.admin"
+PASSWORD_BANCO = "banco-carga-123"
+
+TIPOS_ACTIVIDAD = ("ejecucion", "liquidacion", "cierre")
+ESTADOS_CONVENIO = ("En ejecución", "En liquidación", "En cierre", "Cerrado")
+ESTADOS_ACTIVIDAD = ("Pendiente", "En proceso", "Completado")
+ESTADOS_GIRO = ("GIRADO", "PENDIENTE", "ANULADO", "EN TRAMITE")
+FONDOS = ("EPM", "PP", "MB", "FA", "DPT", "EFE")
+IES = ("ITM", "Pascual Bravo", "Colegio Mayor", "U de A", "UNAL", "EAFIT", "UPB")
+
+CATALOGOS_MATRICULA_CERO = (
+    "vlf_tipo_documento", "pais", "departamento", "municipio", "odes_expectativas_sexo",
+    "estudiantes_orientacion_sexual", "estudiantes_identidad_genero", "tipo_regimen_salud",
+    "talento_especializado_tipo_vivienda", "actividad_matricula_cero", "vlf_estrato", "barrio",
+    "comuna_caracterizacion", "nivel_academico_matricula_cero", "matriculacero_beneficio_sapiencia",
+    "ies_acoso_sexual", "ies_matricula_cero_actual", "semestre_matricula_cero",
+)
+COLUMNAS_CATALOGO_MATRICULA_CERO = (
+    "tipo_documento", "pais_nacimiento", "departamento_residencia", "municipio_residencia", "sexo",
+    "orientacion_sexual", "identidad_genero", "afiliacion_salud", "tipo_vivienda", "actividad_realiza",
+    "estrato", "pais_residencia_ubg", "departamento_ubg", "municipio_residencia_ubg", "barrio", "comuna",
+    "nivel_academico", "beneficio_sapiencia", "ies_adscritas", "programa_admitido", "semestre_academico",
+)
+
+
+@dataclass
+class Volumen:
+    convenios: int = 500
+    periodos: int = 8
+    actividades: int = 60
+    giros: int = 1_000_000
+    beneficiarios: int = 100_000
+
+
+def documento(i: int) -> str:
+    return str(10_000_000 + i)
+
+
+def ruta_base(directorio: str, nombre: str) -> str:
+    return os.path.join(directorio, f"{nombre}.db")
+
+
+def url_base(directorio: str, nombre: str) -> str:
+    return f"sqlite:///{os.path.abspath(ruta_base(directorio, nombre))}"
+
+
+# ── Esquemas ────────────────────────────────────────────────────────────────
+
+_DDL_ANALITICA = """
+CREATE TABLE notificaciones_enviadas_seg_mc (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    convenio_id INTEGER NOT NULL,
+    tipo_notificacion VARCHAR(50) NOT NULL,
+    enviado_en DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (convenio_id, tipo_notificacion)
+);
+CREATE TABLE vw_informacion_beneficiario (
+    documento VARCHAR(20), id_usuario INTEGER, nombre_completo VARCHAR(200),
+    convocatoria VARCHAR(20), fondo_sapiencia VARCHAR(20), tiene_varios_fondos INTEGER
+);
+CREATE INDEX ix_vw_informacion_beneficiario_documento ON vw_informacion_beneficiario (documento);
+CREATE TABLE mc_final (
+    documento VARCHAR(20), periodo VARCHAR(10), ies VARCHAR(100), programa VARCHAR(200),
+    estado VARCHAR(50), promedio REAL, creditos_aprobados INTEGER
+);
+CREATE INDEX ix_mc_final_documento ON mc_final (documento);
+CREATE UNIQUE INDEX ux_actividades_convenio_periodo_base
+    ON actividades_convenio_seg_mc (convenio_periodo_id, actividad_base_id);
+ALTER TABLE usuarios ADD COLUMN tipo_usuario VARCHAR(20);
+"""
+
+_DDL_CONVOCATORIA = """
+CREATE TABLE login_usuario (
+    id_usuario INTEGER PRIMARY KEY, documento VARCHAR(20),
+    primerNombre VARCHAR(100), segundoNombre VARCHAR(100),
+    primerApellido VARCHAR(100), segundoApellido VARCHAR(100)
+);
+CREATE INDEX ix_login_usuario_documento ON login_usuario (documento);
+CREATE TABLE fondos_habilitados_renovar (
+    documento VARCHAR(20) PRIMARY KEY, efe INTEGER, fa INTEGER, ren_mb INTEGER, leg_mb INTEGER,
+    pp INTEGER, epm INTEGER, dpt INTEGER, ren_mb_ext INTEGER, pp_ext INTEGER, epm_ext INTEGER,
+    efe_ext INTEGER, fa_ext INTEGER, dpt_ext INTEGER, pre_mb INTEGER, add_periodo INTEGER,
+    ctm INTEGER, ss INTEGER
+);
+"""
+
+_COLUMNAS_VW_MATRICULA_CERO = (
+    "documento VARCHAR(20), periodo VARCHAR(10), nombre_completo VARCHAR(200), ies VARCHAR(100), "
+    "programa VARCHAR(200), estado VARCHAR(50), fecha_registro DATETIME"
+)
+
+
+def _ddl_convocatoria_extra() -> str:
+    partes = []
+    for vista in ("vw_matricula_cero_2025_2", "vw_matricula_cero_2026_2"):
+        partes.append(f"CREATE TABLE {vista} ({_COLUMNAS_VW_MATRICULA_CERO});")
+        partes.append(f"CREATE INDEX ix_{vista}_documento ON {vista} (documento);")
+    for catalogo in CATALOGOS_MATRICULA_CERO:
+        partes.append(f"CREATE TABLE {catalogo} (id INTEGER PRIMARY KEY, nombre VARCHAR(200));")
+    columnas = ", ".join(f"{c} INTEGER" for c in COLUMNAS_CATALOGO_MATRICULA_CERO)
+    partes.append(
+        f"CREATE TABLE matricula_cero (id INTEGER PRIMARY KEY AUTOINCREMENT, documento VARCHAR(20), "
+        f"periodo INTEGER, {columnas});"
+    )
+    partes.append("CREATE INDEX ix_matricula_cero_documento ON matricula_cero (documento, periodo);")
+    return "\n".join(partes)
+
+
+def _copia(tabla: Table, metadata: MetaData, indices: Sequence[str], nocase: Sequence[str], con_pk: bool = True) -> Table:
+    return Table(tabla.name, metadata, *[
+        Column(
+            c.name,
+            String(c.type.length, collation="NOCASE") if c.name in nocase else c.type,
+            primary_key=con_pk and c.primary_key,
+            nullable=c.nullable,
+            index=c.name in indices,
+        )
+        for c in tabla.columns
+    ])
+
+
+def _crear_esquemas(directorio: str) -> Dict[str, Engine]:
+    engines = {nombre: create_engine(url_base(directorio, nombre)) for nombre in BASES}
+
+    propias = (VwGirosGeneralHistoricoIes.__tablename__, Reintegros.__tablename__)
+    tablas_analitica = [t for nombre, t in SQLModel.metadata.tables.items() if nombre not in propias]
+    SQLModel.metadata.create_all(engines["analitica_fondos"], tables=tablas_analitica)
+
+    # Índices de migraciones/001_indices_busqueda.sql.
+    metadata_reintegros = MetaData()
+    _copia(Reintegros.__table__, metadata_reintegros, ("documento", "beneficiario"), ("beneficiario",))
+    metadata_reintegros.create_all(engines["analitica_fondos"])
+
+    metadata_giros = MetaData()
+    _copia(
+        VwGirosGeneralHistoricoIes.__table__, metadata_giros,
+        ("documento", "periodo_academico", "fondo", "ies"), ("documento", "fondo", "ies"), con_pk=False,
+    )
+    metadata_giros.create_all(engines["dtf_financiera"])
+
+    for nombre, ddl in (("analitica_fondos", _DDL_ANALITICA), ("convocatoria_sapiencia", _DDL_CONVOCATORIA + _ddl_convocatoria_extra())):
+        crudo = engines[nombre].raw_connection()
+        try:
+            crudo.driver_connection.executescript(ddl)
+            crudo.commit()
+        finally:
+            crudo.close()
+    return engines
+
+
+# ── Datos sintéticos ────────────────────────────────────────────────────────
+
+def _insertar(conexion: sqlite3.Connection, tabla: str, columnas: Sequence[str], filas: Iterator[Tuple], lote: int = 20_000) -> int:
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' for _ in columnas)})"
+    total = 0
+    pendiente: List[Tuple] = []
+    for fila in filas:
+        pendiente.append(fila)
+        if len(pendiente) >= lote:
+            conexion.executemany(sql, pendiente)
+            total += len(pendiente)
+            pendiente.clear()
+    if pendiente:
+        conexion.executemany(sql, pendiente)
+        total += len(pendiente)
+    return total
+
+
+def _periodo(k: int) -> str:
+    return f"{2019 + k // 2}-{k % 2 + 1}"
+
+
+def _sembrar_analitica(conexion: sqlite3.Connection, v: Volumen, azar: random.Random) -> None:
+    from api.core.security import hash_password_with_salt
+    from api.core.security_seguimiento import hash_password
+
+    credenciales = hash_password_with_salt(PASSWORD_BANCO)
+    _insertar(conexion, "usuarios", ("username", "password_hash", "sal", "nombre_completo", "activo", "tipo_usuario"), iter([
+        (USUARIO_API, credenciales["hash"], credenciales["salt"], "Banco de carga", 1, "ADMIN"),
+    ]))
+    _insertar(conexion, "usuarios_seg_proceso_mc", ("nombre", "usuario", "password_hash", "rol", "activo", "primer_login"), iter([
+        ("Banco de carga", USUARIO_SEGUIMIENTO, hash_password(PASSWORD_BANCO), "ADMIN", 1, 0),
+    ]))
+
+    n_ies = max(1, v.convenios // 10)
+    _insertar(conexion, "ies_seg_proceso_mc", ("nombre", "sigla", "tipo_ies", "activa"), (
+        (f"IES sintética {i}", f"IES{i}", "Distrital", 1) for i in range(1, n_ies + 1)
+    ))
+
+    hoy = date.today()
+
+    def convenios():
+        for i in range(1, v.convenios + 1):
+            fin = hoy + timedelta(days=azar.randint(-720, 360))
+            yield (
+                f"CV-{i:05d}", azar.randint(1, n_ies), _periodo(azar.randrange(12)), azar.choice(ESTADOS_CONVENIO),
+                azar.randint(50, 5000) * 1_000_000, fin - timedelta(days=365), fin,
+                fin + timedelta(days=120), fin + timedelta(days=150), fin + timedelta(days=730),
+                fin + timedelta(days=azar.randint(30, 400)), "Supervisor sintético", "Apoyo sintético",
+            )
+    _insertar(conexion, "convenios_seg_proceso_mc", (
+        "codigo", "ies_id", "periodo_academico", "estado", "valor", "fecha_inicio_convenio", "fecha_fin_convenio",
+        "fecha_limite_liquidacion_voluntaria", "fecha_limite_liquidacion_unilateral",
+        "fecha_limite_liquidacion_judicial", "fecha_vencimiento_poliza", "supervisor", "apoyo_supervision",
+    ), convenios())
+
+    _insertar(conexion, "convenio_periodos_seg_mc", ("convenio_id", "periodo", "orden"), (
+        (c, _periodo(k), k + 1) for c in range(1, v.convenios + 1) for k in range(v.periodos)
+    ))
+
+    subcategorias = 6
+    _insertar(conexion, "actividades_base_seg_mc", (
+        "nombre", "tipo", "subcategoria", "subcategoria_orden", "orden", "es_relevante", "tiene_fecha_limite",
+    ), (
+        (f"Actividad {a}", TIPOS_ACTIVIDAD[a % 3], f"Subcategoría {(a // 3) % subcategorias + 1}",
+         (a // 3) % subcategorias + 1, a // 3 + 1, int(azar.random() < 0.7), int(azar.random() < 0.5))
+        for a in range(v.actividades)
+    ))
+
+    def actividades():
+        periodo_id = 0
+        for c in range(1, v.convenios + 1):
+            for _ in range(v.periodos):
+                periodo_id += 1
+                for a in range(1, v.actividades + 1):
+                    estado = azar.choice(ESTADOS_ACTIVIDAD)
+                    avance = 100 if estado == "Completado" else (0 if estado == "Pendiente" else azar.randint(10, 90))
+                    yield (c, periodo_id, a, estado, avance, 0)
+    _insertar(conexion, "actividades_convenio_seg_mc", (
+        "convenio_id", "convenio_periodo_id", "actividad_base_id", "estado", "porcentaje_avance", "no_aplica",
+    ), actividades())
+
+    total_actividades = v.convenios * v.periodos * v.actividades
+    ahora = datetime.now()
+    _insertar(conexion, "historial_actividades_seg_mc", (
+        "actividad_convenio_id", "fecha_cambio", "usuario_id", "usuario_nombre", "estado_anterior",
+        "estado_nuevo", "porcentaje_anterior", "porcentaje_nuevo", "comentario",
+    ), (
+        (azar.randint(1, total_actividades), ahora - timedelta(minutes=azar.randint(0, 500_000)), 1,
+         "Banco de carga", "Pendiente", "En proceso", 0, 50, "Comentario sintético")
+        for _ in range(total_actividades // 10)
+    ))
+
+    def beneficiarios():
+        for i in range(v.beneficiarios):
+            for k in range(1 + (i % 3 == 0)):
+                yield (documento(i), i, f"Beneficiario {i}", _periodo(k), FONDOS[(i + k) % len(FONDOS)], int(i % 3 == 0))
+    _insertar(conexion, "vw_informacion_beneficiario", (
+        "documento", "id_usuario", "nombre_completo", "convocatoria", "fondo_sapiencia", "tiene_varios_fondos",
+    ), beneficiarios())
+
+    _insertar(conexion, "mc_final", ("documento", "periodo", "ies", "programa", "estado", "promedio", "creditos_aprobados"), (
+        (documento(i), _periodo(7 + k), azar.choice(IES), "Programa sintético", "Activo", round(azar.uniform(3, 5), 2), azar.randint(0, 20))
+        for i in range(v.beneficiarios) for k in range(4)
+    ))
+
+    _insertar(conexion, "informacion_personal", (
+        "docconvfondo", "id_usuario", "documento", "convocatoria", "fondo_sapiencia", "nombre_completo", "correo",
+    ), (
+        (f"{documento(i)}-{_periodo(0)}-{FONDOS[i % len(FONDOS)]}", str(i), documento(i), _periodo(0),
+         FONDOS[i % len(FONDOS)], f"Beneficiario {i}", f"b{i}@ejemplo.org")
+        for i in range(v.beneficiarios)
+    ))
+
+
+def _sembrar_convocatoria(conexion: sqlite3.Connection, v: Volumen, azar: random.Random) -> None:
+    _insertar(conexion, "login_usuario", ("id_usuario", "documento", "primerNombre", "segundoNombre", "primerApellido", "segundoApellido"), (
+        (i, documento(i), "Nombre", "Sintético", f"Apellido{i}", "Prueba") for i in range(v.beneficiarios)
+    ))
+    _insertar(conexion, "fondos_habilitados_renovar", ("documento", "efe", "pp", "epm"), (
+        (documento(i), 1, 0, 1) for i in range(0, v.beneficiarios, 4)
+    ))
+    ahora = datetime.now()
+    for vista in ("vw_matricula_cero_2025_2", "vw_matricula_cero_2026_2"):
+        _insertar(conexion, vista, ("documento", "periodo", "nombre_completo", "ies", "programa", "estado", "fecha_registro"), (
+            (documento(i), vista[-6:].replace("_", "-"), f"Beneficiario {i}", azar.choice(IES), "Programa sintético",
+             "Completo", ahora - timedelta(days=azar.randint(0, 200)))
+            for i in range(0, v.beneficiarios, 2)
+        ))
+    for catalogo in CATALOGOS_MATRICULA_CERO:
+        _insertar(conexion, catalogo, ("id", "nombre"), ((k, f"{catalogo} {k}") for k in range(1, 11)))
+    _insertar(conexion, "matricula_cero", ("documento", "periodo") + COLUMNAS_CATALOGO_MATRICULA_CERO, (
+        (documento(i), 20251 + k) + tuple(azar.randint(1, 10) for _ in COLUMNAS_CATALOGO_MATRICULA_CERO)
+        for i in range(0, v.beneficiarios, 2) for k in range(2)
+    ))
+
+
+def _sembrar_dtf(conexion: sqlite3.Connection, v: Volumen, azar: random.Random) -> None:
+    columnas = ("documento", "convocatoria", "periodo", "periodo_academico", "estado", "fondo", "id_fondo", "ies",
+                "programa", "nombre", "giros_solicitados", "giros_realizados", "valor_girar", "fecha_registro")
+    ahora = datetime.now()
+
+    def giros():
+        for n in range(v.giros):
+            i = azar.randrange(v.beneficiarios)
+            fondo = azar.randrange(len(FONDOS))
+            periodo = _periodo(azar.randrange(14))
+            yield (
+                documento(i), f"CONV-{azar.randint(1, 30)}", periodo, periodo, azar.choice(ESTADOS_GIRO),
+                FONDOS[fondo], fondo + 1, azar.choice(IES), "Programa sintético", f"Beneficiario {i}",
+                azar.randint(1, 10), azar.randint(0, 10), round(azar.uniform(1e5, 5e6), 2),
+                ahora - timedelta(days=azar.randint(0, 2000)),
+            )
+    _insertar(conexion, VwGirosGeneralHistoricoIes.__tablename__, columnas, giros())
+
+
+def crear_bases(directorio: str, volumen: Volumen, semilla: int = 20240101) -> None:
+    """Crea (o recrea) las tres bases en `directorio` con `volumen` de datos."""
+    os.makedirs(directorio, exist_ok=True)
+    for nombre in BASES:
+        if os.path.exists(ruta_base(directorio, nombre)):
+            os.remove(ruta_base(directorio, nombre))
+    engines = _crear_esquemas(directorio)
+    for engine in engines.values():
+        engine.dispose()
+
+    azar = random.Random(semilla)
+    for nombre, sembrar in (
+        ("analitica_fondos", _sembrar_analitica),
+        ("convocatoria_sapiencia", _sembrar_convocatoria),
+        ("dtf_financiera", _sembrar_dtf),
+    ):
+        conexion = sqlite3.connect(ruta_base(directorio, nombre))
+        try:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            sembrar(conexion, volumen, azar)
+            conexion.commit()
+            conexion.execute("ANALYZE")
+        finally:
+            conexion.close()
+
+
+# ── Adaptación de los engines de la app ─────────────────────────────────────
+
+_RE_INSERT_IGNORE = re.compile(r"^\s*INSERT\s+IGNORE\b", re.IGNORECASE)
+
+
+def aplicar_shims(engine: Engine, directorio: str) -> None:
+    """Deja un engine de la app (sync, o el sync_engine de uno async) listo para SQLite."""
+    # Con SQL crudo (text()) MySQL devuelve DATE como datetime.date y los
+    # helpers de Seguimiento restan fechas; sqlite3 solo lo hace con
+    # PARSE_DECLTYPES, y entonces SQLAlchemy no debe volver a convertirlas.
+    engine.dialect.native_datetime = True
+
+    @event.listens_for(engine, "do_connect")
+    def _tipos(dialect, connection_record, cargs, cparams):
+        cparams["detect_types"] = sqlite3.PARSE_DECLTYPES
+
+    @event.listens_for(engine, "connect")
+    def _adjuntar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nombre in BASES:
+            cursor.execute(f"ATTACH DATABASE '{os.path.abspath(ruta_base(directorio, nombre))}' AS {nombre}")
+        cursor.execute("PRAGMA busy_timeout = 5000")
+        cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _dialecto(conn, cursor, statement, parameters, context, executemany):
+        if _RE_INSERT_IGNORE.match(statement):
+            statement = _RE_INSERT_IGNORE.sub("INSERT OR IGNORE", statement, count=1)
+        return statement, parameters
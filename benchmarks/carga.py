@@ -0,0 +1,132 @@
+"""
+Generador de carga HTTP concurrente contra una instancia de la API.
+
+Lanza `--concurrencia` clientes que repiten en bucle los endpoints indicados
+durante `--duracion` segundos y reporta, por endpoint, requests/s, errores y
+latencias p50/p95/p99. Sirve para comparar el antes/después de un cambio de
+rendimiento contra el mismo entorno (misma BD, misma máquina):
+
+    uvicorn app:app --port 8000 --workers 1 &
+    python -m benchmarks.carga --url http://127.0.0.1:8000 --token "$TOKEN" \\
+        --concurrencia 200 --duracion 30 \\
+        --endpoint "/consulta/consulta-nombre?documento={documento}" \\
+        --endpoint "/consulta/fondos?documento={documento}" \\
+        --documentos documentos.txt
+
+`{documento}` se reemplaza en cada request por un documento tomado en ronda
+de `--documentos` (un documento por línea), para no medir solo el caché del
+servidor MySQL con un único documento.
+
+Requiere httpx (ver benchmarks/requirements.txt).
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import httpx
+
+
+@dataclass
+class ResultadoEndpoint:
+    latencias: List[float] = field(default_factory=list)
+    errores: int = 0
+
+    def percentil(self, p: float) -> float:
+        if not self.latencias:
+            return 0.0
+        ordenadas = sorted(self.latencias)
+        indice = min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))
+        return ordenadas[indice]
+
+
+async def ejecutar_carga(
+    url_base: str,
+    endpoints: Sequence[str],
+    concurrencia: int,
+    duracion: float,
+    token: Optional[str] = None,
+    documentos: Optional[Sequence[str]] = None,
+    metodo: str = "GET",
+    tokens: Optional[Dict[str, str]] = None,
+    valores: Optional[Dict[str, Sequence[str]]] = None,
+) -> Dict[str, ResultadoEndpoint]:
+    """Corre la carga y devuelve las latencias (en segundos) por endpoint.
+
+    `tokens` permite un token distinto por endpoint (p. ej. el de Seguimiento
+    para /seguimiento/* y /matricula-cero/*); los que no aparezcan usan
+    `token`. `valores` agrega más marcadores además de {documento}, por
+    ejemplo {"convenio": ["1", "2", ...]} para "/seguimiento/convenios/{convenio}".
+    """
+    resultados = {ep: ResultadoEndpoint() for ep in endpoints}
+    ciclo_endpoints = itertools.cycle(endpoints)
+    ciclos = {"documento": itertools.cycle(documentos or ["0"])}
+    ciclos.update({marcador: itertools.cycle(lista) for marcador, lista in (valores or {}).items()})
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    headers_endpoint = {ep: {"Authorization": f"Bearer {t}"} for ep, t in (tokens or {}).items()}
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    fin = time.perf_counter() + duracion
+
+    async with httpx.AsyncClient(base_url=url_base, headers=headers, limits=limites, timeout=60.0) as cliente:
+
+        async def trabajador() -> None:
+            while time.perf_counter() < fin:
+                endpoint = next(ciclo_endpoints)
+                ruta = endpoint
+                for marcador, ciclo in ciclos.items():
+                    if "{" + marcador + "}" in ruta:
+                        ruta = ruta.replace("{" + marcador + "}", next(ciclo))
+                inicio = time.perf_counter()
+                try:
+                    respuesta = await cliente.request(metodo, ruta, headers=headers_endpoint.get(endpoint))
+                    ok = respuesta.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                resultado = resultados[endpoint]
+                if ok:
+                    resultado.latencias.append(time.perf_counter() - inicio)
+                else:
+                    resultado.errores += 1
+
+        await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+
+    return resultados
+
+
+def imprimir_reporte(resultados: Dict[str, ResultadoEndpoint], duracion: float) -> None:
+    print(f"{'endpoint':<60} {'req/s':>9} {'errores':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, r in resultados.items():
+        print(
+            f"{endpoint[:60]:<60} {len(r.latencias) / duracion:>9.1f} {r.errores:>8} "
+            f"{r.percentil(50) * 1000:>9.1f} {r.percentil(95) * 1000:>9.1f} {r.percentil(99) * 1000:>9.1f}"
+        )
+
+
+def _leer_documentos(ruta: Optional[str]) -> Optional[List[str]]:
+    if not ruta:
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return [linea.strip() for linea in f if linea.strip()]
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default=None, help="JWT Bearer (login genérico o de Seguimiento según el endpoint)")
+    parser.add_argument("--endpoint", action="append", required=True, help="Ruta relativa; se puede repetir")
+    parser.add_argument("--concurrencia", type=int, default=200)
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--documentos", default=None, help="Archivo con un documento por línea")
+    args = parser.parse_args(argv)
+
+    resultados = asyncio.run(ejecutar_carga(
+        args.url, args.endpoint, args.concurrencia, args.duracion,
+        token=args.token, documentos=_leer_documentos(args.documentos),
+    ))
+    imprimir_reporte(resultados, args.duracion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Tiempo de /vw-giros-general/filtros-completo/ para beneficiarios con muchos
+giros en la misma convocatoria y fondo, sobre las bases SQLite de
+benchmarks/bd_local.py:
+
+    python -m benchmarks.filtros_completo --giros-por-beneficiario 10 100 500 2000
+
+Agrega al banco (o reemplaza, si ya estaban) un beneficiario sintético por
+cada tamaño, con ese número de giros en CONV-BENCH / EPM, levanta la API y
+pide cada uno REPETICIONES veces; reporta la mediana.
+"""
+import argparse
+import os
+import random
+import secrets
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from .banco_local import _emitir_tokens
+from .bd_local import BASES, ESTADOS_GIRO, IES, Volumen, _periodo, crear_bases, ruta_base
+from .vitalidad import _esperar_arranque
+
+REPETICIONES = 20
+CONVOCATORIA = "CONV-BENCH"
+FONDO = "EPM"
+
+
+def documento_sintetico(giros: int) -> str:
+    return f"9{giros:09d}"
+
+
+def sembrar(directorio: str, tamanos: List[int]) -> None:
+    azar = random.Random(7)
+    ahora = datetime.now()
+    columnas = ("documento", "convocatoria", "periodo", "periodo_academico", "estado", "fondo", "id_fondo", "ies",
+                "programa", "modalidad", "nombre", "valor_pagar_matricula", "valor_pagar_sostenimiento",
+                "valor_girar", "fecha_registro")
+    conexion = sqlite3.connect(ruta_base(directorio, "dtf_financiera"))
+    try:
+        for giros in tamanos:
+            documento = documento_sintetico(giros)
+            conexion.execute("DELETE FROM vw_giros_general_historico_ies WHERE documento = ?", (documento,))
+            conexion.executemany(
+                f"INSERT INTO vw_giros_general_historico_ies ({', '.join(columnas)}) "
+                f"VALUES ({', '.join('?' for _ in columnas)})",
+                [
+                    (
+                        documento, CONVOCATORIA, _periodo(k % 14), _periodo(k % 14), azar.choice(ESTADOS_GIRO), FONDO, 1,
+                        azar.choice(IES), "Programa sintético", "Presencial", f"Beneficiario {documento}",
+                        round(azar.uniform(1e5, 5e6), 2), round(azar.uniform(1e5, 2e6), 2),
+                        round(azar.uniform(1e5, 5e6), 2), ahora - timedelta(days=k),
+                    )
+                    for k in range(giros)
+                ],
+            )
+        conexion.commit()
+    finally:
+        conexion.close()
+
+
+def medir(url: str, token: str, tamanos: List[int]) -> Dict[int, float]:
+    resultados: Dict[int, float] = {}
+    with httpx.Client(base_url=url, headers={"Authorization": f"Bearer {token}"}, timeout=300) as cliente:
+        for giros in tamanos:
+            params = {"convocatoria": CONVOCATORIA, "fondo": FONDO, "documento": documento_sintetico(giros)}
+            tiempos = []
+            for _ in range(REPETICIONES):
+                inicio = time.perf_counter()
+                respuesta = cliente.get("/vw-giros-general/filtros-completo/", params=params)
+                tiempos.append(time.perf_counter() - inicio)
+                respuesta.raise_for_status()
+                assert respuesta.json()[0]["total_registros"] == giros
+            resultados[giros] = statistics.median(tiempos)
+    return resultados
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=".banco_local")
+    parser.add_argument("--giros-por-beneficiario", type=int, nargs="+", default=[10, 100, 500, 2000])
+    parser.add_argument("--puerto", type=int, default=8768)
+    args = parser.parse_args(argv)
+    tamanos = sorted(set(args.giros_por_beneficiario))
+
+    # Antes de sembrar: la siembra importa api.core.security, que fija
+    # JWT_SECRET al importarse.
+    secreto = secrets.token_hex(16)
+    token = _emitir_tokens(secreto)["api"]
+
+    if not all(os.path.exists(ruta_base(args.directorio, n)) for n in BASES):
+        print(f"Sembrando {args.directorio} ...", flush=True)
+        crear_bases(args.directorio, Volumen())
+    sembrar(args.directorio, tamanos)
+    url = f"http://127.0.0.1:{args.puerto}"
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.servidor_local", "--directorio", args.directorio, "--puerto", str(args.puerto)],
+        env={**os.environ, "JWT_SECRET": secreto},
+    )
+    try:
+        _esperar_arranque(url)
+        medir(url, token, tamanos[:1])
+        resultados = medir(url, token, tamanos)
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+    print(f"{'giros':>8} {'ms':>9}")
+    for giros, segundos in resultados.items():
+        print(f"{giros:>8} {segundos * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Filas por segundo al leer vw_giros_general_historico_ies como entidades ORM
+(select(VwGirosGeneralHistoricoIes) + jsonable_encoder, lo que hacía /)
+contra filas Core (select de las columnas + mappings() + RespuestaFilas, lo
+que hace ahora), sobre el banco local de benchmarks/bd_local.py y con un
+engine async como el de la app:
+
+    python -m benchmarks.hidratacion_giros --filas 100 1000 10000
+
+Cada medición incluye armar el JSON de la respuesta. Antes de medir revisa la corrección con un
+documento que tiene varios giros: el modelo declara documento como PK,
+así que el identity map devuelve la misma entidad para todas sus filas
+(la primera, repetida); la lectura Core tiene que devolverlas todas
+distintas.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.models.vw_giros_general_historico_ies import VwGirosGeneralHistoricoIes
+from api.routers.vw_giros_general_historico_ies import RespuestaFilas
+
+from .bd_local import BASES, Volumen, crear_bases, ruta_base, url_base
+
+REPETICIONES = 5
+_VISTA = VwGirosGeneralHistoricoIes.__table__
+
+
+def _acotar(statement: Any, filtro: Any, limite: Optional[int]) -> Any:
+    if filtro is not None:
+        statement = statement.where(filtro)
+    return statement.limit(limite) if limite else statement
+
+
+async def leer_orm(db: AsyncSession, filtro: Any = None, limite: Optional[int] = None) -> List[Any]:
+    return (await db.exec(_acotar(select(VwGirosGeneralHistoricoIes), filtro, limite))).all()
+
+
+async def leer_core(db: AsyncSession, filtro: Any = None, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    return [dict(r) for r in (await db.execute(_acotar(select(*_VISTA.c), filtro, limite))).mappings()]
+
+
+def _distintas(filas: List[Dict[str, Any]]) -> int:
+    return len({tuple(sorted(f.items())) for f in filas})
+
+
+async def revisar_duplicados(engine: Any) -> None:
+    async with AsyncSession(engine) as db:
+        documento, giros = (await db.execute(
+            select(_VISTA.c.documento, func.count()).group_by(_VISTA.c.documento).order_by(func.count().desc()).limit(1)
+        )).one()
+    filtro = _VISTA.c.documento == documento
+    async with AsyncSession(engine) as db:
+        orm = jsonable_encoder(await leer_orm(db, filtro))
+    async with AsyncSession(engine) as db:
+        core = jsonable_encoder(await leer_core(db, filtro))
+    print(f"documento {documento}: {giros} giros en la vista")
+    print(f"  ORM:  {len(orm)} filas, {_distintas(orm)} distintas")
+    print(f"  Core: {len(core)} filas, {_distintas(core)} distintas")
+    assert len(core) == giros and _distintas(core) == giros, "la lectura Core perdió o repitió filas"
+
+
+def _json_orm(entidades: List[Any]) -> bytes:
+    # Lo que hacía FastAPI con la lista de entidades que devolvía /.
+    return JSONResponse(jsonable_encoder(entidades)).body
+
+
+def _json_core(filas: List[Dict[str, Any]]) -> bytes:
+    return RespuestaFilas(filas).body
+
+
+async def medir(
+    engine: Any, lector: Callable[..., Awaitable[List[Any]]], serializar: Callable[[List[Any]], bytes], filas: int,
+) -> float:
+    # Sin ORDER BY ni filtro: las primeras `filas` de la tabla, como / con limit.
+    tiempos = []
+    for _ in range(REPETICIONES):
+        async with AsyncSession(engine) as db:
+            inicio = time.perf_counter()
+            serializar(await lector(db, limite=filas))
+            tiempos.append(time.perf_counter() - inicio)
+    return filas / statistics.median(tiempos)
+
+
+async def principal(directorio: str, tamanos: List[int]) -> None:
+    engine = create_async_engine(url_base(directorio, "dtf_financiera").replace("sqlite://", "sqlite+aiosqlite://", 1))
+    try:
+        await revisar_duplicados(engine)
+        await medir(engine, leer_core, _json_core, tamanos[0])  # calentamiento
+        print(f"{'filas':>8} {'ORM filas/s':>13} {'Core filas/s':>14}")
+        for filas in tamanos:
+            orm = await medir(engine, leer_orm, _json_orm, filas)
+            core = await medir(engine, leer_core, _json_core, filas)
+            print(f"{filas:>8} {orm:>13,.0f} {core:>14,.0f}")
+    finally:
+        await engine.dispose()
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=".banco_local")
+    parser.add_argument("--filas", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args(argv)
+
+    if not all(os.path.exists(ruta_base(args.directorio, n)) for n in BASES):
+        print(f"Sembrando {args.directorio} ...", flush=True)
+        crear_bases(args.directorio, Volumen())
+    asyncio.run(principal(args.directorio, sorted(set(args.filas))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compara el tiempo por página de /vw-giros-general/ (skip/limit) contra
+/vw-giros-general/pagina/ (cursor) a distintas profundidades, sobre las
+bases SQLite de benchmarks/bd_local.py:
+
+    python -m benchmarks.paginacion_giros --paginas 1 100 500 --limit 100
+
+Con skip, la página N hace que la base recorra y descarte (N-1)*limit filas;
+con cursor, cada página arranca donde terminó la anterior. Para llegar a la
+página N por cursor hay que recorrer las anteriores, así que el script
+camina página a página y toma el tiempo de las que se pidieron; las de skip
+se piden directo, REPETICIONES veces cada una, y se reporta la mediana.
+El servidor lee de la copia indexada de la vista (VISTAS_MATERIALIZADAS,
+api/core/vistas_materializadas.py), que /pagina/ necesita; se espera a que
+esté en uso antes de medir.
+"""
+import argparse
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from .banco_local import _emitir_tokens
+from .bd_local import BASES, Volumen, crear_bases, ruta_base
+from .vitalidad import _esperar_arranque
+
+REPETICIONES = 5
+
+
+def _tiempo(cliente: httpx.Client, ruta: str, params: Dict[str, object]) -> Tuple[float, Any]:
+    inicio = time.perf_counter()
+    respuesta = cliente.get(ruta, params=params)
+    transcurrido = time.perf_counter() - inicio
+    respuesta.raise_for_status()
+    return transcurrido, respuesta.json()
+
+
+def medir(url: str, token: str, paginas: List[int], limit: int) -> Dict[int, Dict[str, float]]:
+    resultados: Dict[int, Dict[str, float]] = {p: {} for p in paginas}
+    with httpx.Client(base_url=url, headers={"Authorization": f"Bearer {token}"}, timeout=300) as cliente:
+        for pagina in paginas:
+            tiempos = [
+                _tiempo(cliente, "/vw-giros-general/", {"skip": (pagina - 1) * limit, "limit": limit})[0]
+                for _ in range(REPETICIONES)
+            ]
+            resultados[pagina]["offset"] = statistics.median(tiempos)
+
+        cursor: Optional[str] = None
+        for pagina in range(1, max(paginas) + 1):
+            params: Dict[str, object] = {"limit": limit}
+            if cursor:
+                params["cursor"] = cursor
+            transcurrido, cuerpo = _tiempo(cliente, "/vw-giros-general/pagina/", params)
+            if pagina in resultados:
+                resultados[pagina]["cursor"] = transcurrido
+            cursor = cuerpo["next_cursor"]
+            if cursor is None:
+                break
+    return resultados
+
+
+def _esperar_copia(url: str, token: str, limite: float = 600.0) -> None:
+    """La primera reconstrucción corre en el lifespan, después de que la API ya responde."""
+    fin = time.perf_counter() + limite
+    while time.perf_counter() < fin:
+        estado = httpx.get(url + "/internal/vistas-materializadas", headers={"Authorization": f"Bearer {token}"}).json()
+        if estado["views"]["vw_giros_general_historico_ies"]["in_use"]:
+            return
+        time.sleep(1)
+    raise RuntimeError(f"La copia de la vista no estuvo lista después de {limite:.0f}s")
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=".banco_local")
+    parser.add_argument("--giros", type=int, default=Volumen.giros, help="Filas de la vista si hay que sembrar")
+    parser.add_argument("--paginas", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--puerto", type=int, default=8767)
+    args = parser.parse_args(argv)
+
+    # Antes de sembrar: la siembra importa api.core.security, que fija
+    # JWT_SECRET al importarse.
+    secreto = secrets.token_hex(16)
+    token = _emitir_tokens(secreto)["api"]
+
+    if not all(os.path.exists(ruta_base(args.directorio, n)) for n in BASES):
+        print(f"Sembrando {args.directorio} ({args.giros} giros) ...", flush=True)
+        crear_bases(args.directorio, Volumen(giros=args.giros))
+    url = f"http://127.0.0.1:{args.puerto}"
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.servidor_local", "--directorio", args.directorio, "--puerto", str(args.puerto)],
+        env={
+            **os.environ,
+            "JWT_SECRET": secreto,
+            "VISTAS_MATERIALIZADAS": "vw_giros_general_historico_ies",
+        },
+    )
+    try:
+        _esperar_arranque(url)
+        _esperar_copia(url, token)
+        # Calentamiento: pool abierto y páginas de SQLite en caché.
+        medir(url, token, [1], args.limit)
+        resultados = medir(url, token, sorted(set(args.paginas)), args.limit)
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+    print(f"{'página':>8} {'offset ms':>11} {'cursor ms':>11}")
+    for pagina, r in resultados.items():
+        offset = f"{r['offset'] * 1000:.1f}" if "offset" in r else "-"
+        cursor = f"{r['cursor'] * 1000:.1f}" if "cursor" in r else "-"
+        print(f"{pagina:>8} {offset:>11} {cursor:>11}")
+
+
+if __name__ == "__main__":
+    main()
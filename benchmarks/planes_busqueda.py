@@ -0,0 +1,116 @@
+"""
+Revisa con EXPLAIN que los modos de búsqueda de api/core/busqueda.py usen
+los índices de migraciones/001_indices_busqueda.sql. Arma las mismas
+consultas que los endpoints (_filtrar de /vw-giros-general y
+consulta_reintegros de /reintegros/consulta) y falla (código de salida 1)
+si algún plan recorre la tabla completa:
+
+    python -m benchmarks.planes_busqueda                   # bases MySQL del .env
+    python -m benchmarks.planes_busqueda --directorio .banco_local
+
+En MySQL se mira cada fila del EXPLAIN: ninguna con type=ALL, y las de modo
+texto con type=fulltext. En SQLite (banco local, ver bd_local.py) se mira
+EXPLAIN QUERY PLAN: SEARCH ... USING INDEX, no SCAN; el modo texto no se
+revisa ahí porque SQLite no tiene FULLTEXT.
+"""
+import argparse
+import os
+import sys
+from typing import Any, Iterable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.engine import Engine
+
+from api.core.busqueda import ModoBusqueda
+from api.routers.reintegros import consulta_reintegros
+from api.routers.vw_giros_general_historico_ies import _VISTA, _filtrar
+
+from .bd_local import BASES, Volumen, crear_bases, ruta_base, url_base
+
+Caso = Tuple[str, str, Any, ModoBusqueda]
+
+
+def casos() -> List[Caso]:
+    """(nombre, base, consulta, modo)."""
+    def giros(**filtros: Any) -> Any:
+        return _filtrar(select(*_VISTA.c), **{"documento": None, "estado": None, "fondo": None, "ies": None, **filtros})
+
+    return [
+        ("giros documento exacto", "dtf_financiera", giros(documento="1000000001"), ModoBusqueda.exacto),
+        ("giros documento prefijo", "dtf_financiera",
+         giros(documento="100000", modo_documento=ModoBusqueda.prefijo), ModoBusqueda.prefijo),
+        ("giros fondo exacto", "dtf_financiera", giros(fondo="EPM", modo_fondo=ModoBusqueda.exacto), ModoBusqueda.exacto),
+        ("giros fondo prefijo", "dtf_financiera", giros(fondo="EP"), ModoBusqueda.prefijo),
+        ("giros ies exacto", "dtf_financiera", giros(ies="EAFIT", modo_ies=ModoBusqueda.exacto), ModoBusqueda.exacto),
+        ("giros ies prefijo", "dtf_financiera", giros(ies="Pascual"), ModoBusqueda.prefijo),
+        ("reintegros documento", "analitica_fondos",
+         consulta_reintegros(None, "1000000001", ModoBusqueda.exacto), ModoBusqueda.exacto),
+        ("reintegros beneficiario exacto", "analitica_fondos",
+         consulta_reintegros("Beneficiario 1", None, ModoBusqueda.exacto), ModoBusqueda.exacto),
+        ("reintegros beneficiario prefijo", "analitica_fondos",
+         consulta_reintegros("Benef", None, ModoBusqueda.prefijo), ModoBusqueda.prefijo),
+        ("reintegros beneficiario texto", "analitica_fondos",
+         consulta_reintegros("garcia lopez", None, ModoBusqueda.texto), ModoBusqueda.texto),
+    ]
+
+
+def _sql(engine: Engine, consulta: Any) -> str:
+    return str(consulta.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def revisar_mysql(engine: Engine, consulta: Any, modo: ModoBusqueda) -> Tuple[bool, List[str]]:
+    with engine.connect() as conexion:
+        filas = [dict(r) for r in conexion.execute(text("EXPLAIN " + _sql(engine, consulta))).mappings()]
+    plan = [f"{f['table']}: type={f['type']} key={f['key']} rows={f['rows']}" for f in filas]
+    ok = all(f["type"] != "ALL" for f in filas)
+    if modo is ModoBusqueda.texto:
+        ok = ok and any(f["type"] == "fulltext" for f in filas)
+    return ok, plan
+
+
+def revisar_sqlite(engine: Engine, consulta: Any, modo: ModoBusqueda) -> Optional[Tuple[bool, List[str]]]:
+    if modo is ModoBusqueda.texto:
+        return None
+    with engine.connect() as conexion:
+        plan = [r[-1] for r in conexion.execute(text("EXPLAIN QUERY PLAN " + _sql(engine, consulta)))]
+    # Un ORDER BY resuelto aparte ("USE TEMP B-TREE") no es un recorrido.
+    accesos = [p for p in plan if p.startswith(("SCAN", "SEARCH"))]
+    ok = bool(accesos) and all(p.startswith("SEARCH") and "INDEX" in p for p in accesos)
+    return ok, plan
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", help="Banco local SQLite (se siembra si no existe); sin esto, las bases MySQL del .env")
+    args = parser.parse_args(argv)
+
+    if args.directorio:
+        if not all(os.path.exists(ruta_base(args.directorio, n)) for n in BASES):
+            print(f"Sembrando {args.directorio} ...", flush=True)
+            crear_bases(args.directorio, Volumen())
+        engines = {nombre: create_engine(url_base(args.directorio, nombre)) for nombre in BASES}
+        revisar = revisar_sqlite
+    else:
+        from api.core.database import engine_analitica, engine_dtf_financiera
+
+        engines = {"analitica_fondos": engine_analitica, "dtf_financiera": engine_dtf_financiera}
+        revisar = revisar_mysql
+
+    fallidos = 0
+    for nombre, base, consulta, modo in casos():
+        resultado = revisar(engines[base], consulta, modo)
+        if resultado is None:
+            print(f"[omitido] {nombre}")
+            continue
+        ok, plan = resultado
+        fallidos += not ok
+        print(f"[{'ok' if ok else 'FALLA'}] {nombre}")
+        for paso in plan:
+            print(f"      {paso}")
+    if fallidos:
+        print(f"{fallidos} consulta(s) sin índice", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
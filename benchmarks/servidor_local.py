@@ -0,0 +1,43 @@
+"""
+Levanta la API (app.py, sin cambios) contra las bases SQLite de
+benchmarks/bd_local.py en lugar de las MySQL del .env:
+
+    python -m benchmarks.servidor_local --directorio .banco_local --puerto 8766
+
+Normalmente lo lanza benchmarks/banco_local.py; se puede correr a mano para
+explorar /docs o /internal/pools con datos sintéticos.
+"""
+import argparse
+import os
+from typing import Iterable, Optional
+
+from .bd_local import BASES, aplicar_shims, url_base
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=".banco_local", help="Directorio con las bases de bd_local.crear_bases")
+    parser.add_argument("--puerto", type=int, default=8766)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args(argv)
+
+    # Antes de importar app: config.py lee las URLs al importarse.
+    for nombre, prefijo in BASES.items():
+        os.environ[f"{prefijo}_URL"] = url_base(args.directorio, nombre)
+    # La "réplica" es el mismo archivo; así el ruteo de lecturas de
+    # Seguimiento (get_engine_analitica_lectura) también queda en la medición.
+    os.environ["ANALITICA_READ_DB_URL"] = url_base(args.directorio, "analitica_fondos")
+
+    import uvicorn
+
+    from api.core.database import ENGINES
+    from app import app
+
+    for engine in ENGINES.values():
+        aplicar_shims(engine, args.directorio)
+
+    uvicorn.run(app, host="127.0.0.1", port=args.puerto, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
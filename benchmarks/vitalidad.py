@@ -0,0 +1,88 @@
+"""
+Compara la latencia de /consulta/consulta-nombre con DB_LIVENESS=pre_ping
+(SELECT 1 en cada checkout) contra DB_LIVENESS=validacion (recycle +
+validación de ociosas en segundo plano + reintento único en lecturas).
+
+Levanta la API con uvicorn una vez por modo, contra las MISMAS bases de
+datos del .env, le corre la misma carga y muestra la mediana y el p95 de
+cada modo lado a lado:
+
+    python -m benchmarks.vitalidad --token "$TOKEN" --documentos documentos.txt \\
+        --concurrencia 50 --duracion 30
+
+Conviene correrlo desde una máquina con la misma latencia de red hacia
+MySQL que producción: el ahorro es justo un round trip por request.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from .carga import ResultadoEndpoint, _leer_documentos, ejecutar_carga
+
+ENDPOINT = "/consulta/consulta-nombre?documento={documento}"
+MODOS = ("pre_ping", "validacion")
+
+
+def _esperar_arranque(url: str, limite: float = 60.0) -> None:
+    fin = time.perf_counter() + limite
+    while time.perf_counter() < fin:
+        try:
+            if httpx.get(url + "/", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"La API no respondió en {url} después de {limite:.0f}s")
+
+
+def medir_modo(modo: str, args: argparse.Namespace) -> ResultadoEndpoint:
+    url = f"http://127.0.0.1:{args.puerto}"
+    entorno = {**os.environ, "DB_LIVENESS": modo}
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(args.puerto), "--workers", "1", "--log-level", "warning"],
+        env=entorno,
+    )
+    try:
+        _esperar_arranque(url)
+        documentos = _leer_documentos(args.documentos)
+        # Calentamiento: que el pool ya tenga sus conexiones abiertas.
+        asyncio.run(ejecutar_carga(url, [ENDPOINT], args.concurrencia, 5, token=args.token, documentos=documentos))
+        resultados = asyncio.run(ejecutar_carga(
+            url, [ENDPOINT], args.concurrencia, args.duracion, token=args.token, documentos=documentos,
+        ))
+        return resultados[ENDPOINT]
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--token", required=True, help="JWT Bearer del login genérico (/auth/login)")
+    parser.add_argument("--documentos", default=None, help="Archivo con un documento por línea")
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de carga por modo")
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    resultados: Dict[str, ResultadoEndpoint] = {modo: medir_modo(modo, args) for modo in MODOS}
+
+    print(f"{'modo':<12} {'req/s':>9} {'errores':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    for modo, r in resultados.items():
+        print(
+            f"{modo:<12} {len(r.latencias) / args.duracion:>9.1f} {r.errores:>8} "
+            f"{r.percentil(50) * 1000:>9.1f} {r.percentil(95) * 1000:>9.1f}"
+        )
+    base, nuevo = resultados["pre_ping"].percentil(50), resultados["validacion"].percentil(50)
+    if base:
+        print(f"\nMediana: {base * 1000:.1f} ms -> {nuevo * 1000:.1f} ms ({(nuevo - base) / base:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
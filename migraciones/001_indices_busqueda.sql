@@ -0,0 +1,38 @@
+-- Índices que respaldan los modos de búsqueda de api/core/busqueda.py
+-- (exacto / prefijo / texto). Comprobación de los planes:
+--     python -m benchmarks.planes_busqueda
+
+
+-- analitica_fondos.reintegros
+--
+-- /reintegros/consulta/: documento es exacto y ordena por
+-- fecha_inicio_proceso; beneficiario es prefijo (el modo por defecto) o
+-- exacto (B-tree), o texto (FULLTEXT).
+
+ALTER TABLE `reintegros`
+  ADD INDEX `ix_reintegros_documento_fecha` (`documento`, `fecha_inicio_proceso`),
+  ADD INDEX `ix_reintegros_beneficiario` (`beneficiario`);
+
+-- El primer FULLTEXT de una tabla InnoDB la reconstruye (agrega la columna
+-- oculta FTS_DOC_ID); va en su propia sentencia para correrla aparte, en
+-- horario de poca carga. Mientras no exista, modo_beneficiario=texto falla
+-- (MySQL 1191); los demás modos no lo usan.
+ALTER TABLE `reintegros`
+  ADD FULLTEXT INDEX `ft_reintegros_beneficiario` (`beneficiario`);
+
+
+-- dtf_financiera.vw_giros_general_historico_ies
+--
+-- Es una vista: MySQL no permite índices sobre ella, y sus tablas base no
+-- están versionadas en este repo. /vw-giros-general filtra documento
+-- (exacto o prefijo), fondo e ies (prefijo o exacto); con algoritmo MERGE
+-- el filtro baja a la tabla base, así que cada una de esas columnas
+-- necesita un índice B-tree en la tabla de donde sale, con la misma
+-- intercalación que la columna de la vista:
+--
+--     ALTER TABLE `<tabla base>` ADD INDEX `ix_<tabla base>_documento` (`documento`);
+--     ALTER TABLE `<tabla base>` ADD INDEX `ix_<tabla base>_fondo` (`fondo`);
+--     ALTER TABLE `<tabla base>` ADD INDEX `ix_<tabla base>_ies` (`ies`);
+--
+-- El modo texto no se ofrece en la vista: MATCH ... AGAINST sobre una
+-- columna de vista falla si la tabla base no tiene el FULLTEXT.